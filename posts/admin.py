@@ -1,19 +1,167 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth.admin import UserAdmin
+from django.shortcuts import render
 
-from .models import Group, Post
+from . import moderation
+from .models import Comment, DataExport, Group, Post, User
+from .settings import MODERATION_ADMIN_LIMIT
+from .sharding import post_shards
+from .slowlog import slow_requests
+
+SLOW_REQUESTS_ORDERING = {
+    "duration": "duration",
+    "queries": "queries",
+    "time": "time",
+}
+
+
+class MoveToGroupForm(forms.Form):
+    # Поле со slug вместо списка: групп может быть слишком много.
+    slug = forms.SlugField(label="Slug группы", required=False,
+                           help_text="Пусто — убрать посты из групп")
+
+    def clean_slug(self):
+        slug = self.cleaned_data["slug"]
+        if not slug:
+            return None
+        group = Group.objects.filter(slug=slug).first()
+        if group is None:
+            raise forms.ValidationError("Нет группы с таким slug")
+        return group
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ("pk", "text", "pub_date", "author", "group")
+    list_display = ("pk", "text", "pub_date", "author", "group", "hidden")
     search_fields = ("text",)
-    list_filter = ("pub_date",)
+    list_filter = ("pub_date", "hidden")
     empty_value_display = "-пусто-"
+    actions = ("delete_posts", "hide_posts", "unhide_posts", "move_to_group")
+
+    def get_actions(self, request):
+        # Штатное удаление собирает все объекты для страницы подтверждения.
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+    def shard_querysets(self, request, queryset):
+        """Выбор из списка на каждом шарде или None, если он слишком велик.
+
+        Список админки читает первый шард, а условия выбора — фильтр
+        и id отмеченных постов, уникальные между шардами, — подходят
+        для любого из них. Действие идет порциями внутри запроса,
+        поэтому выбор больше MODERATION_ADMIN_LIMIT постов не берем.
+        """
+        querysets = [
+            queryset.select_related(None).using(alias)
+            for alias in post_shards()
+        ]
+        total = sum(queryset.count() for queryset in querysets)
+        if total > MODERATION_ADMIN_LIMIT:
+            self.message_user(
+                request,
+                f"Выбрано постов: {total}, за раз можно не больше "
+                f"{MODERATION_ADMIN_LIMIT}. Сузьте фильтр.",
+                messages.ERROR,
+            )
+            return None
+        return querysets
+
+    def delete_posts(self, request, queryset):
+        querysets = self.shard_querysets(request, queryset)
+        if querysets is None:
+            return
+        count = sum(moderation.delete_posts(queryset)
+                    for queryset in querysets)
+        self.message_user(request, f"Удалено постов: {count}")
+    delete_posts.short_description = (
+        f"Удалить выбранные посты (до {MODERATION_ADMIN_LIMIT})"
+    )
+    delete_posts.allowed_permissions = ("delete",)
+
+    def hide_posts(self, request, queryset):
+        querysets = self.shard_querysets(request, queryset)
+        if querysets is None:
+            return
+        count = sum(moderation.set_hidden(queryset, True)
+                    for queryset in querysets)
+        self.message_user(request, f"Скрыто постов: {count}")
+    hide_posts.short_description = (
+        f"Скрыть выбранные посты (до {MODERATION_ADMIN_LIMIT})"
+    )
+    hide_posts.allowed_permissions = ("change",)
+
+    def unhide_posts(self, request, queryset):
+        querysets = self.shard_querysets(request, queryset)
+        if querysets is None:
+            return
+        count = sum(moderation.set_hidden(queryset, False)
+                    for queryset in querysets)
+        self.message_user(request, f"Возвращено постов: {count}")
+    unhide_posts.short_description = (
+        f"Вернуть скрытые посты (до {MODERATION_ADMIN_LIMIT})"
+    )
+    unhide_posts.allowed_permissions = ("change",)
+
+    def move_to_group(self, request, queryset):
+        form = MoveToGroupForm(request.POST if "apply" in request.POST
+                               else None)
+        if form.is_valid():
+            querysets = self.shard_querysets(request, queryset)
+            if querysets is None:
+                return None
+            count = sum(
+                moderation.set_group(queryset, form.cleaned_data["slug"])
+                for queryset in querysets
+            )
+            self.message_user(request, f"Перенесено постов: {count}")
+            return None
+        return render(request, "admin/move_to_group.html", {
+            **self.admin_site.each_context(request),
+            "title": "Перенос постов в группу",
+            "form": form,
+            "selected": request.POST.getlist(ACTION_CHECKBOX_NAME),
+            "select_across": request.POST.get("select_across") == "1",
+            "checkbox_name": ACTION_CHECKBOX_NAME,
+        })
+    move_to_group.short_description = (
+        f"Перенести выбранные посты в группу (до {MODERATION_ADMIN_LIMIT})"
+    )
+    move_to_group.allowed_permissions = ("change",)
 
 
 admin.site.register(Post, PostAdmin)
 
 
-class GroupAdmin(admin.ModelAdmin):
+class DeferredDeletionMixin:
+    """Удаление в админке только помечает объект для process_deletions.
+
+    Страница подтверждения не собирает связанные объекты: у автора
+    или группы их могут быть сотни тысяч.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        return (
+            [str(obj) for obj in objs],
+            {self.opts.verbose_name_plural: len(objs)},
+            perms_needed,
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        moderation.schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            moderation.schedule_deletion(obj)
+
+
+class GroupAdmin(DeferredDeletionMixin, admin.ModelAdmin):
     list_display = ("pk", "title", "description")
     search_fields = ("title",)
     list_filter = ("title",)
@@ -21,3 +169,49 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Group, GroupAdmin)
+
+
+class DeferredDeletionUserAdmin(DeferredDeletionMixin, UserAdmin):
+    pass
+
+
+admin.site.unregister(User)
+admin.site.register(User, DeferredDeletionUserAdmin)
+
+
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ("pk", "text", "created", "author", "post")
+    search_fields = ("text",)
+    list_filter = ("created",)
+    raw_id_fields = ("post", "author", "parent")
+    empty_value_display = "-пусто-"
+
+
+admin.site.register(Comment, CommentAdmin)
+
+
+class DataExportAdmin(admin.ModelAdmin):
+    list_display = ("pk", "user", "status", "post_count", "created",
+                    "finished")
+    list_filter = ("status",)
+    raw_id_fields = ("user",)
+    empty_value_display = "-пусто-"
+
+
+admin.site.register(DataExport, DataExportAdmin)
+
+
+def slow_requests_view(request):
+    """Медленные запросы из кольцевого буфера, по умолчанию самые долгие."""
+    sort = request.GET.get("sort", "-duration")
+    field = SLOW_REQUESTS_ORDERING.get(sort.lstrip("-"), "duration")
+    entries = sorted(
+        slow_requests(), key=lambda entry: entry[field],
+        reverse=sort.startswith("-")
+    )
+    return render(request, "admin/slow_requests.html", {
+        **admin.site.each_context(request),
+        "title": "Медленные запросы",
+        "entries": entries,
+        "sort": sort,
+    })
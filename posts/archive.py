@@ -0,0 +1,98 @@
+import datetime as dt
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+
+from .deletion import pending_ids
+from .models import PendingDeletion, Post, PostArchive
+from .sharding import post_shards
+
+
+def post_month(post):
+    pub_date = timezone.localtime(post.pub_date)
+    return pub_date.year, pub_date.month
+
+
+def month_bounds(year, month):
+    start = dt.datetime(year, month, 1)
+    if month == 12:
+        end = dt.datetime(year + 1, 1, 1)
+    else:
+        end = dt.datetime(year, month + 1, 1)
+    return timezone.make_aware(start), timezone.make_aware(end)
+
+
+def post_scopes(author_id, group_id):
+    scopes = [(PostArchive.SITE, 0), (PostArchive.AUTHOR, author_id)]
+    if group_id is not None:
+        scopes.append((PostArchive.GROUP, group_id))
+    return scopes
+
+
+def adjust_counts(scopes, year, month, delta):
+    for scope, object_id in scopes:
+        updated = PostArchive.objects.filter(
+            scope=scope, object_id=object_id, year=year, month=month
+        ).update(post_count=F("post_count") + delta)
+        if not updated and delta > 0:
+            archive, created = PostArchive.objects.get_or_create(
+                scope=scope, object_id=object_id, year=year, month=month,
+                defaults={"post_count": delta}
+            )
+            if not created:
+                PostArchive.objects.filter(pk=archive.pk).update(
+                    post_count=F("post_count") + delta
+                )
+
+
+def rebuild_archive():
+    """Пересчитывает сводную таблицу архива по таблице постов."""
+    counts = Counter()
+    for alias in post_shards():
+        posts = Post.objects.using(alias).filter(hidden=False).exclude(
+            author_id__in=pending_ids(PendingDeletion.USER)
+        ).values_list("author_id", "group_id", "pub_date")
+        for author_id, group_id, pub_date in posts.iterator():
+            pub_date = timezone.localtime(pub_date)
+            for scope in post_scopes(author_id, group_id):
+                counts[scope + (pub_date.year, pub_date.month)] += 1
+    with transaction.atomic():
+        PostArchive.objects.all().delete()
+        PostArchive.objects.bulk_create([
+            PostArchive(scope=scope, object_id=object_id, year=year,
+                        month=month, post_count=post_count)
+            for (scope, object_id, year, month), post_count in counts.items()
+        ], batch_size=500)
+    return len(counts)
+
+
+def archive_links(url_name, scope, object_id=0, **url_kwargs):
+    """Навигация по архиву одной выборкой из сводной таблицы."""
+    months = PostArchive.objects.filter(
+        scope=scope, object_id=object_id, post_count__gt=0
+    )
+    return [{
+        "date": archive.date,
+        "post_count": archive.post_count,
+        "url": reverse(url_name, kwargs={
+            **url_kwargs, "year": archive.year, "month": archive.month
+        }),
+    } for archive in months]
+
+
+def get_archive_or_404(scope, object_id, year, month):
+    return get_object_or_404(
+        PostArchive, scope=scope, object_id=object_id, year=year,
+        month=month, post_count__gt=0
+    )
+
+
+def archive_total(scope, object_id=0):
+    """Число постов в области без COUNT по таблице постов."""
+    return PostArchive.objects.filter(
+        scope=scope, object_id=object_id
+    ).aggregate(total=Sum("post_count"))["total"] or 0
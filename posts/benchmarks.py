@@ -0,0 +1,388 @@
+"""Микробенчмарки представлений, шаблонов и запросов на сгенерированных данных.
+
+Запуск и сравнение с сохраненной базовой линией — команда ``benchmark``.
+"""
+import datetime as dt
+import os
+import platform
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+
+from users.templatetags.user_filters import addclass
+
+from . import views
+from .archive import rebuild_archive
+from .cache_backends import SQLiteCache
+from .forms import CommentForm, PostForm
+from .groups import reconcile_group_stats
+from .models import Comment, Group, Post
+from .paginator import cursor_page, decode_cursor, encode_cursor
+from .settings import COMMENT_PATH_STEP, PAGINATOR_PAGE_SIZE
+from .sharding import (feed_posts, shard_for_author, sync_sequences,
+                       with_related)
+
+User = get_user_model()
+
+BENCHMARKS = {}
+TEMPLATE_SIZES = (10, 100, 1000)
+CACHE_KEYS = 1000
+
+
+def benchmark(name, number=10):
+    """Регистрирует фабрику, которая возвращает замеряемую функцию."""
+    def decorator(factory):
+        BENCHMARKS[name] = (factory, number)
+        return factory
+    return decorator
+
+
+def seed(posts=1200, users=20, groups=10):
+    User.objects.bulk_create([
+        User(username=f"bench{i}", first_name="Bench", last_name=str(i))
+        for i in range(users)
+    ])
+    authors = list(User.objects.filter(username__startswith="bench"))
+    Group.objects.bulk_create([
+        Group(title=f"Group {i}", search_title=f"group {i}",
+              slug=f"group-{i}", description="bench")
+        for i in range(groups)
+    ])
+    all_groups = list(Group.objects.filter(slug__startswith="group-"))
+    now = timezone.now()
+    # bulk_create не берет id из общей последовательности, поэтому id
+    # задаются явно, а последовательность поднимается после вставки.
+    by_shard = defaultdict(list)
+    for i in range(posts):
+        author = authors[i % len(authors)]
+        by_shard[shard_for_author(author.pk)].append(Post(
+            pk=i + 1,
+            text=f"Benchmark post {i} " + "lorem ipsum " * 20,
+            author=author,
+            group=all_groups[i % len(all_groups)] if i % 3 else None,
+            # auto_now_add при bulk_create ставит всем одно время.
+            pub_date=now - dt.timedelta(hours=i),
+        ))
+    for alias, shard_posts in by_shard.items():
+        Post.objects.using(alias).bulk_create(shard_posts, batch_size=500)
+    for alias, shard_posts in by_shard.items():
+        for post in shard_posts:
+            Post.objects.using(alias).filter(pk=post.pk).update(
+                pub_date=post.pub_date
+            )
+    commented = feed_posts()[1]
+    seed_comments(commented, max(TEMPLATE_SIZES))
+    sync_sequences(by_shard)
+    rebuild_archive()
+    reconcile_group_stats()
+    return {
+        "factory": RequestFactory(),
+        "user": feed_posts()[0].author,
+        "group": all_groups[0],
+        "group_post": feed_posts(group=all_groups[0])[0],
+        "post": feed_posts()[0],
+        "commented": commented,
+    }
+
+
+def seed_comments(post, count):
+    Comment.objects.using(post._state.db).bulk_create([
+        Comment(
+            pk=i, post=post, author=post.author, text=f"Comment {i}",
+            path=f"{i:0{COMMENT_PATH_STEP}d}"
+        )
+        for i in range(1, count + 1)
+    ], batch_size=500)
+    Post.objects.using(post._state.db).filter(pk=post.pk).update(
+        comment_count=count
+    )
+
+
+def make_request(data, path="/", user=None, **params):
+    request = data["factory"].get(path, params)
+    request.user = user or AnonymousUser()
+    return request
+
+
+def make_post_request(data, user, **params):
+    request = data["factory"].post("/", params)
+    request.user = user
+    # Замеряется сама запись, а не проверка CSRF-токена.
+    request._dont_enforce_csrf_checks = True
+    return request
+
+
+@benchmark("view:index")
+def bench_index(data):
+    return lambda: views.index(make_request(data))
+
+
+@benchmark("view:index_deep_page")
+def bench_index_deep_page(data):
+    return lambda: views.index(make_request(data, page=100))
+
+
+@benchmark("view:index_fragment")
+def bench_index_fragment(data):
+    # Авторизованный запрос проходит мимо кэша фрагментов.
+    cursor = encode_cursor(feed_posts()[PAGINATOR_PAGE_SIZE - 1])
+    return lambda: views.index_fragment(make_request(
+        data, user=data["user"], after=cursor, page=2
+    ))
+
+
+@benchmark("view:popular")
+def bench_popular(data):
+    return lambda: views.popular(make_request(data))
+
+
+@benchmark("view:group_list")
+def bench_group_list(data):
+    return lambda: views.group_list(make_request(data, sort="size"))
+
+
+@benchmark("view:group_posts")
+def bench_group_posts(data):
+    slug = data["group"].slug
+    return lambda: views.group_posts(make_request(data), slug)
+
+
+@benchmark("view:profile")
+def bench_profile(data):
+    username = data["user"].username
+    return lambda: views.profile(make_request(data), username)
+
+
+@benchmark("view:post_view")
+def bench_post_view(data):
+    post = data["post"]
+    return lambda: views.post_view(
+        make_request(data), post.author.username, post.pk
+    )
+
+
+@benchmark("view:index_archive")
+def bench_index_archive(data):
+    pub_date = timezone.localtime(data["post"].pub_date)
+    return lambda: views.index_archive(
+        make_request(data), pub_date.year, pub_date.month
+    )
+
+
+@benchmark("view:group_archive")
+def bench_group_archive(data):
+    slug = data["group"].slug
+    pub_date = timezone.localtime(data["group_post"].pub_date)
+    return lambda: views.group_archive(
+        make_request(data), slug, pub_date.year, pub_date.month
+    )
+
+
+@benchmark("view:profile_archive")
+def bench_profile_archive(data):
+    post = data["post"]
+    pub_date = timezone.localtime(post.pub_date)
+    return lambda: views.profile_archive(
+        make_request(data), post.author.username, pub_date.year,
+        pub_date.month
+    )
+
+
+@benchmark("view:new_post")
+def bench_new_post(data):
+    return lambda: views.new_post(make_request(data, user=data["user"]))
+
+
+@benchmark("view:post_edit")
+def bench_post_edit(data):
+    post = data["post"]
+    return lambda: views.post_edit(
+        make_request(data, user=post.author), post.author.username, post.pk
+    )
+
+
+@benchmark("view:add_comment")
+def bench_add_comment(data):
+    # Каждый вызов пишет комментарий, поэтому замер идет последним
+    # из представлений и не меняет страницы, замеренные до него.
+    post = data["post"]
+    return lambda: views.add_comment(
+        make_post_request(data, data["user"], text="Benchmark comment"),
+        post.author.username, post.pk
+    )
+
+
+def register_template_benchmarks():
+    for template in ("index.html", "group.html", "profile.html",
+                     "post.html"):
+        for size in TEMPLATE_SIZES:
+            benchmark(f"template:{template}:{size}", number=3)(
+                template_factory(template, size)
+            )
+            benchmark(f"template-jinja2:{template}:{size}", number=3)(
+                template_factory(template, size, using="jinja2")
+            )
+
+
+def template_factory(template, size, using=None):
+    def factory(data):
+        if template == "post.html":
+            context = post_context(data, size)
+        else:
+            paginator = Paginator(feed_posts(), size)
+            page = paginator.get_page(1)
+            list(page)
+            context = {
+                "page": page,
+                "paginator": paginator,
+                "group": data["group"],
+                "user_profile": data["user"],
+            }
+        request = make_request(data)
+        return lambda: render_to_string(
+            template, context, request=request, using=using
+        )
+    return factory
+
+
+def post_context(data, size):
+    """Контекст post.html с size комментариями на странице."""
+    post = data["commented"]
+    comments = Paginator(
+        with_related(post.comments.all(), "author"), size
+    ).get_page(1)
+    list(comments)
+    return {
+        "post": post,
+        "user": AnonymousUser(),
+        "post_id": post.pk,
+        "post_count": 1,
+        "user_profile": post.author,
+        "comments": comments,
+        "form": CommentForm(post=post),
+        "related_posts": [],
+    }
+
+
+register_template_benchmarks()
+
+
+@benchmark("paging:paginator_deep_page")
+def bench_paginator(data):
+    def run():
+        page = Paginator(feed_posts(), PAGINATOR_PAGE_SIZE).get_page(100)
+        return list(page)
+    return run
+
+
+@benchmark("paging:cursor_deep_page")
+def bench_cursor(data):
+    posts = feed_posts()
+    cursor = decode_cursor(encode_cursor(posts[99 * PAGINATOR_PAGE_SIZE - 1]))
+    return lambda: cursor_page(feed_posts(), cursor, PAGINATOR_PAGE_SIZE)
+
+
+@benchmark("filter:addclass", number=100)
+def bench_addclass(data):
+    form = PostForm()
+    return lambda: addclass(form["text"], "form-control")
+
+
+def make_cache(backend):
+    # Каждый бэкенд получает свой временный каталог и одни и те же лимиты.
+    directory = tempfile.mkdtemp(prefix="yatube-bench-")
+    params = {"OPTIONS": {"MAX_ENTRIES": CACHE_KEYS * 10}}
+    if backend == "locmem":
+        return LocMemCache(directory, params)
+    if backend == "filebased":
+        return FileBasedCache(directory, params)
+    return SQLiteCache(os.path.join(directory, "cache.sqlite3"), params)
+
+
+def register_cache_benchmarks():
+    for backend in ("locmem", "filebased", "sqlite"):
+        for operation in ("get", "set", "incr"):
+            benchmark(f"cache:{backend}:{operation}", number=3)(
+                cache_factory(backend, operation)
+            )
+
+
+def cache_factory(backend, operation):
+    def factory(data):
+        cache = make_cache(backend)
+        keys = [f"key{i}" for i in range(CACHE_KEYS)]
+        value = {"html": "x" * 2048}
+        cache.set_many({key: 0 for key in keys})
+
+        def run():
+            for key in keys:
+                if operation == "get":
+                    cache.get(key)
+                elif operation == "set":
+                    cache.set(key, value)
+                else:
+                    cache.incr(key)
+        return run
+    return factory
+
+
+register_cache_benchmarks()
+
+
+def measure(func, number, repeat):
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run_benchmarks(data, names=None, repeat=5):
+    results = {}
+    for name, (factory, number) in BENCHMARKS.items():
+        if names is not None and name not in names:
+            continue
+        results[name] = measure(factory(data), number, repeat)
+    return {
+        "meta": {
+            "created": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+        },
+        "results": results,
+    }
+
+
+def compare_results(baseline, current, threshold):
+    """Сопоставляет медианы; замедление больше threshold — регрессия."""
+    rows = []
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            rows.append((name, None, result["median"], None, False))
+            continue
+        change = result["median"] / previous["median"] - 1
+        rows.append((
+            name, previous["median"], result["median"], change,
+            change > threshold
+        ))
+    return rows
@@ -0,0 +1,261 @@
+"""Кэш в файле SQLite, общий для всех процессов на хосте.
+
+WAL позволяет читать параллельно с записью, а время последнего
+обращения обновляется не чаще раза в ACCESS_RESOLUTION секунд, чтобы
+чтения не превращались в записи. Число записей и их суммарный размер
+ведут триггеры, поэтому проверка лимитов после set стоит одного
+SELECT по строке статистики. Вытесняются сначала просроченные,
+затем давно не читанные записи (LRU). incr и add атомарны между
+процессами благодаря BEGIN IMMEDIATE.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_stats SET entries = entries + 1, size = size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_stats SET entries = entries - 1, size = size - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache
+BEGIN
+    UPDATE cache_stats SET size = size - OLD.size + NEW.size;
+END;
+"""
+# REPLACE удаляет старую строку, триггер удаления должен сработать.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA recursive_triggers = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+)
+# Ограничение SQLite на число параметров запроса.
+CHUNK_SIZE = 500
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._path = location
+        self._max_size = int(options.get("MAX_SIZE", 0)) or None
+        self._access_resolution = float(
+            options.get("ACCESS_RESOLUTION", 1)
+        )
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        # После fork соединение родителя использовать нельзя.
+        if getattr(self._local, "pid", None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            for pragma in PRAGMAS:
+                db.execute(pragma)
+            db.executescript(SCHEMA)
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return self._local.db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _insert(self, db, key, value, timeout, now, conflict):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        cursor = db.execute(
+            f"INSERT OR {conflict} INTO cache "
+            "(key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)",
+            (key, data, self.get_backend_timeout(timeout), now,
+             len(key) + len(data))
+        )
+        return cursor.rowcount == 1
+
+    def _cull(self, db, now):
+        entries, size = db.execute(
+            "SELECT entries, size FROM cache_stats"
+        ).fetchone()
+        if not self._over_limits(entries, size):
+            return
+        db.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+        entries, size = db.execute(
+            "SELECT entries, size FROM cache_stats"
+        ).fetchone()
+        while entries and self._over_limits(entries, size):
+            db.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                (max(1, entries // self._cull_frequency),)
+            )
+            entries, size = db.execute(
+                "SELECT entries, size FROM cache_stats"
+            ).fetchone()
+
+    def _over_limits(self, entries, size):
+        return entries > self._max_entries or (
+            self._max_size is not None and size > self._max_size
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?", (key, now)
+            )
+            added = self._insert(db, key, value, timeout, now, "IGNORE")
+            if added:
+                self._cull(db, now)
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        row = self._db.execute(
+            "SELECT value, expires, accessed FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        data, expires, accessed = row
+        if expires is not None and expires <= now:
+            self._write_if_unlocked(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?", (key, now)
+            )
+            return default
+        if now - accessed >= self._access_resolution:
+            self._write_if_unlocked(
+                "UPDATE cache SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return pickle.loads(data)
+
+    def _write_if_unlocked(self, sql, params):
+        # Чтение не должно падать из-за чужой записи: просроченную строку
+        # уберет вытеснение, а время обращения обновит следующий get.
+        try:
+            self._db.execute(sql, params)
+        except sqlite3.OperationalError:
+            pass
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as db:
+            self._insert(db, key, value, timeout, now, "REPLACE")
+            self._cull(db, now)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        cursor = self._db.execute(
+            "UPDATE cache SET expires = ? WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), key, now)
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        cursor = self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._db.execute(
+            "SELECT 1 FROM cache WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (key, time.time())
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        cache_key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT value FROM cache WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (cache_key, now)
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute(
+                "UPDATE cache SET value = ?, size = ?, accessed = ? "
+                "WHERE key = ?",
+                (data, len(cache_key) + len(data), now, cache_key)
+            )
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        cache_keys = list(keys)
+        now = time.time()
+        found = {}
+        for start in range(0, len(cache_keys), CHUNK_SIZE):
+            chunk = cache_keys[start:start + CHUNK_SIZE]
+            rows = self._db.execute(
+                "SELECT key, value FROM cache WHERE key IN ({}) "
+                "AND (expires IS NULL OR expires > ?)".format(
+                    ", ".join("?" * len(chunk))
+                ),
+                (*chunk, now)
+            )
+            for cache_key, data in rows:
+                found[keys[cache_key]] = pickle.loads(data)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self._transaction() as db:
+            for key, value in data.items():
+                self._insert(
+                    db, self._key(key, version), value, timeout, now,
+                    "REPLACE"
+                )
+            self._cull(db, now)
+        return []
+
+    def delete_many(self, keys, version=None):
+        self._db.executemany("DELETE FROM cache WHERE key = ?", [
+            (self._key(key, version),) for key in keys
+        ])
+
+    def clear(self):
+        self._db.execute("DELETE FROM cache")
@@ -0,0 +1,117 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from .metrics import inc, observe
+from .settings import PAGE_MAX_STALENESS, PAGE_REGENERATION_LOCK_TIMEOUT
+
+GENERATION_KEY = "pages:generation"
+LOCK_PREFIX = "pages:lock:"
+# Ключ окружения WSGI для рендеринга внутри процесса мимо кэша.
+FRESH_PAGE_ENVIRON = "yatube.fresh_page"
+
+
+def page_generation():
+    """Поколение кэша страниц, меняется при любой записи в контент.
+
+    Если ключ потерян, новое значение берется от времени, чтобы
+    не совпасть с поколениями, под которыми уже лежат страницы.
+    """
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def invalidate_pages():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        page_generation()
+
+
+def page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"pages:{path}"
+
+
+def is_fresh(entry, generation, timeout, now):
+    return entry["generation"] == generation and (
+        now - entry["created"] < timeout
+    )
+
+
+def regenerate(view, request, key, generation, timeout, *args, **kwargs):
+    start = time.perf_counter()
+    response = view(request, *args, **kwargs)
+    if response.status_code == 200:
+        cache.set(key, {
+            "content": response.content,
+            "content_type": response["Content-Type"],
+            "generation": generation,
+            "created": time.time(),
+        }, timeout + PAGE_MAX_STALENESS)
+    observe("yatube_page_regeneration_seconds", (),
+            time.perf_counter() - start)
+    return response
+
+
+def anonymous_page_cache(timeout):
+    """Кэширует GET-ответы для анонимных читателей.
+
+    Страницы авторизованных пользователей содержат персональные
+    ссылки и не кэшируются. Запись устаревает по timeout или при смене
+    поколения, но еще PAGE_MAX_STALENESS секунд отдается остальным
+    запросам, пока один воркер под блокировкой в общем кэше рендерит
+    страницу заново. Без блокировки кэш отдает свежую версию сразу.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.META.get(FRESH_PAGE_ENVIRON):
+                return view(request, *args, **kwargs)
+            if request.method != "GET" or request.user.is_authenticated:
+                response = view(request, *args, **kwargs)
+                patch_cache_control(response, private=True)
+                return response
+            key = page_key(request)
+            generation = page_generation()
+            now = time.time()
+            entry = cache.get(key)
+            if entry is not None and (
+                now - entry["created"] >= timeout + PAGE_MAX_STALENESS
+            ):
+                entry = None
+            if entry is not None and is_fresh(entry, generation, timeout,
+                                              now):
+                result = "hit"
+            elif entry is not None and not cache.add(
+                LOCK_PREFIX + key, 1, PAGE_REGENERATION_LOCK_TIMEOUT
+            ):
+                result = "stale"
+            else:
+                result = "miss"
+            inc("yatube_page_cache_total", (("result", result),))
+            if result == "miss":
+                try:
+                    response = regenerate(
+                        view, request, key, generation, timeout,
+                        *args, **kwargs
+                    )
+                finally:
+                    if entry is not None:
+                        cache.delete(LOCK_PREFIX + key)
+            else:
+                response = HttpResponse(
+                    entry["content"], content_type=entry["content_type"]
+                )
+            patch_cache_control(response, public=True, max_age=timeout)
+            patch_vary_headers(response, ("Cookie",))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,13 @@
+from django.utils.functional import SimpleLazyObject
+
+from .mentions import unread_count
+
+
+def notifications(request):
+    """Счетчик непрочитанных для шапки, запрос — только если он выведен."""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {"unread_notifications": 0}
+    return {
+        "unread_notifications": SimpleLazyObject(lambda: unread_count(user))
+    }
@@ -0,0 +1,67 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import F
+
+from .models import Post
+from .settings import VIEW_COUNTS_BATCH_SIZE, VIEW_COUNTS_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+_pending = Counter()
+_lock = threading.Lock()
+_flusher = None
+
+
+def record_view(post_id, using=DEFAULT_DB_ALIAS):
+    """Копит просмотр в памяти процесса, запись в БД делает фоновый поток."""
+    with _lock:
+        _pending[using, post_id] += 1
+    if _flusher is None or not _flusher.is_alive():
+        start_flusher()
+
+
+def flush_views():
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    # Посты шарда с одинаковым приростом обновляются одним UPDATE.
+    by_increment = defaultdict(list)
+    for (using, post_id), count in pending.items():
+        by_increment[using, count].append(post_id)
+    for (using, count), post_ids in by_increment.items():
+        for start in range(0, len(post_ids), VIEW_COUNTS_BATCH_SIZE):
+            Post.objects.using(using).filter(
+                pk__in=post_ids[start:start + VIEW_COUNTS_BATCH_SIZE]
+            ).update(views_count=F("views_count") + count)
+    return sum(pending.values())
+
+
+class ViewCountFlusher(threading.Thread):
+    daemon = True
+
+    def __init__(self, interval):
+        super().__init__(name="view-count-flusher")
+        self.interval = interval
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                flush_views()
+            except DatabaseError:
+                logger.exception("Не удалось записать счетчики просмотров")
+            finally:
+                connections.close_all()
+
+
+def start_flusher():
+    global _flusher
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = ViewCountFlusher(VIEW_COUNTS_FLUSH_INTERVAL)
+        _flusher.start()
@@ -0,0 +1,27 @@
+"""Пользователи и группы, помеченные на удаление.
+
+Пометка скрывает их из представлений сразу, а каскад разбирает
+команда process_deletions. Списки id лежат в общем кэше: их читает
+каждая лента.
+"""
+from django.core.cache import cache
+
+from .models import PendingDeletion
+
+
+def pending_key(kind):
+    return f"deletions:{kind}"
+
+
+def pending_ids(kind):
+    ids = cache.get(pending_key(kind))
+    if ids is None:
+        ids = frozenset(PendingDeletion.objects.filter(
+            kind=kind
+        ).values_list("object_id", flat=True))
+        cache.set(pending_key(kind), ids, None)
+    return ids
+
+
+def forget_pending(kind):
+    cache.delete(pending_key(kind))
@@ -0,0 +1,144 @@
+"""Выгрузка всех постов автора в zip: JSON и HTML на каждый пост.
+
+Посты читаются порциями по первичному ключу, а архив пишется
+в поток без перемотки, поэтому память не зависит от числа постов.
+Вложений у постов нет, в архив попадают только тексты.
+"""
+import datetime as dt
+import json
+import logging
+import os
+import tempfile
+import zipfile
+
+from django.contrib.sites.models import Site
+from django.core.mail import send_mail
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import DataExport
+from .settings import EXPORT_CHUNK_SIZE, EXPORT_REUSE_HOURS
+from .sharding import author_posts, with_related
+
+logger = logging.getLogger(__name__)
+
+
+class ZipStream:
+    """Файл только для записи: zipfile пишет сюда, генератор забирает."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_posts(user, chunk_size=EXPORT_CHUNK_SIZE):
+    posts = with_related(author_posts(user).order_by("pk"), "group")
+    last_pk = 0
+    while True:
+        chunk = list(posts.filter(pk__gt=last_pk)[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1].pk
+
+
+def export_post_count(user):
+    """Столько постов выгрузит iter_posts, скрытые тоже."""
+    return author_posts(user).count()
+
+
+def fresh_export(user):
+    """Архив в очереди или недавно собранный: второй не нужен."""
+    since = timezone.now() - dt.timedelta(hours=EXPORT_REUSE_HOURS)
+    return user.exports.filter(
+        Q(status=DataExport.PENDING)
+        | Q(status=DataExport.READY, finished__gte=since)
+    ).first()
+
+
+def post_data(post):
+    return {
+        "id": post.pk,
+        "text": post.text,
+        "pub_date": post.pub_date.isoformat(),
+        "group": post.group and {
+            "slug": post.group.slug,
+            "title": post.group.title,
+        },
+        "comment_count": post.comment_count,
+        "views_count": post.views_count,
+        "hidden": post.hidden,
+    }
+
+
+def export_chunks(user, chunk_size=EXPORT_CHUNK_SIZE):
+    """Куски zip-архива с постами автора по мере их готовности."""
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("profile.json", json.dumps({
+            "username": user.username,
+            "full_name": user.get_full_name(),
+            "exported": timezone.now().isoformat(),
+        }, ensure_ascii=False, indent=2))
+        for post in iter_posts(user, chunk_size):
+            archive.writestr(
+                f"posts/{post.pk}.json",
+                json.dumps(post_data(post), ensure_ascii=False, indent=2)
+            )
+            archive.writestr(
+                f"posts/{post.pk}.html",
+                render_to_string("export_post.html", {
+                    "post": post, "author": user
+                })
+            )
+            yield stream.pop()
+    yield stream.pop()
+
+
+def export_filename(user):
+    return f"{user.username}-posts.zip"
+
+
+def download_url(export):
+    path = reverse("export_download", args=[export.user.username, export.pk])
+    return f"http://{Site.objects.get_current().domain}{path}"
+
+
+def build_export(export):
+    """Пишет архив на диск и сообщает автору ссылку для скачивания."""
+    directory = os.path.dirname(export.path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(descriptor, "wb") as archive:
+            for chunk in export_chunks(export.user):
+                archive.write(chunk)
+        os.replace(temporary, export.path)
+    except Exception:
+        os.remove(temporary)
+        export.status = DataExport.FAILED
+        export.save(update_fields=["status"])
+        raise
+    export.status = DataExport.READY
+    export.finished = timezone.now()
+    export.save(update_fields=["status", "finished"])
+    if export.user.email:
+        send_mail(
+            "Архив ваших постов готов",
+            f"Скачать архив: {download_url(export)}",
+            None, [export.user.email]
+        )
+    logger.info("Архив %s для %s готов", export.pk, export.user.username)
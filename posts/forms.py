@@ -1,9 +1,49 @@
 from django import forms
+from django.urls import reverse_lazy
 
-from .models import Post
+from .groups import group_choices
+from .models import Comment, Group, Post
+
+
+class GroupAutocomplete(forms.Select):
+    """Select только с выбранной группой, остальные подгружает скрипт."""
+
+    def __init__(self, attrs=None):
+        super().__init__({
+            "data-autocomplete-url": reverse_lazy("group_autocomplete"),
+            **(attrs or {})
+        })
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [pk for pk in value if str(pk).isdigit()]
+        self.choices = [("", "---------")] + list(
+            Group.objects.filter(pk__in=selected).values_list("pk", "title")
+        )
+        return super().optgroups(name, value, attrs)
 
 
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ("group", "text")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        group = self.fields["group"]
+        choices = group_choices()
+        if choices is None:
+            group.widget = GroupAutocomplete()
+        else:
+            group.choices = [("", group.empty_label)] + choices
+
+
+class CommentForm(forms.ModelForm):
+    class Meta:
+        model = Comment
+        fields = ("text", "parent")
+        widgets = {"parent": forms.HiddenInput}
+
+    def __init__(self, *args, post=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if post is not None:
+            self.fields["parent"].queryset = post.comments.all()
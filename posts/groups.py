@@ -0,0 +1,144 @@
+import datetime as dt
+
+from django.core.cache import cache
+from django.db.models import Count, DateTimeField, F, Max, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .deletion import pending_ids
+from .models import Group, PendingDeletion, Post
+from .sharding import post_shards
+from .settings import (GROUP_ACTIVITY_DAYS, GROUP_AUTOCOMPLETE_SIZE,
+                       GROUP_CHOICES_LIMIT)
+
+GROUP_CHOICES_KEY = "groups:choices"
+
+DIRECTORY_ORDERING = {
+    "size": ("-post_count", "title"),
+    "activity": (F("last_post_at").desc(nulls_last=True), "title"),
+}
+
+
+def activity_since():
+    return timezone.now() - dt.timedelta(days=GROUP_ACTIVITY_DAYS)
+
+
+def adjust_group_stats(group_id, pub_date, delta):
+    changes = {"post_count": F("post_count") + delta}
+    if pub_date >= activity_since():
+        changes["posts_last_week"] = F("posts_last_week") + delta
+    if delta > 0:
+        pub_date = Value(pub_date, output_field=DateTimeField())
+        changes["last_post_at"] = Greatest(
+            Coalesce("last_post_at", pub_date), pub_date
+        )
+    Group.objects.filter(pk=group_id).update(**changes)
+    if delta < 0:
+        # Ушел самый свежий пост группы: дата берется у следующего.
+        latest = Group.objects.filter(pk=group_id, last_post_at__lte=pub_date)
+        if latest.exists():
+            latest.update(last_post_at=latest_group_post(group_id))
+
+
+def latest_group_post(group_id):
+    dates = [
+        Post.objects.using(alias).filter(
+            group_id=group_id, hidden=False
+        ).exclude(
+            author_id__in=pending_ids(PendingDeletion.USER)
+        ).aggregate(last=Max("pub_date"))["last"]
+        for alias in post_shards()
+    ]
+    return max((date for date in dates if date is not None), default=None)
+
+
+def reconcile_group_stats(groups=None, dry_run=False):
+    """Пересчитывает агрегаты групп по таблице постов.
+
+    Скрытые посты и посты удаляемых авторов не считаются, как и в лентах.
+
+    Возвращает число разошедшихся групп, с dry_run ничего не пишет.
+    """
+    # Группы живут в default, на шарды уходит список их id.
+    only = {"group__isnull": False, "hidden": False}
+    if groups is None:
+        groups = Group.objects.all()
+    else:
+        only = {
+            "group_id__in": list(groups.values_list("pk", flat=True)),
+            "hidden": False,
+        }
+    stats = {}
+    for alias in post_shards():
+        rows = Post.objects.using(alias).filter(**only).exclude(
+            author_id__in=pending_ids(PendingDeletion.USER)
+        ).values("group").annotate(
+            total=Count("pk"),
+            last=Max("pub_date"),
+            recent=Count("pk", filter=Q(pub_date__gte=activity_since()))
+        )
+        for row in rows:
+            merged = stats.setdefault(row["group"], row)
+            if merged is not row:
+                merged["total"] += row["total"]
+                merged["recent"] += row["recent"]
+                merged["last"] = max(merged["last"], row["last"])
+    changed = []
+    for group in groups.only(
+        "pk", "post_count", "last_post_at", "posts_last_week"
+    ):
+        row = stats.get(group.pk, {})
+        actual = (
+            row.get("total", 0), row.get("last"), row.get("recent", 0)
+        )
+        stored = (group.post_count, group.last_post_at, group.posts_last_week)
+        if actual != stored:
+            (group.post_count, group.last_post_at,
+             group.posts_last_week) = actual
+            changed.append(group)
+    if not dry_run:
+        Group.objects.bulk_update(
+            changed, ["post_count", "last_post_at", "posts_last_week"],
+            batch_size=500
+        )
+    return len(changed)
+
+
+def group_choices():
+    """Список (pk, title) для формы из кэша, None — если групп слишком много.
+
+    Выборка ограничена GROUP_CHOICES_LIMIT + 1 строкой, так что форма
+    никогда не читает всю таблицу групп.
+    """
+    cached = cache.get(GROUP_CHOICES_KEY)
+    if cached is None:
+        choices = list(Group.objects.exclude(
+            pk__in=pending_ids(PendingDeletion.GROUP)
+        ).order_by("search_title").values_list(
+            "pk", "title"
+        )[:GROUP_CHOICES_LIMIT + 1])
+        if len(choices) > GROUP_CHOICES_LIMIT:
+            choices = None
+        cached = {"choices": choices}
+        cache.set(GROUP_CHOICES_KEY, cached, None)
+    return cached["choices"]
+
+
+def invalidate_group_choices():
+    cache.delete(GROUP_CHOICES_KEY)
+
+
+def prefix_range(field, prefix):
+    # Диапазон вместо LIKE, чтобы поиск шел по обычному B-tree индексу.
+    return Q(**{f"{field}__gte": prefix, f"{field}__lt": prefix + "\uffff"})
+
+
+def search_groups(query):
+    query = query.strip().lower()
+    if not query:
+        return Group.objects.none()
+    return Group.objects.filter(
+        prefix_range("search_title", query) | prefix_range("slug", query)
+    ).exclude(
+        pk__in=pending_ids(PendingDeletion.GROUP)
+    ).order_by("search_title")[:GROUP_AUTOCOMPLETE_SIZE]
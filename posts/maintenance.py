@@ -0,0 +1,280 @@
+"""Обслуживание БД рядом с живым трафиком: сверка счетчиков, ANALYZE,
+VACUUM, проверки и размеры таблиц.
+
+Шаг — генератор, который делает работу срезами и после каждого
+отдает курсор. run_step сохраняет курсор в общем кэше, спит между
+срезами и останавливается по бюджету времени: следующий запуск
+продолжит с того же места. Так каждый шаг можно ставить в cron
+отдельно и не держать блокировку записи дольше одного среза.
+"""
+import logging
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+from .deletion import pending_ids
+from .groups import reconcile_group_stats
+from .models import Group, PendingDeletion, Post, PostArchive, User
+from .settings import (MAINTENANCE_ANALYSIS_LIMIT, MAINTENANCE_PAUSE,
+                       MAINTENANCE_SLICE_SIZE, MAINTENANCE_VACUUM_PAGES)
+from .sharding import post_shards
+
+logger = logging.getLogger(__name__)
+
+STEPS = {}
+SCOPE_FIELDS = {
+    PostArchive.SITE: None,
+    PostArchive.AUTHOR: "author_id",
+    PostArchive.GROUP: "group_id",
+}
+
+
+def maintenance_step(name):
+    def decorator(func):
+        STEPS[name] = func
+        return func
+    return decorator
+
+
+def cursor_key(name):
+    return f"maintenance:{name}:cursor"
+
+
+def run_step(name, budget=None, pause=MAINTENANCE_PAUSE, restart=False):
+    """Выполняет шаг до конца или до исчерпания budget секунд.
+
+    Возвращает отчет шага и признак, что шаг дошел до конца.
+    """
+    if restart:
+        cache.delete(cursor_key(name))
+    deadline = None if budget is None else time.monotonic() + budget
+    report = Counter()
+    for cursor in STEPS[name](cache.get(cursor_key(name)), report):
+        cache.set(cursor_key(name), cursor, None)
+        if deadline is not None and time.monotonic() >= deadline:
+            logger.info("Шаг %s прерван по времени на %s", name, cursor)
+            return report, False
+        time.sleep(pause)
+    cache.delete(cursor_key(name))
+    return report, True
+
+
+def resume(phases, cursor):
+    """Оставшиеся фазы шага и позиция внутри первой из них.
+
+    Курсор (фаза, None) значит, что фаза пройдена целиком.
+    """
+    if cursor is None or cursor[0] not in phases:
+        return phases, None
+    phase, position = cursor
+    start = phases.index(phase) + (position is None)
+    return phases[start:], position
+
+
+def id_slices(queryset, position, size=MAINTENANCE_SLICE_SIZE):
+    last_id = position or 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_id).order_by(
+            "pk"
+        ).values_list("pk", flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def monthly_counts(scope, ids=None):
+    """Посты по месяцам из таблицы постов всех шардов."""
+    field = SCOPE_FIELDS[scope]
+    fields = ("month",) if field is None else (field, "month")
+    counts = Counter()
+    for alias in post_shards():
+        posts = Post.objects.using(alias).filter(hidden=False).exclude(
+            author_id__in=pending_ids(PendingDeletion.USER)
+        )
+        if field is not None:
+            posts = posts.filter(**{f"{field}__in": ids})
+        rows = posts.annotate(month=TruncMonth("pub_date")).values(
+            *fields
+        ).annotate(total=Count("pk")).order_by()
+        for row in rows:
+            month = row["month"]
+            counts[row.get(field, 0), month.year, month.month] += row["total"]
+    return counts
+
+
+def sync_archive(scope, ids, report, fix):
+    """Сверяет сводную таблицу с таблицей постов для объектов ids."""
+    actual = monthly_counts(scope, ids)
+    stored = {
+        (row.object_id, row.year, row.month): row
+        for row in PostArchive.objects.filter(
+            scope=scope, object_id__in=ids if ids is not None else [0]
+        )
+    }
+    for key in stored.keys() | actual.keys():
+        row = stored.get(key)
+        count = actual.get(key, 0)
+        if (row.post_count if row else 0) == count:
+            continue
+        report[f"archive_{scope}_drift"] += 1
+        if not fix:
+            continue
+        if row is None:
+            object_id, year, month = key
+            PostArchive.objects.create(
+                scope=scope, object_id=object_id, year=year, month=month,
+                post_count=count
+            )
+        else:
+            PostArchive.objects.filter(pk=row.pk).update(post_count=count)
+
+
+def sync_comment_counts(alias, ids, report, fix):
+    posts = Post.objects.using(alias).filter(pk__in=ids).annotate(
+        actual=Count("comments")
+    ).values_list("pk", "comment_count", "actual")
+    for pk, stored, actual in posts:
+        if stored == actual:
+            continue
+        report["comment_count_drift"] += 1
+        if fix:
+            Post.objects.using(alias).filter(pk=pk).update(
+                comment_count=actual
+            )
+
+
+def counter_phases(cursor, report, fix):
+    phases = ["site", "authors", "groups"] + [
+        f"comments:{alias}" for alias in post_shards()
+    ]
+    phases, position = resume(phases, cursor)
+    for phase in phases:
+        if phase == "site":
+            sync_archive(PostArchive.SITE, None, report, fix)
+            yield phase, None
+        elif phase == "authors":
+            for ids in id_slices(User.objects.all(), position):
+                sync_archive(PostArchive.AUTHOR, ids, report, fix)
+                report["authors"] += len(ids)
+                yield phase, ids[-1]
+        elif phase == "groups":
+            for ids in id_slices(Group.objects.all(), position):
+                sync_archive(PostArchive.GROUP, ids, report, fix)
+                report["group_stats_drift"] += reconcile_group_stats(
+                    Group.objects.filter(pk__in=ids), dry_run=not fix
+                )
+                report["groups"] += len(ids)
+                yield phase, ids[-1]
+        else:
+            alias = phase.split(":", 1)[1]
+            posts = Post.objects.using(alias).all()
+            for ids in id_slices(posts, position):
+                sync_comment_counts(alias, ids, report, fix)
+                report["posts"] += len(ids)
+                yield phase, ids[-1]
+        position = None
+
+
+@maintenance_step("reconcile")
+def reconcile(cursor, report):
+    """Пересчитывает архив авторов, групп и сайта, агрегаты групп
+    и число комментариев постов там, где они разошлись."""
+    yield from counter_phases(cursor, report, fix=True)
+
+
+@maintenance_step("check")
+def check(cursor, report):
+    """quick_check каждой БД и сверка сводных данных без исправлений."""
+    aliases = [f"quick_check:{alias}" for alias in post_shards()]
+    phases, position = resume(aliases + ["summary"], cursor)
+    for phase in phases:
+        if phase == "summary":
+            for inner in counter_phases(position, report, fix=False):
+                yield phase, inner
+            return
+        alias = phase.split(":", 1)[1]
+        with connections[alias].cursor() as db:
+            db.execute("PRAGMA quick_check")
+            problems = [row[0] for row in db.fetchall() if row[0] != "ok"]
+        report[f"integrity_errors:{alias}"] += len(problems)
+        for problem in problems:
+            logger.error("quick_check %s: %s", alias, problem)
+        yield phase, None
+
+
+@maintenance_step("analyze")
+def analyze(cursor, report):
+    """ANALYZE по таблице за срез, с analysis_limit на большие индексы."""
+    phases = [
+        (alias, table)
+        for alias in post_shards()
+        for table in sorted(connections[alias].introspection.table_names())
+    ]
+    phases, position = resume(phases, cursor)
+    for alias, table in phases:
+        with connections[alias].cursor() as db:
+            db.execute(f"PRAGMA analysis_limit = {MAINTENANCE_ANALYSIS_LIMIT}")
+            db.execute(f'ANALYZE "{table}"')
+        report["tables_analyzed"] += 1
+        yield (alias, table), None
+
+
+@maintenance_step("vacuum")
+def vacuum(cursor, report):
+    """incremental_vacuum порциями страниц, пока есть свободные.
+
+    Работает только в БД с auto_vacuum = INCREMENTAL, остальные
+    попадают в отчет. Режим включается при каждом подключении, так что
+    для старой БД достаточно одного полного VACUUM в окно обслуживания.
+    """
+    phases, position = resume(list(post_shards()), cursor)
+    for alias in phases:
+        with connections[alias].cursor() as db:
+            db.execute("PRAGMA auto_vacuum")
+            if db.fetchone()[0] != 2:
+                report[f"auto_vacuum_disabled:{alias}"] = 1
+                continue
+            while True:
+                db.execute("PRAGMA freelist_count")
+                free = db.fetchone()[0]
+                if not free:
+                    break
+                db.execute(
+                    f"PRAGMA incremental_vacuum({MAINTENANCE_VACUUM_PAGES})"
+                )
+                db.fetchall()
+                report[f"pages_freed:{alias}"] += min(
+                    free, MAINTENANCE_VACUUM_PAGES
+                )
+                yield alias, free
+
+
+@maintenance_step("sizes")
+def sizes(cursor, report):
+    """Размер таблиц и индексов в байтах по виртуальной таблице dbstat.
+
+    SQLite без SQLITE_ENABLE_DBSTAT_VTAB dbstat не знает: тогда
+    в отчет попадает только размер всей БД из page_count и page_size.
+    """
+    phases, position = resume(list(post_shards()), cursor)
+    for alias in phases:
+        with connections[alias].cursor() as db:
+            try:
+                db.execute(
+                    "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"
+                )
+            except OperationalError:
+                report[f"dbstat_unavailable:{alias}"] = 1
+                db.execute("PRAGMA page_count")
+                page_count = db.fetchone()[0]
+                db.execute("PRAGMA page_size")
+                report[f"{alias}:total"] = page_count * db.fetchone()[0]
+            else:
+                for name, size in db.fetchall():
+                    report[f"{alias}:{name}"] = size
+        yield alias, None
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.settings import TAG_BACKFILL_BATCH_SIZE
+from posts.tags import backfill_tags
+
+
+class Command(BaseCommand):
+    help = "Строит индекс хэштегов по уже опубликованным постам"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int,
+                            default=TAG_BACKFILL_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        posts, changed = backfill_tags(options["batch_size"])
+        self.stdout.write(
+            f"Просмотрено постов: {posts}, изменено строк индекса: {changed}"
+        )
@@ -0,0 +1,78 @@
+import json
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, teardown_databases
+
+from posts.benchmarks import BENCHMARKS, compare_results, run_benchmarks, seed
+from yatube.testing import isolated_files_settings
+
+
+class Command(BaseCommand):
+    help = ("Замеряет представления, шаблоны и запросы на сгенерированных "
+            "данных во временной базе и сравнивает с базовой линией")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--save", metavar="PATH",
+                            help="сохранить результаты в JSON")
+        parser.add_argument("--compare", metavar="PATH",
+                            help="сравнить с сохраненной базовой линией")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="допустимый рост медианы, доля")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--posts", type=int, default=1200)
+        parser.add_argument("names", nargs="*",
+                            help="запустить только эти замеры")
+
+    def handle(self, *args, **options):
+        names = options["names"] or None
+        unknown = set(names or ()) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Неизвестные замеры: {', '.join(unknown)}")
+        # Временные базы для default и всех шардов постов: seed пишет
+        # на шард автора, и рабочие базы не должны это увидеть. Кэш
+        # страниц тоже временный.
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases=set(settings.POST_SHARDS)
+        )
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                with isolated_files_settings(directory):
+                    data = seed(posts=options["posts"])
+                    results = run_benchmarks(
+                        data, names, options["repeat"]
+                    )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        if options["save"]:
+            with open(options["save"], "w") as baseline_file:
+                json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+        if not options["compare"]:
+            for name, result in results["results"].items():
+                self.stdout.write(
+                    f"{name:<40} {result['median'] * 1000:10.3f} ms"
+                )
+            return
+
+        with open(options["compare"]) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = 0
+        for name, before, after, change, regressed in compare_results(
+            baseline, results, options["threshold"]
+        ):
+            if before is None:
+                self.stdout.write(
+                    f"{name:<40} {after * 1000:10.3f} ms  (новый)"
+                )
+                continue
+            line = (f"{name:<40} {before * 1000:10.3f} ms -> "
+                    f"{after * 1000:10.3f} ms  {change:+.1%}")
+            if regressed:
+                regressions += 1
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        if regressions:
+            raise CommandError(f"Замедлилось замеров: {regressions}")
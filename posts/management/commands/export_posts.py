@@ -0,0 +1,47 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import build_export, export_post_count
+from posts.models import DataExport
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Собирает архивы постов, запрошенные авторами"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user",
+                            help="поставить в очередь архив этого автора")
+
+    def handle(self, *args, **options):
+        if options["user"]:
+            try:
+                user = get_user_model().objects.get(
+                    username=options["user"]
+                )
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Нет пользователя {options['user']}")
+            DataExport.objects.create(
+                user=user, post_count=export_post_count(user)
+            )
+        pending = DataExport.objects.filter(
+            status=DataExport.PENDING
+        ).select_related("user").order_by("created")
+        failed = 0
+        for export in pending:
+            # Ошибка одного архива не останавливает остальную очередь.
+            try:
+                build_export(export)
+            except Exception:
+                logger.exception("Архив %s для %s не собран",
+                                 export.pk, export.user.username)
+                failed += 1
+                continue
+            self.stdout.write(
+                f"{export.user.username}: {export.path}"
+            )
+        if failed:
+            raise CommandError(f"Не собрано архивов: {failed}")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts.maintenance import STEPS, run_step
+from posts.settings import MAINTENANCE_PAUSE
+
+
+class Command(BaseCommand):
+    help = "Обслуживание БД срезами: reconcile, check, analyze, vacuum, sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("steps", nargs="+", choices=list(STEPS))
+        parser.add_argument("--budget", type=float,
+                            help="секунд на каждый шаг, потом он прервется "
+                                 "и продолжится при следующем запуске")
+        parser.add_argument("--pause", type=float, default=MAINTENANCE_PAUSE,
+                            help="пауза между срезами в секундах")
+        parser.add_argument("--restart", action="store_true",
+                            help="начать шаги заново, а не с курсора")
+
+    def handle(self, *args, **options):
+        for name in options["steps"]:
+            report, finished = run_step(
+                name, options["budget"], options["pause"], options["restart"]
+            )
+            state = "завершен" if finished else "прерван по времени"
+            self.stdout.write(f"{name}: {state}")
+            for key, value in sorted(report.items()):
+                self.stdout.write(f"  {key}: {value}")
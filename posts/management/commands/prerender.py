@@ -0,0 +1,31 @@
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import PageChange
+from posts.settings import STATIC_PAGES_BATCH_SIZE
+from posts.static_pages import all_paths, drain_changes
+
+
+class Command(BaseCommand):
+    help = "Рендерит статические страницы из очереди изменений"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="собрать каталог заново со всеми "
+                                 "публичными страницами")
+        parser.add_argument("--batch-size", type=int,
+                            default=STATIC_PAGES_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            shutil.rmtree(settings.STATIC_PAGES_DIR, ignore_errors=True)
+            PageChange.objects.bulk_create(
+                [PageChange(path=path) for path in set(all_paths())],
+                ignore_conflicts=True
+            )
+        written, removed = drain_changes(options["batch_size"])
+        self.stdout.write(
+            f"Страниц записано: {written}, удалено: {removed}"
+        )
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.models import PendingDeletion
+from posts.moderation import process_deletion
+from posts.settings import (DELETION_CHUNK_SIZE, DELETION_PAUSE,
+                            DELETION_POLL_INTERVAL)
+
+
+class Command(BaseCommand):
+    help = "Разбирает каскады удаления пользователей и групп порциями"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int,
+                            default=DELETION_CHUNK_SIZE)
+        parser.add_argument("--pause", type=float, default=DELETION_PAUSE,
+                            help="пауза между порциями в секундах")
+        parser.add_argument("--once", action="store_true",
+                            help="разобрать очередь и завершиться")
+
+    def handle(self, *args, **options):
+        while True:
+            for deletion in PendingDeletion.objects.all():
+                process_deletion(
+                    deletion, options["chunk_size"], options["pause"]
+                )
+                self.stdout.write(f"Удалено: {deletion}")
+            if options["once"]:
+                return
+            time.sleep(DELETION_POLL_INTERVAL)
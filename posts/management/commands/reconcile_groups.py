@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.groups import reconcile_group_stats
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает число постов и активность групп"
+
+    def handle(self, *args, **options):
+        changed = reconcile_group_stats()
+        self.stdout.write(f"Обновлено групп: {changed}")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.settings import RELATED_BATCH_SIZE
+from posts.tfidf import drain_related_changes, update_related
+
+
+class Command(BaseCommand):
+    help = "Считает похожие посты по TF-IDF для новых и измененных постов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="пересчитать списки всех постов")
+        parser.add_argument("--batch-size", type=int,
+                            default=RELATED_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            updated = update_related(batch_size=options["batch_size"])
+        else:
+            updated = drain_related_changes(options["batch_size"])
+        self.stdout.write(f"Обновлено постов: {updated}")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from posts.caching import invalidate_pages
+from posts.sharding import (misplaced_authors, move_author, post_shards,
+                            sync_sequences)
+
+
+class Command(BaseCommand):
+    help = "Переносит посты авторов на шарды, выбранные по POST_SHARDS"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retired", nargs="+", default=[],
+                            help="алиасы, выведенные из POST_SHARDS, "
+                                 "с которых нужно забрать посты")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="только показать, кто куда переедет")
+
+    def handle(self, *args, **options):
+        aliases = [*post_shards(), *options["retired"]]
+        if len(aliases) > 1 and not options["dry_run"]:
+            sync_sequences(aliases)
+        authors = posts = 0
+        for author_id, source, target in list(misplaced_authors(aliases)):
+            self.stdout.write(f"Автор {author_id}: {source} -> {target}")
+            if options["dry_run"]:
+                continue
+            posts += move_author(author_id, source, target)
+            authors += 1
+        if authors:
+            invalidate_pages()
+        self.stdout.write(f"Перенесено авторов: {authors}, постов: {posts}")
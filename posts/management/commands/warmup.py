@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Прогревает URL, шаблоны и соединения и печатает время шагов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefill", action="store_true",
+                            help="заполнить кэш страниц горячими лентами")
+
+    def handle(self, *args, **options):
+        report = warm_up(prefill=options["prefill"])
+        for name, seconds in report.items():
+            self.stdout.write(f"{name:<12} {seconds * 1000:8.1f} ms")
@@ -0,0 +1,136 @@
+"""Уведомления об упоминаниях @username в постах.
+
+Число запросов не зависит от числа упоминаний: имена разрешаются
+одним запросом, уведомления пишутся bulk_create, а счетчики
+непрочитанного в Inbox растут одним UPDATE на порцию получателей.
+Поэтому пост с сотнями упоминаний сохраняется почти так же быстро,
+как обычный.
+
+Уведомления есть только у видимых постов: скрытие поста и пометка
+автора удаленным убирают их вместе с долей в счетчиках.
+"""
+import re
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import Inbox, Notification, Post, User
+from .settings import MENTION_BATCH_SIZE
+from .sharding import shard_for_author
+
+# Символы имени пользователя Django; точка в конце — уже не имя.
+MENTION_RE = re.compile(r"(?<![\w@/.])@([\w.+-]*[\w+-])")
+USERNAME_MAX_LENGTH = User._meta.get_field("username").max_length
+
+
+def extract_mentions(text):
+    return {
+        name for name in MENTION_RE.findall(text)
+        if len(name) <= USERNAME_MAX_LENGTH
+    }
+
+
+def notify_mentions(post, previous_text=""):
+    """Уведомляет упомянутых в post, кроме уже упомянутых до правки.
+
+    Возвращает число созданных уведомлений.
+    """
+    names = extract_mentions(post.text) - extract_mentions(previous_text)
+    if not names:
+        return 0
+    recipients = list(User.objects.filter(
+        username__in=names, is_active=True
+    ).exclude(pk=post.author_id).values_list("pk", flat=True))
+    for start in range(0, len(recipients), MENTION_BATCH_SIZE):
+        batch = recipients[start:start + MENTION_BATCH_SIZE]
+        with transaction.atomic():
+            Notification.objects.bulk_create([
+                Notification(recipient_id=pk, author_id=post.author_id,
+                             post_id=post.pk)
+                for pk in batch
+            ])
+            Inbox.objects.bulk_create(
+                [Inbox(user_id=pk) for pk in batch], ignore_conflicts=True
+            )
+            Inbox.objects.filter(user_id__in=batch).update(
+                unread=F("unread") + 1
+            )
+    return len(recipients)
+
+
+def forget_mentions(post_ids=None, author_id=None):
+    """Удаляет уведомления о постах и вычитает непрочитанные из счетчиков.
+
+    Удаленные или скрытые посты передаются списком id, все посты
+    автора — author_id.
+    """
+    if author_id is None:
+        notifications = Notification.objects.filter(post_id__in=post_ids)
+    else:
+        notifications = Notification.objects.filter(author_id=author_id)
+    with transaction.atomic():
+        unread = notifications.filter(
+            Q(recipient__inbox__last_seen__isnull=True)
+            | Q(created__gt=F("recipient__inbox__last_seen"))
+        ).values("recipient_id").annotate(total=Count("pk")).order_by()
+        for row in unread:
+            Inbox.objects.filter(user_id=row["recipient_id"]).update(
+                unread=F("unread") - row["total"]
+            )
+        notifications.delete()
+
+
+def unread_count(user):
+    return Inbox.objects.filter(user=user).values_list(
+        "unread", flat=True
+    ).first() or 0
+
+
+def mark_read(user):
+    """Отмечает прочитанным все до последнего уведомления.
+
+    Возвращает прежний last_seen: уведомления новее него непрочитаны.
+    Счетчик уменьшается на число отмеченных, а не обнуляется:
+    уведомление, пришедшее между чтением и записью, останется новым.
+    """
+    with transaction.atomic():
+        inbox = Inbox.objects.select_for_update().filter(user=user).first()
+        if inbox is None:
+            return None
+        notifications = user.notifications.all()
+        if inbox.last_seen is not None:
+            notifications = notifications.filter(
+                created__gt=inbox.last_seen
+            )
+        newest = notifications.values_list("created", flat=True).first()
+        if newest is not None:
+            read = notifications.filter(created__lte=newest).count()
+            Inbox.objects.filter(user=user).update(
+                unread=F("unread") - read, last_seen=newest
+            )
+    return inbox.last_seen
+
+
+def attach_posts(notifications):
+    """Подгружает посты уведомлений с шардов, пропавшие отбрасывает."""
+    by_shard = defaultdict(list)
+    for notification in notifications:
+        by_shard[shard_for_author(notification.author_id)].append(
+            notification.post_id
+        )
+    posts = {}
+    for alias, post_ids in by_shard.items():
+        posts.update(
+            (post.pk, post) for post in Post.objects.using(alias).filter(
+                pk__in=post_ids, hidden=False
+            )
+        )
+    attached = []
+    for notification in notifications:
+        post = posts.get(notification.post_id)
+        if post is not None:
+            post.author = notification.author
+            notification.post = post
+            attached.append(notification)
+    return attached
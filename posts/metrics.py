@@ -0,0 +1,245 @@
+"""Метрики в текстовом формате Prometheus без внешних сервисов.
+
+Потоки процесса пишут в один Counter под блокировкой: она держится
+на одно сложение и почти не ждет. Процесс раз в METRICS_FLUSH_INTERVAL
+секунд сбрасывает счетчики в свой файл в каталоге METRICS_DIR,
+а /metrics складывает файлы всех воркеров.
+Счетчики накопительные, поэтому файлы завершившихся воркеров
+остаются до очистки каталога при деплое.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .settings import METRICS_FLUSH_INTERVAL
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+METRICS = {
+    "yatube_requests_total": (
+        "counter", "Число обработанных запросов.", None
+    ),
+    "yatube_request_duration_seconds": (
+        "histogram", "Время обработки запроса.", LATENCY_BUCKETS
+    ),
+    "yatube_request_queries": (
+        "histogram", "Число SQL-запросов на запрос.", QUERY_COUNT_BUCKETS
+    ),
+    "yatube_request_query_seconds": (
+        "histogram", "Время SQL-запросов на запрос.", LATENCY_BUCKETS
+    ),
+    "yatube_template_render_seconds": (
+        "histogram", "Время рендеринга шаблона.", LATENCY_BUCKETS
+    ),
+    "yatube_page_cache_total": (
+        "counter", "Обращения к кэшу страниц: hit, miss и stale.", None
+    ),
+    "yatube_page_regeneration_seconds": (
+        "histogram", "Время рендеринга страницы для кэша.", LATENCY_BUCKETS
+    ),
+    "yatube_errors_total": (
+        "counter", "Исключения и ответы 5xx.", None
+    ),
+}
+
+_totals = Counter()
+_lock = threading.Lock()
+_process = {}
+
+
+def _reset_process():
+    # Блокировку мог держать поток родителя, которого в потомке нет.
+    global _lock
+    _lock = threading.Lock()
+    _totals.clear()
+    _process.update(
+        name=f"{os.getpid()}-{uuid.uuid4().hex[:8]}", flushed_at=0
+    )
+
+
+_reset_process()
+# После fork потомок не должен повторно отдать счетчики родителя.
+os.register_at_fork(after_in_child=_reset_process)
+
+
+def inc(name, labels=(), amount=1):
+    with _lock:
+        _totals[name, labels] += amount
+
+
+def observe(name, labels, value):
+    buckets = METRICS[name][2]
+    index = bisect_left(buckets, value)
+    le = format_value(buckets[index]) if index < len(buckets) else "+Inf"
+    with _lock:
+        _totals[name + "_bucket", labels + (("le", le),)] += 1
+        _totals[name + "_sum", labels] += value
+        _totals[name + "_count", labels] += 1
+
+
+def process_totals():
+    with _lock:
+        return Counter(_totals)
+
+
+def can_read_metrics(request):
+    """/metrics видят сотрудники и сборщик метрик с INTERNAL_IPS."""
+    return (
+        request.user.is_staff
+        or request.META.get("REMOTE_ADDR") in settings.INTERNAL_IPS
+    )
+
+
+def metrics_path(name):
+    return os.path.join(settings.METRICS_DIR, f"{name}.json")
+
+
+def flush_metrics():
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    data = [
+        [series, [list(label) for label in labels], value]
+        for (series, labels), value in process_totals().items()
+    ]
+    fd, tmp_path = tempfile.mkstemp(dir=settings.METRICS_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w") as tmp:
+        json.dump(data, tmp)
+    os.replace(tmp_path, metrics_path(_process["name"]))
+    _process["flushed_at"] = time.monotonic()
+
+
+def maybe_flush_metrics():
+    if time.monotonic() - _process["flushed_at"] >= METRICS_FLUSH_INTERVAL:
+        flush_metrics()
+
+
+def collect():
+    """Сумма счетчиков всех процессов, у текущего — свежие значения."""
+    flush_metrics()
+    totals = Counter()
+    for name in os.listdir(settings.METRICS_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(settings.METRICS_DIR, name)) as source:
+                data = json.load(source)
+        except (OSError, ValueError):
+            continue
+        for series, labels, value in data:
+            totals[series, tuple(tuple(label) for label in labels)] += value
+    return totals
+
+
+def format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\")
+                         .replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+def render_metrics(totals):
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "counter":
+            for (series, labels), value in sorted(totals.items()):
+                if series == name:
+                    lines.append(
+                        f"{name}{format_labels(labels)} {format_value(value)}"
+                    )
+            continue
+        series_labels = sorted(
+            labels for series, labels in totals if series == name + "_count"
+        )
+        bounds = [format_value(bound) for bound in buckets] + ["+Inf"]
+        for labels in series_labels:
+            cumulative = 0
+            for le in bounds:
+                cumulative += totals[name + "_bucket", labels + (("le", le),)]
+                lines.append("{}_bucket{} {}".format(
+                    name, format_labels(labels + (("le", le),)), cumulative
+                ))
+            for suffix in ("_sum", "_count"):
+                lines.append("{}{}{} {}".format(
+                    name, suffix, format_labels(labels),
+                    format_value(totals[name + suffix, labels])
+                ))
+    return "\n".join(lines) + "\n"
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.total += time.perf_counter() - start
+
+
+def view_label(request):
+    match = request.resolver_match
+    if match is None:
+        return "unresolved"
+    return match.url_name or match.view_name
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        labels = (("view", view_label(request)),)
+        inc("yatube_requests_total", labels + (
+            ("method", request.method), ("status", str(response.status_code))
+        ))
+        observe("yatube_request_duration_seconds", labels, duration)
+        observe("yatube_request_queries", labels, queries.count)
+        observe("yatube_request_query_seconds", labels, queries.total)
+        # Исключение уже посчитано в process_exception под своим именем.
+        if response.status_code >= 500 and not getattr(
+            request, "_metrics_exception", False
+        ):
+            inc("yatube_errors_total", labels + (("reason", "status_5xx"),))
+        maybe_flush_metrics()
+        return response
+
+    def process_exception(self, request, exception):
+        request._metrics_exception = True
+        inc("yatube_errors_total", (
+            ("view", view_label(request)),
+            ("reason", type(exception).__name__),
+        ))
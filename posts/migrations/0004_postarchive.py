@@ -0,0 +1,55 @@
+# Generated by Django 2.2.6 on 2026-10-19 10:09
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_archive(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    PostArchive = apps.get_model("posts", "PostArchive")
+    counts = Counter()
+    posts = Post.objects.values_list("author_id", "group_id", "pub_date")
+    for author_id, group_id, pub_date in posts.iterator():
+        pub_date = timezone.localtime(pub_date)
+        month = (pub_date.year, pub_date.month)
+        counts[("site", 0) + month] += 1
+        counts[("author", author_id) + month] += 1
+        if group_id is not None:
+            counts[("group", group_id) + month] += 1
+    PostArchive.objects.bulk_create([
+        PostArchive(scope=scope, object_id=object_id, year=year,
+                    month=month, post_count=post_count)
+        for (scope, object_id, year, month), post_count in counts.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_auto_20201206_1245'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='post',
+            options={'ordering': ['-pub_date']},
+        ),
+        migrations.CreateModel(
+            name='PostArchive',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('site', 'Весь сайт'), ('group', 'Группа'), ('author', 'Автор')], max_length=10)),
+                ('object_id', models.PositiveIntegerField(default=0)),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('post_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-year', '-month'],
+                'unique_together': {('scope', 'object_id', 'year', 'month')},
+            },
+        ),
+        migrations.RunPython(fill_archive, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.6 on 2026-10-19 10:10
+
+import datetime as dt
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model("posts", "Group")
+    week_ago = timezone.now() - dt.timedelta(days=7)
+    groups = Group.objects.annotate(
+        total=Count("posts"),
+        last=Max("posts__pub_date"),
+        recent=Count("posts", filter=Q(posts__pub_date__gte=week_ago))
+    )
+    for group in groups.iterator():
+        Group.objects.filter(pk=group.pk).update(
+            post_count=group.total,
+            last_post_at=group.last,
+            posts_last_week=group.recent
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_postarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='last_post_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_last_week',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['-post_count'], name='posts_group_post_co_d99cf9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['-last_post_at'], name='posts_group_last_po_a493fa_idx'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
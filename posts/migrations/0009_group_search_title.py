@@ -0,0 +1,26 @@
+# Generated by Django 2.2.6 on 2026-10-19 10:29
+
+from django.db import migrations, models
+
+
+def fill_search_title(apps, schema_editor):
+    # lower() в SQLite не знает кириллицы, поэтому приводим в Python.
+    Group = apps.get_model("posts", "Group")
+    for pk, title in Group.objects.values_list("pk", "title").iterator():
+        Group.objects.filter(pk=pk).update(search_title=title.lower())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='search_title',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(fill_search_title, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.6 on 2026-10-19 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_data_export'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hidden',
+            field=models.BooleanField(default=False, verbose_name='Скрыт модератором'),
+        ),
+    ]
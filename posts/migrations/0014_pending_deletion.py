@@ -0,0 +1,26 @@
+# Generated by Django 2.2.6 on 2026-10-19 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_hidden'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingDeletion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'Пользователь'), ('group', 'Группа')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['created'],
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+    ]
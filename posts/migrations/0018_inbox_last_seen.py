@@ -0,0 +1,34 @@
+# Generated by Django 2.2.6 on 2026-10-19 11:12
+
+from django.db import migrations, models
+
+
+def fill_last_seen(apps, schema_editor):
+    # Раньше новыми были первые unread уведомлений ленты: прочитано
+    # все, начиная со следующего.
+    Inbox = apps.get_model("posts", "Inbox")
+    Notification = apps.get_model("posts", "Notification")
+    for inbox in Inbox.objects.iterator():
+        seen = Notification.objects.filter(
+            recipient_id=inbox.user_id
+        ).order_by("-created", "-pk").values_list(
+            "created", flat=True
+        )[inbox.unread:inbox.unread + 1]
+        if seen:
+            Inbox.objects.filter(pk=inbox.pk).update(last_seen=seen[0])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inbox',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_last_seen, migrations.RunPython.noop),
+    ]
@@ -1,36 +1,349 @@
+import datetime as dt
+import os
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .settings import COMMENT_PATH_STEP, TAG_MAX_LENGTH
+
 User = get_user_model()
 
 
+class ShardedQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        # Без явного using() шард выберет роутер по самому объекту,
+        # а не по запросу без подсказок, как в QuerySet.create().
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
 class Post(models.Model):
     text = models.TextField(
                     verbose_name="Текст поста",
                     help_text="Поделитесь своими мыслями с миром"
                     )
     pub_date = models.DateTimeField("date published", auto_now_add=True)
+    # Посты могут лежать на шарде без строк пользователей и групп,
+    # поэтому ссылки на них без ограничений внешнего ключа в БД.
     author = models.ForeignKey(User, on_delete=models.CASCADE,
-                               related_name="posts")
+                               related_name="posts", db_constraint=False)
     group = models.ForeignKey("Group", on_delete=models.SET_NULL,
                               related_name="posts", blank=True,
-                              null=True, verbose_name="Название группы",
+                              null=True, db_constraint=False,
+                              verbose_name="Название группы",
                               help_text="Выберите группу интересов")
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    views_count = models.PositiveIntegerField(default=0, editable=False)
+    hidden = models.BooleanField("Скрыт модератором", default=False)
+
+    objects = ShardedQuerySet.as_manager()
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ["-pub_date", "-pk"]
+        indexes = [
+            models.Index(fields=["-views_count", "-pub_date"]),
+            models.Index(fields=["pub_date", "id"]),
+            models.Index(fields=["group", "pub_date", "id"]),
+            models.Index(fields=["author", "pub_date", "id"]),
+        ]
 
     def __str__(self):
 
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # С несколькими шардами id выдает общая последовательность,
+        # чтобы пост сохранял адрес при переносе на другой шард.
+        if self.pk is None and len(settings.POST_SHARDS) > 1:
+            self.pk = PostId.objects.create().pk
+            kwargs["force_insert"] = True
+        super().save(*args, **kwargs)
+
 
 class Group(models.Model):
 
     title = models.CharField(max_length=200)
+    search_title = models.CharField(max_length=200, db_index=True,
+                                    default="", editable=False)
     slug = models.SlugField(null=False, unique=True)
     description = models.TextField()
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+    last_post_at = models.DateTimeField(null=True, blank=True,
+                                        editable=False)
+    posts_last_week = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-post_count"]),
+            models.Index(fields=["-last_post_at"]),
+        ]
 
     def __str__(self):
 
         return self.title
+
+    def save(self, *args, **kwargs):
+        self.search_title = self.title.lower()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "title" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "search_title"}
+        super().save(*args, **kwargs)
+
+
+class Comment(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="comments")
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name="comments", db_constraint=False)
+    parent = models.ForeignKey("self", on_delete=models.CASCADE,
+                               related_name="replies", blank=True,
+                               null=True)
+    text = models.TextField(verbose_name="Текст комментария")
+    created = models.DateTimeField("date published", auto_now_add=True)
+    path = models.CharField(max_length=255, editable=False, default="")
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["path"]
+        indexes = [models.Index(fields=["post", "path"])]
+
+    def __str__(self):
+
+        return self.text[:15]
+
+    def save(self, *args, **kwargs):
+        # Материализованный путь из id предков: сортировка по нему
+        # выдает всё дерево комментариев поста в порядке обхода.
+        creating = self.pk is None
+        if creating and len(settings.POST_SHARDS) > 1:
+            self.pk = CommentId.objects.create().pk
+            kwargs["force_insert"] = True
+        super().save(*args, **kwargs)
+        if creating:
+            path = f"{self.pk:0{COMMENT_PATH_STEP}d}"
+            if self.parent is not None:
+                path = f"{self.parent.path}/{path}"
+            self.path = path
+            Comment.objects.using(self._state.db).filter(
+                pk=self.pk
+            ).update(path=self.path)
+
+    @property
+    def depth(self):
+        return self.path.count("/")
+
+
+class PostArchive(models.Model):
+    SITE = "site"
+    GROUP = "group"
+    AUTHOR = "author"
+    SCOPE_CHOICES = (
+        (SITE, "Весь сайт"),
+        (GROUP, "Группа"),
+        (AUTHOR, "Автор"),
+    )
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    object_id = models.PositiveIntegerField(default=0)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-year", "-month"]
+        unique_together = ("scope", "object_id", "year", "month")
+
+    def __str__(self):
+
+        return f"{self.scope}:{self.object_id} {self.year}-{self.month:02}"
+
+    @property
+    def date(self):
+        return dt.date(self.year, self.month, 1)
+
+
+class PostId(models.Model):
+    """Последовательность id постов в default при нескольких шардах."""
+
+
+class CommentId(models.Model):
+    """Последовательность id комментариев в default при нескольких шардах."""
+
+
+class PageChange(models.Model):
+    """Адрес статической страницы, которую нужно отрендерить заново."""
+
+    path = models.CharField(max_length=300, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["pk"]
+
+    def __str__(self):
+
+        return self.path
+
+
+class DataExport(models.Model):
+    """Архив постов автора, который собирает команда export_posts."""
+
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "В очереди"),
+        (READY, "Готов"),
+        (FAILED, "Ошибка"),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="exports")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=PENDING)
+    post_count = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created"]
+
+    def __str__(self):
+
+        return f"{self.user} {self.created:%Y-%m-%d} {self.status}"
+
+    @property
+    def path(self):
+        return os.path.join(settings.EXPORTS_DIR, f"{self.pk}.zip")
+
+
+class PendingDeletion(models.Model):
+    """Пользователь или группа, чей каскад удаления еще не разобран."""
+
+    USER = "user"
+    GROUP = "group"
+    KIND_CHOICES = (
+        (USER, "Пользователь"),
+        (GROUP, "Группа"),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["created"]
+        unique_together = ("kind", "object_id")
+
+    def __str__(self):
+
+        return f"{self.kind}:{self.object_id}"
+
+
+class RelatedPost(models.Model):
+    """Похожий пост из офлайн-расчета команды related_posts.
+
+    Строка хранит автора соседа, чтобы блок на странице поста
+    строился одним запросом по индексу (post_id, rank).
+    """
+
+    post_id = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    related_id = models.PositiveIntegerField(db_index=True)
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name="+")
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ["post_id", "rank"]
+        unique_together = ("post_id", "rank")
+
+    def __str__(self):
+
+        return f"{self.post_id} -> {self.related_id}"
+
+
+class RelatedPostChange(models.Model):
+    """Новый или измененный пост, которому нужно пересчитать соседей."""
+
+    post_id = models.PositiveIntegerField(unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["pk"]
+
+    def __str__(self):
+
+        return str(self.post_id)
+
+
+class Tag(models.Model):
+    """Хэштег из текста постов, post_count — число видимых постов с ним."""
+
+    name = models.CharField(max_length=TAG_MAX_LENGTH, unique=True)
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+
+    def __str__(self):
+
+        return self.name
+
+
+class PostTag(models.Model):
+    """Строка обратного индекса тег → пост в порядке публикации.
+
+    Индекс лежит в default рядом с тегами, автор нужен, чтобы найти
+    шард поста. Скрытые посты в индекс не попадают.
+    """
+
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE,
+                            related_name="entries")
+    post_id = models.PositiveIntegerField(db_index=True)
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name="+")
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("tag", "post_id")
+        indexes = [models.Index(fields=["tag", "pub_date", "post_id"])]
+
+    def __str__(self):
+
+        return f"{self.tag_id}:{self.post_id}"
+
+
+class Notification(models.Model):
+    """Упоминание пользователя в посте."""
+
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE,
+                                  related_name="notifications")
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name="+")
+    post_id = models.PositiveIntegerField(db_index=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created", "-pk"]
+        indexes = [models.Index(fields=["recipient", "created"])]
+
+    def __str__(self):
+
+        return f"{self.recipient_id}: {self.post_id}"
+
+
+class Inbox(models.Model):
+    """Счетчик непрочитанных уведомлений, чтобы не считать их COUNT.
+
+    Непрочитанные — пришедшие позже last_seen, unread — их число.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name="inbox")
+    unread = models.PositiveIntegerField(default=0)
+    last_seen = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+
+        return f"{self.user_id}: {self.unread}"
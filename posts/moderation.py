@@ -0,0 +1,250 @@
+"""Массовая модерация постов порциями по первичному ключу.
+
+Действия админки получают QuerySet всех подходящих под фильтр постов
+и не загружают его целиком: каждая порция читается и меняется в своей
+транзакции, поэтому блокировка записи держится недолго. Сигналы
+моделей не срабатывают, их работу делает сам модуль: правит архив,
+пересчитывает затронутые группы, сбрасывает кэш страниц и ставит
+статические страницы в очередь. Удаление обходит Collector: кроме
+комментариев на посты ссылаются только списки похожих постов, индекс
+тегов и уведомления, их модуль правит сам.
+Теми же порциями process_deletion разбирает каскад удаления
+пользователей и групп, помеченных schedule_deletion.
+"""
+import logging
+import time
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncMonth
+from django.urls import reverse
+
+from .archive import adjust_counts, post_month, post_scopes
+from .caching import invalidate_pages
+from .deletion import forget_pending, pending_ids
+from .groups import invalidate_group_choices, reconcile_group_stats
+from .mentions import forget_mentions, notify_mentions
+from .models import (Comment, Group, PendingDeletion, Post, PostArchive,
+                     User)
+from .related import forget_related, queue_related
+from .settings import (DELETION_CHUNK_SIZE, DELETION_PAUSE,
+                       MODERATION_CHUNK_SIZE)
+from .sharding import post_shards, shard_for_author
+from .static_pages import enqueue_pages, post_row_paths
+from .tags import forget_post_tags, sync_post_tags
+
+logger = logging.getLogger(__name__)
+
+POST_FIELDS = ("pk", "author_id", "group_id", "pub_date", "hidden")
+
+
+def group_scope(author_id, group_id):
+    if group_id is None:
+        return []
+    return [(PostArchive.GROUP, group_id)]
+
+
+def adjust_archive(rows, delta, scopes=post_scopes):
+    """Правит архив одним UPDATE на область и месяц, а не на пост."""
+    counts = Counter()
+    for row in rows:
+        year, month = post_month(row)
+        for scope in scopes(row.author_id, row.group_id):
+            counts[scope, year, month] += 1
+    for (scope, year, month), count in counts.items():
+        adjust_counts([scope], year, month, delta * count)
+
+
+def run_in_chunks(queryset, action, apply, group_ids=(),
+                  chunk_size=MODERATION_CHUNK_SIZE, pause=0):
+    """Вызывает apply(posts, rows) для порций queryset в транзакциях.
+
+    apply возвращает строки, которые действительно изменились. Пауза
+    между порциями отдает блокировку записи остальным процессам.
+    """
+    using = queryset.db
+    total = queryset.count()
+    done = changed = last_pk = 0
+    groups = set(group_ids)
+    while True:
+        with transaction.atomic(using=using):
+            rows = list(queryset.filter(pk__gt=last_pk).order_by(
+                "pk"
+            ).values_list(*POST_FIELDS, named=True)[:chunk_size])
+            if not rows:
+                break
+            posts = Post.objects.using(using).filter(
+                pk__in=[row.pk for row in rows]
+            )
+            changed_rows = apply(posts, rows)
+        if changed_rows:
+            groups.update(row.group_id for row in changed_rows)
+            enqueue_pages(post_row_paths, changed_rows, group_ids)
+        done += len(rows)
+        changed += len(changed_rows)
+        last_pk = rows[-1].pk
+        logger.info("%s: %d из %d", action, done, total)
+        time.sleep(pause)
+    groups.discard(None)
+    if groups:
+        reconcile_group_stats(Group.objects.filter(pk__in=groups))
+    if changed:
+        invalidate_pages()
+    return changed
+
+
+def delete_posts(queryset, chunk_size=MODERATION_CHUNK_SIZE, pause=0):
+    # Посты удаляемых авторов ушли из архива при пометке.
+    deleted_authors = pending_ids(PendingDeletion.USER)
+
+    def apply(posts, rows):
+        Comment.objects.using(posts.db).filter(
+            post_id__in=[row.pk for row in rows]
+        )._raw_delete(posts.db)
+        posts._raw_delete(posts.db)
+        forget_related([row.pk for row in rows])
+        forget_post_tags([row.pk for row in rows])
+        forget_mentions([row.pk for row in rows])
+        adjust_archive([
+            row for row in rows
+            if not row.hidden and row.author_id not in deleted_authors
+        ], -1)
+        return rows
+    return run_in_chunks(queryset, "Удаление", apply,
+                         chunk_size=chunk_size, pause=pause)
+
+
+def set_hidden(queryset, hidden, chunk_size=MODERATION_CHUNK_SIZE):
+    def apply(posts, rows):
+        rows = [row for row in rows if row.hidden != hidden]
+        changed = posts.filter(pk__in=[row.pk for row in rows])
+        changed.update(hidden=hidden)
+        queue_related([row.pk for row in rows])
+        texts = list(changed.values_list(
+            "pk", "author_id", "text", "pub_date", "hidden", named=True
+        ))
+        sync_post_tags(texts)
+        if hidden:
+            forget_mentions([row.pk for row in rows])
+        else:
+            deleted_authors = pending_ids(PendingDeletion.USER)
+            for post in texts:
+                if post.author_id not in deleted_authors:
+                    notify_mentions(post)
+        adjust_archive(rows, -1 if hidden else 1)
+        return rows
+    action = "Скрытие" if hidden else "Возврат"
+    return run_in_chunks(queryset, action, apply, chunk_size=chunk_size)
+
+
+def set_group(queryset, group, chunk_size=MODERATION_CHUNK_SIZE, pause=0):
+    group_id = group and group.pk
+
+    def apply(posts, rows):
+        rows = [row for row in rows if row.group_id != group_id]
+        posts.filter(pk__in=[row.pk for row in rows]).update(group=group)
+        visible = [row for row in rows if not row.hidden]
+        adjust_archive(visible, -1, group_scope)
+        adjust_archive([
+            row._replace(group_id=group_id) for row in visible
+        ], 1, group_scope)
+        return rows
+    return run_in_chunks(queryset, "Перенос в группу", apply,
+                         group_ids=[group_id] if group else [],
+                         chunk_size=chunk_size, pause=pause)
+
+
+def withdraw_author_posts(author_id):
+    """Убирает посты помеченного автора из архива, групп и тегов.
+
+    Ленты их уже не показывают, а пагинаторы верят этим счетчикам.
+    Нужен один GROUP BY на шарде автора, а не проход по его постам.
+    """
+    months = Post.objects.using(shard_for_author(author_id)).filter(
+        author_id=author_id, hidden=False
+    ).annotate(month=TruncMonth("pub_date")).values(
+        "group_id", "month"
+    ).annotate(total=Count("pk")).order_by()
+    groups = set()
+    for row in months:
+        month = row["month"]
+        adjust_counts(post_scopes(author_id, row["group_id"]),
+                      month.year, month.month, -row["total"])
+        groups.add(row["group_id"])
+    groups.discard(None)
+    if groups:
+        reconcile_group_stats(Group.objects.filter(pk__in=groups))
+    forget_post_tags(author_id=author_id)
+    forget_mentions(author_id=author_id)
+
+
+def schedule_deletion(obj):
+    """Помечает пользователя или группу удаленными, каскад будет позже."""
+    if isinstance(obj, User):
+        kind = PendingDeletion.USER
+        if obj.is_active:
+            obj.is_active = False
+            obj.save(update_fields=["is_active"])
+        paths = [reverse("index"), reverse("profile", args=[obj.username])]
+    else:
+        kind = PendingDeletion.GROUP
+        invalidate_group_choices()
+        paths = [reverse("index"), reverse("group", args=[obj.slug])]
+    deletion, created = PendingDeletion.objects.get_or_create(
+        kind=kind, object_id=obj.pk
+    )
+    forget_pending(kind)
+    if created and kind == PendingDeletion.USER:
+        withdraw_author_posts(obj.pk)
+    invalidate_pages()
+    enqueue_pages(lambda: paths)
+
+
+def delete_user_comments(user_id, using, chunk_size=DELETION_CHUNK_SIZE,
+                         pause=0):
+    """Комментарии автора вместе с ответами на них, порциями."""
+    comments = Comment.objects.using(using)
+    deleted = last_pk = 0
+    while True:
+        with transaction.atomic(using=using):
+            rows = list(comments.filter(
+                author_id=user_id, pk__gt=last_pk
+            ).order_by("pk").values_list("pk", "post_id", "path")[:chunk_size])
+            if not rows:
+                return deleted
+            removed = Counter()
+            for pk, post_id, path in rows:
+                removed[post_id] += comments.filter(
+                    Q(path=path) | Q(path__startswith=path + "/"),
+                    post_id=post_id
+                )._raw_delete(using)
+            for post_id, count in removed.items():
+                Post.objects.using(using).filter(pk=post_id).update(
+                    comment_count=F("comment_count") - count
+                )
+        deleted += sum(removed.values())
+        last_pk = rows[-1][0]
+        logger.info("Комментарии %s: удалено %d", user_id, deleted)
+        time.sleep(pause)
+
+
+def process_deletion(deletion, chunk_size=DELETION_CHUNK_SIZE,
+                     pause=DELETION_PAUSE):
+    """Разбирает каскад порциями и удаляет уже пустой объект."""
+    object_id = deletion.object_id
+    for alias in post_shards():
+        posts = Post.objects.using(alias)
+        if deletion.kind == PendingDeletion.USER:
+            delete_user_comments(object_id, alias, chunk_size, pause)
+            delete_posts(posts.filter(author_id=object_id), chunk_size,
+                         pause)
+        else:
+            set_group(posts.filter(group_id=object_id), None, chunk_size,
+                      pause)
+    if deletion.kind == PendingDeletion.USER:
+        User.objects.filter(pk=object_id).delete()
+    else:
+        Group.objects.filter(pk=object_id).delete()
+    deletion.delete()
+    forget_pending(deletion.kind)
@@ -0,0 +1,138 @@
+import datetime as dt
+import heapq
+from itertools import islice
+
+from django.core.paginator import Paginator
+from django.db.models import Q, prefetch_related_objects
+from django.utils import timezone
+
+# Маркер пропуска в окне номеров страниц.
+ELLIPSIS = None
+
+EPOCH = dt.datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def counted_paginator(object_list, per_page, count):
+    """Paginator с заранее известным числом объектов, без COUNT(*)."""
+    paginator = Paginator(object_list, per_page)
+    paginator.count = count
+    return paginator
+
+
+def page_window(page, on_each_side=2, on_ends=1):
+    """Ограниченное окно номеров страниц вокруг текущей.
+
+    Первые и последние on_ends страниц, on_each_side соседей текущей
+    и ELLIPSIS на месте пропусков, сколько бы страниц ни было всего.
+    """
+    number = page.number
+    num_pages = page.paginator.num_pages
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        yield from range(1, num_pages + 1)
+        return
+    left = max(number - on_each_side, 1)
+    right = min(number + on_each_side, num_pages)
+    if left > on_ends + 2:
+        yield from range(1, on_ends + 1)
+        yield ELLIPSIS
+    else:
+        left = 1
+    if right < num_pages - on_ends - 1:
+        yield from range(left, right + 1)
+        yield ELLIPSIS
+        yield from range(num_pages - on_ends + 1, num_pages + 1)
+    else:
+        yield from range(left, num_pages + 1)
+
+
+def with_page(query, number):
+    """Строка запроса страницы number, остальные параметры те же."""
+    query = query.copy()
+    query["page"] = number
+    return "?" + query.urlencode()
+
+
+def encode_cursor(post):
+    """Курсор «после этого поста»: микросекунды pub_date и id."""
+    delta = post.pub_date - EPOCH
+    micro = (delta.days * 86400 + delta.seconds) * 10 ** 6 + delta.microseconds
+    return f"{micro}-{post.pk}"
+
+
+def decode_cursor(cursor):
+    try:
+        micro, pk = cursor.split("-")
+        return EPOCH + dt.timedelta(microseconds=int(micro)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def after_cursor(posts, cursor, id_field="pk"):
+    if cursor is None:
+        return posts
+    pub_date, pk = cursor
+    return posts.filter(
+        Q(pub_date__lt=pub_date)
+        | Q(pub_date=pub_date, **{f"{id_field}__lt": pk})
+    )
+
+
+class MergedFeed:
+    """Несколько выборок с общим убывающим порядком как одна лента.
+
+    Для среза [start:stop] из каждой выборки читается stop первых
+    строк, heapq.merge сливает их и оставляет нужный отрезок. Связи
+    related подгружаются один раз для готовой страницы.
+
+    Поэтому страница ?page=N обходится в N * per_page строк с каждого
+    шарда: глубокие страницы растут линейно. Для чтения ленты вглубь
+    есть after() и курсоры, они читают не больше size строк с шарда.
+    """
+
+    def __init__(self, querysets, related=()):
+        self.querysets = querysets
+        self.related = related
+        self.ordering = [
+            field.lstrip("-") for field in querysets[0].query.order_by
+        ]
+
+    def key(self, obj):
+        return tuple(getattr(obj, field) for field in self.ordering)
+
+    def merge(self, querysets, start, stop):
+        streams = [queryset[:stop] for queryset in querysets]
+        page = list(islice(
+            heapq.merge(*streams, key=self.key, reverse=True), start, stop
+        ))
+        prefetch_related_objects(page, *self.related)
+        return page
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.merge(self.querysets, index.start or 0, index.stop)
+        return self.merge(self.querysets, index, index + 1)[0]
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def after(self, cursor, size):
+        return self.merge([
+            after_cursor(queryset, cursor) for queryset in self.querysets
+        ], 0, size)
+
+
+def cursor_page(posts, cursor, size):
+    """Следующие size постов после курсора и курсор для продолжения.
+
+    Выборка по ключу (pub_date, id) идет по индексу и не зависит
+    от глубины, в отличие от OFFSET.
+    """
+    # MergedFeed и TagFeed сами знают, как читать после курсора.
+    if hasattr(posts, "after"):
+        posts = posts.after(cursor, size + 1)
+    else:
+        posts = after_cursor(posts.order_by("-pub_date", "-pk"), cursor)
+        posts = list(posts[:size + 1])
+    if len(posts) <= size:
+        return posts, None
+    return posts[:size], encode_cursor(posts[size - 1])
@@ -0,0 +1,55 @@
+"""Похожие посты: готовые списки для страницы поста и очередь пересчета.
+
+Списки считает офлайн команда related_posts (см. posts.tfidf) и кладет
+в RelatedPost, страница поста читает их одним запросом по индексу.
+Сигналы ставят новые и измененные посты в очередь RelatedPostChange,
+а удаленные сразу убирают из списков.
+"""
+from collections import defaultdict
+
+from .deletion import pending_ids
+from .models import PendingDeletion, Post, RelatedPost, RelatedPostChange
+from .sharding import shard_for_author
+
+
+def queue_related(post_ids):
+    RelatedPostChange.objects.bulk_create(
+        [RelatedPostChange(post_id=post_id) for post_id in post_ids],
+        ignore_conflicts=True
+    )
+
+
+def forget_related(post_ids, neighbours=True):
+    """Удаляет списки постов и, если neighbours, их места в чужих."""
+    for start in range(0, len(post_ids), 500):
+        chunk = post_ids[start:start + 500]
+        RelatedPost.objects.filter(post_id__in=chunk).delete()
+        if neighbours:
+            RelatedPost.objects.filter(related_id__in=chunk).delete()
+
+
+def related_posts(post):
+    """Похожие посты из готовой таблицы: запрос к ней и по одному на шард.
+
+    Скрытые и удаленные с момента расчета посты отбрасываются.
+    """
+    related = list(RelatedPost.objects.filter(
+        post_id=post.pk
+    ).select_related("author"))
+    deleted = pending_ids(PendingDeletion.USER)
+    authors = {item.related_id: item.author for item in related}
+    by_shard = defaultdict(list)
+    for item in related:
+        if item.author_id not in deleted:
+            by_shard[shard_for_author(item.author_id)].append(item.related_id)
+    posts = {}
+    for alias, post_ids in by_shard.items():
+        for neighbour in Post.objects.using(alias).filter(
+            pk__in=post_ids, hidden=False
+        ):
+            neighbour.author = authors[neighbour.pk]
+            posts[neighbour.pk] = neighbour
+    return [
+        posts[item.related_id] for item in related
+        if item.related_id in posts
+    ]
@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sites.models import Site
+from django.http import Http404, HttpResponseNotFound
+from django.shortcuts import render
+from django.test import RequestFactory
+from django.urls import Resolver404, resolve
+
+from .metrics import observe
+
+
+def render_page(request, template_name, context):
+    """render() на движке, выбранном для шаблона в JINJA2_TEMPLATES."""
+    using = "jinja2" if template_name in settings.JINJA2_TEMPLATES else None
+    start = time.perf_counter()
+    response = render(request, template_name, context, using=using)
+    observe(
+        "yatube_template_render_seconds", (("template", template_name),),
+        time.perf_counter() - start
+    )
+    return response
+
+
+def internal_get(path, **environ):
+    """Анонимный GET к view внутри процесса, мимо middleware.
+
+    Хост запроса — домен текущего Site, а не testserver тестового
+    клиента, поэтому ALLOWED_HOSTS не мешает. Http404 и ненайденный
+    адрес становятся ответом 404, остальные исключения летят дальше.
+    """
+    request = RequestFactory().get(
+        path, HTTP_HOST=Site.objects.get_current().domain, **environ
+    )
+    request.user = AnonymousUser()
+    try:
+        match = resolve(request.path_info)
+        return match.func(request, *match.args, **match.kwargs)
+    except (Http404, Resolver404):
+        return HttpResponseNotFound()
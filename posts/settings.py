@@ -1 +1,38 @@
 PAGINATOR_PAGE_SIZE = 10
+GROUP_ACTIVITY_DAYS = 7
+COMMENTS_PAGE_SIZE = 50
+COMMENT_PATH_STEP = 10
+COMMENT_MAX_DEPTH = 8
+VIEW_COUNTS_FLUSH_INTERVAL = 10
+VIEW_COUNTS_BATCH_SIZE = 500
+FRAGMENT_CACHE_TIMEOUT = 60
+INDEX_CACHE_TIMEOUT = 10
+PAGE_MAX_STALENESS = 300
+PAGE_REGENERATION_LOCK_TIMEOUT = 30
+SLOW_REQUEST_THRESHOLD = 0.5
+SLOW_REQUESTS_KEPT = 200
+SLOW_QUERIES_KEPT = 5
+METRICS_FLUSH_INTERVAL = 5
+GROUP_CHOICES_LIMIT = 200
+GROUP_AUTOCOMPLETE_SIZE = 20
+STATIC_PAGES_BATCH_SIZE = 100
+EXPORT_CHUNK_SIZE = 500
+EXPORT_STREAM_LIMIT = 1000
+EXPORT_REUSE_HOURS = 24
+MODERATION_CHUNK_SIZE = 500
+# Действия админки идут внутри запроса, больше за раз не берем.
+MODERATION_ADMIN_LIMIT = 20000
+DELETION_CHUNK_SIZE = 200
+DELETION_PAUSE = 0.05
+DELETION_POLL_INTERVAL = 10
+MAINTENANCE_SLICE_SIZE = 500
+MAINTENANCE_PAUSE = 0.1
+MAINTENANCE_VACUUM_PAGES = 256
+MAINTENANCE_ANALYSIS_LIMIT = 1000
+RELATED_POSTS_COUNT = 5
+RELATED_BATCH_SIZE = 64
+RELATED_MIN_DF = 2
+RELATED_MAX_DF = 0.5
+TAG_MAX_LENGTH = 50
+TAG_BACKFILL_BATCH_SIZE = 500
+MENTION_BATCH_SIZE = 500
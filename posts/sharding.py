@@ -0,0 +1,194 @@
+"""Шардирование постов по автору между алиасами из POST_SHARDS.
+
+Посты и их комментарии живут на шарде автора, пользователи, группы
+и сводные таблицы — в default. Шард выбирается rendezvous-хэшем
+от author_id: при добавлении шарда переезжает лишь часть авторов,
+их переносит команда reshard_posts. Схема БД на всех шардах общая.
+"""
+import zlib
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max
+
+from .deletion import pending_ids
+from .models import (Comment, CommentId, Group, PendingDeletion, Post, PostId,
+                     User)
+from .paginator import MergedFeed
+
+SHARDED_MODELS = (Post, Comment)
+
+
+def post_shards():
+    return settings.POST_SHARDS
+
+
+def shard_weight(alias, author_id):
+    return zlib.crc32(f"{alias}:{author_id}".encode())
+
+
+def shard_for_author(author_id, shards=None):
+    shards = shards or post_shards()
+    if len(shards) == 1:
+        return shards[0]
+    return max(shards, key=lambda alias: shard_weight(alias, author_id))
+
+
+class AuthorShardRouter:
+    """Пост и комментарии — на шард автора, авторы и группы — в default."""
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if model is Post:
+            # user.posts: подсказкой приходит сам автор.
+            if isinstance(instance, User):
+                return shard_for_author(instance.pk)
+            if isinstance(instance, Post) and instance.author_id:
+                return shard_for_author(instance.author_id)
+            if isinstance(instance, Comment) and instance._state.db:
+                return instance._state.db
+            return post_shards()[0]
+        if model is Comment:
+            if isinstance(instance, (Post, Comment)) and instance._state.db:
+                return instance._state.db
+            if isinstance(instance, Comment):
+                post = instance._state.fields_cache.get("post")
+                if post is not None:
+                    return self.db_for_read(Post, instance=post)
+            return post_shards()[0]
+        # Без этого post.author искали бы на шарде поста.
+        if model in (User, Group):
+            return DEFAULT_DB_ALIAS
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        sharded = [isinstance(obj, SHARDED_MODELS) for obj in (obj1, obj2)]
+        if all(sharded):
+            return obj1._state.db == obj2._state.db
+        if any(sharded):
+            return True
+        return None
+
+
+def with_related(queryset, *fields):
+    # На шарде нет строк пользователей и групп, JOIN с ними пуст.
+    if queryset.db == DEFAULT_DB_ALIAS:
+        return queryset.select_related(*fields)
+    return queryset.prefetch_related(*fields)
+
+
+def author_posts(author):
+    """Посты автора: запросы идут только на его шард."""
+    return with_related(
+        Post.objects.using(shard_for_author(author.pk)).filter(author=author),
+        "author", "group"
+    )
+
+
+def feed_posts(*ordering, **filters):
+    """Лента со всех шардов: QuerySet для одного шарда, иначе MergedFeed.
+
+    MergedFeed сливает упорядоченные выборки шардов k-путевым слиянием,
+    авторы и группы страницы подгружаются двумя запросами в default.
+    Скрытые модератором посты и посты удаляемых авторов в ленты
+    не попадают.
+    """
+    ordering = ordering or ("-pub_date", "-pk")
+    deleted_authors = pending_ids(PendingDeletion.USER)
+    querysets = [
+        Post.objects.using(alias).filter(
+            hidden=False, **filters
+        ).exclude(author_id__in=deleted_authors).order_by(*ordering)
+        for alias in post_shards()
+    ]
+    if len(querysets) == 1:
+        return with_related(querysets[0], "author", "group")
+    return MergedFeed(querysets, ("author", "group"))
+
+
+def find_post(post_id):
+    """Пост по id без автора, с обходом шардов по очереди."""
+    for alias in post_shards():
+        post = Post.objects.using(alias).filter(pk=post_id).first()
+        if post is not None:
+            return post
+    return None
+
+
+def sync_sequences(aliases):
+    """Поднимает общие последовательности id выше id на всех шардах.
+
+    Нужно при включении шардирования, пока id выдавала каждая БД.
+    """
+    for model, sequence in ((Post, PostId), (Comment, CommentId)):
+        top = max(
+            model.objects.using(alias).aggregate(top=Max("pk"))["top"] or 0
+            for alias in aliases
+        )
+        current = sequence.objects.aggregate(top=Max("pk"))["top"] or 0
+        if top > current:
+            sequence.objects.create(pk=top)
+
+
+def move_author(author_id, source, target):
+    """Переносит посты автора с комментариями, сохраняя их id.
+
+    Копия на целевом шарде сначала очищается, поэтому прерванный
+    перенос можно просто повторить. Сигналы не срабатывают: архив
+    и счетчики групп от переезда не меняются.
+    """
+    posts = list(Post.objects.using(source).filter(author_id=author_id))
+    comments = list(Comment.objects.using(source).filter(
+        post__author_id=author_id
+    ).order_by("path"))
+    with transaction.atomic(using=target):
+        Comment.objects.using(target).filter(
+            pk__in=[comment.pk for comment in comments]
+        )._raw_delete(target)
+        Post.objects.using(target).filter(
+            pk__in=[post.pk for post in posts]
+        )._raw_delete(target)
+        Post.objects.using(target).bulk_create(posts, batch_size=500)
+        Comment.objects.using(target).bulk_create(comments, batch_size=500)
+    with transaction.atomic(using=source):
+        Comment.objects.using(source).filter(
+            pk__in=[comment.pk for comment in comments]
+        )._raw_delete(source)
+        Post.objects.using(source).filter(
+            pk__in=[post.pk for post in posts]
+        )._raw_delete(source)
+    return len(posts)
+
+
+def misplaced_authors(aliases):
+    """(author_id, откуда, куда) для авторов не на своем шарде."""
+    for alias in aliases:
+        authors = Post.objects.using(alias).values_list(
+            "author_id", flat=True
+        ).distinct()
+        for author_id in authors.iterator():
+            target = shard_for_author(author_id)
+            if target != alias:
+                yield author_id, alias, target
+
+
+def delete_user_posts(user):
+    """Каскад удаления пользователя на шардах кроме default.
+
+    В default его выполняет сам Django.
+    """
+    for alias in post_shards():
+        if alias == DEFAULT_DB_ALIAS:
+            continue
+        Comment.objects.using(alias).filter(author_id=user.pk).delete()
+        Post.objects.using(alias).filter(author_id=user.pk).delete()
+
+
+def detach_group_posts(group):
+    for alias in post_shards():
+        if alias != DEFAULT_DB_ALIAS:
+            Post.objects.using(alias).filter(group_id=group.pk).update(
+                group=None
+            )
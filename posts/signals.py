@@ -0,0 +1,241 @@
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .archive import adjust_counts, post_month, post_scopes
+from .caching import invalidate_pages
+from .deletion import pending_ids
+from .groups import adjust_group_stats, invalidate_group_choices
+from .mentions import forget_mentions, notify_mentions
+from .models import Comment, Group, PendingDeletion, Post, PostArchive, User
+from .related import forget_related, queue_related
+from .sharding import delete_user_posts, detach_group_posts
+from .static_pages import (comment_paths, enqueue_pages, group_paths,
+                           post_paths, user_paths)
+from .tags import forget_post_tags, sync_post_tags
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_post(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    instance._previous_hidden = True
+    instance._previous_text = ""
+    if not instance._state.adding:
+        previous = Post.objects.using(instance._state.db).filter(
+            pk=instance.pk
+        ).values_list("group_id", "hidden", "text").first()
+        if previous is not None:
+            (instance._previous_group_id, instance._previous_hidden,
+             instance._previous_text) = previous
+
+
+def visible_scopes(author_id, group_id, hidden):
+    """Области архива, где пост учтен.
+
+    Скрытый пост и пост удаляемого автора нигде не считаются.
+    """
+    if hidden or author_id in pending_ids(PendingDeletion.USER):
+        return set()
+    return set(post_scopes(author_id, group_id))
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    year, month = post_month(instance)
+    before = visible_scopes(
+        instance.author_id, instance._previous_group_id,
+        instance._previous_hidden
+    )
+    after = visible_scopes(
+        instance.author_id, instance.group_id, instance.hidden
+    )
+    for scopes, delta in ((after - before, 1), (before - after, -1)):
+        adjust_counts(scopes, year, month, delta)
+        for scope, object_id in scopes:
+            if scope == PostArchive.GROUP:
+                adjust_group_stats(object_id, instance.pub_date, delta)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    if not visible_scopes(instance.author_id, None, instance.hidden):
+        return
+    year, month = post_month(instance)
+    adjust_counts(
+        post_scopes(instance.author_id, instance.group_id), year, month, -1
+    )
+    if instance.group_id is not None:
+        adjust_group_stats(instance.group_id, instance.pub_date, -1)
+
+
+def text_may_change(created, update_fields):
+    # Счетчики меняются через update(), сюда попадают только правки.
+    changed = set(update_fields or ()) & {"text", "hidden"}
+    return created or update_fields is None or bool(changed)
+
+
+@receiver(post_save, sender=Post)
+def queue_related_posts(sender, instance, created, update_fields=None,
+                        **kwargs):
+    if text_may_change(created, update_fields):
+        queue_related([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_related_posts(sender, instance, **kwargs):
+    forget_related([instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def index_post_tags(sender, instance, created, update_fields=None,
+                    **kwargs):
+    if text_may_change(created, update_fields):
+        sync_post_tags([instance])
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_post_tags(sender, instance, **kwargs):
+    forget_post_tags([instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def notify_mentioned_users(sender, instance, created, update_fields=None,
+                           **kwargs):
+    if not text_may_change(created, update_fields):
+        return
+    if instance.hidden:
+        if not instance._previous_hidden:
+            forget_mentions([instance.pk])
+        return
+    # Возвращенный из скрытых пост упоминает всех заново, как новый.
+    previous_text = (
+        "" if instance._previous_hidden else instance._previous_text
+    )
+    notify_mentions(instance, previous_text)
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_post_mentions(sender, instance, **kwargs):
+    forget_mentions([instance.pk])
+
+
+@receiver(post_delete, sender=Group)
+def drop_group_archive(sender, instance, **kwargs):
+    PostArchive.objects.filter(
+        scope=PostArchive.GROUP, object_id=instance.pk
+    ).delete()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def drop_group_choices(sender, **kwargs):
+    invalidate_group_choices()
+
+
+@receiver(pre_delete, sender=User)
+def enqueue_deleted_user_pages(sender, instance, **kwargs):
+    # Посты автора удаляются следующим обработчиком, адреса нужны до него.
+    enqueue_pages(user_paths, instance, [instance.username])
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_posts(sender, instance, **kwargs):
+    delete_user_posts(instance)
+
+
+@receiver(pre_delete, sender=User)
+def forget_deleted_user_mentions(sender, instance, **kwargs):
+    # Каскад по Notification.author не трогает счетчики получателей.
+    forget_mentions(author_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Group)
+def enqueue_deleted_group_pages(sender, instance, **kwargs):
+    enqueue_pages(group_paths, instance, [instance.slug])
+
+
+@receiver(pre_delete, sender=Group)
+def detach_sharded_posts(sender, instance, **kwargs):
+    detach_group_posts(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.using(instance._state.db).filter(
+            pk=instance.post_id
+        ).update(comment_count=F("comment_count") + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    Post.objects.using(instance._state.db).filter(
+        pk=instance.post_id
+    ).update(comment_count=F("comment_count") - 1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_cached_pages(sender, **kwargs):
+    invalidate_pages()
+
+
+@receiver(post_save, sender=User)
+def invalidate_pages_on_profile_change(sender, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) != {"last_login"}:
+        invalidate_pages()
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def remember_previous_address(sender, instance, **kwargs):
+    field = "slug" if sender is Group else "username"
+    instance._previous_address = None
+    if not instance._state.adding:
+        instance._previous_address = sender.objects.filter(
+            pk=instance.pk
+        ).values_list(field, flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def enqueue_saved_post_pages(sender, instance, **kwargs):
+    enqueue_pages(post_paths, instance, instance._previous_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def enqueue_deleted_post_pages(sender, instance, **kwargs):
+    enqueue_pages(post_paths, instance)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def enqueue_comment_pages(sender, instance, **kwargs):
+    enqueue_pages(comment_paths, instance)
+
+
+@receiver(post_save, sender=Group)
+def enqueue_group_pages(sender, instance, **kwargs):
+    slugs = {instance.slug, instance._previous_address} - {None}
+    enqueue_pages(group_paths, instance, slugs)
+
+
+@receiver(post_save, sender=User)
+def enqueue_user_pages(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    usernames = {instance.username, instance._previous_address}
+    enqueue_pages(user_paths, instance, usernames - {None})
+
+
+@receiver(connection_created)
+def enable_incremental_vacuum(sender, connection, **kwargs):
+    # Новая БД получает режим сразу, старая — после одного VACUUM.
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
@@ -0,0 +1,114 @@
+"""Журнал медленных запросов: кольцевой буфер в кэше и файл с ротацией.
+
+Для быстрых запросов цена — пара вызовов perf_counter на запрос
+и на каждый SQL-запрос, запись делается только сверх порога.
+"""
+import heapq
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from .settings import (SLOW_QUERIES_KEPT, SLOW_REQUEST_THRESHOLD,
+                       SLOW_REQUESTS_KEPT)
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_KEY = "slowlog:sequence"
+SQL_MAX_LENGTH = 2000
+
+
+def slot_key(slot):
+    return f"slowlog:slot:{slot}"
+
+
+class QueryTimer:
+    """execute_wrapper, который считает запросы и помнит самые долгие."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total += duration
+            item = (duration, self.count, sql)
+            if len(self.slowest) < SLOW_QUERIES_KEPT:
+                heapq.heappush(self.slowest, item)
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def report(self):
+        return [
+            {"duration": round(duration, 6), "sql": sql[:SQL_MAX_LENGTH]}
+            for duration, _, sql in sorted(self.slowest, reverse=True)
+        ]
+
+
+class SlowRequestMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        if duration >= SLOW_REQUEST_THRESHOLD:
+            record_slow_request(request, response, duration, queries)
+        return response
+
+
+def record_slow_request(request, response, duration, queries):
+    match = request.resolver_match
+    entry = {
+        "time": timezone.now().isoformat(),
+        "method": request.method,
+        "path": request.path,
+        "view": match.view_name if match else None,
+        "kwargs": {key: str(value) for key, value in match.kwargs.items()}
+        if match else {},
+        "query": request.META.get("QUERY_STRING", ""),
+        "status": response.status_code,
+        "duration": round(duration, 6),
+        "queries": queries.count,
+        "query_time": round(queries.total, 6),
+        "slowest_queries": queries.report(),
+    }
+    push_entry(entry)
+    logger.warning(json.dumps(entry, ensure_ascii=False))
+    return entry
+
+
+def push_entry(entry):
+    """Пишет запись в следующую ячейку кольца, старые затираются."""
+    try:
+        sequence = cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        cache.add(SEQUENCE_KEY, 0, None)
+        sequence = cache.incr(SEQUENCE_KEY)
+    cache.set(slot_key(sequence % SLOW_REQUESTS_KEPT), entry, None)
+
+
+def slow_requests():
+    keys = [slot_key(slot) for slot in range(SLOW_REQUESTS_KEPT)]
+    return list(cache.get_many(keys).values())
+
+
+def clear_slow_requests():
+    cache.delete_many(
+        [SEQUENCE_KEY] + [slot_key(slot) for slot in range(SLOW_REQUESTS_KEPT)]
+    )
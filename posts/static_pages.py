@@ -0,0 +1,291 @@
+"""Статические копии публичных страниц для анонимных читателей.
+
+Сигналы кладут адреса затронутых страниц в очередь PageChange,
+команда prerender рендерит их в STATIC_PAGES_DIR, а StaticPagesApp
+отдает готовые файлы до того, как запрос попадет в Django. Рендерится
+только первая страница лент, остальные грузятся фрагментами.
+"""
+import logging
+import os
+import tempfile
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.handlers.wsgi import get_path_info
+from django.http import parse_cookie
+from django.urls import resolve, reverse
+
+from .caching import FRESH_PAGE_ENVIRON
+from .counters import record_view
+from .models import Group, PageChange, Post, Tag, User
+from .rendering import internal_get
+from .settings import STATIC_PAGES_BATCH_SIZE
+from .sharding import author_posts, find_post, post_shards
+
+logger = logging.getLogger(__name__)
+
+PAGE_FILE = "index.html"
+# Рядом со страницей поста лежит шард, чтобы считать просмотры.
+SHARD_FILE = "shard"
+# Ключ окружения WSGI, а не заголовок: клиент снаружи его не подделает.
+PRERENDER_ENVIRON = "yatube.prerender"
+
+
+class PageRenderError(Exception):
+    """View ответил на адрес статической страницы не 200, 404 или 3xx."""
+
+    def __init__(self, path, status_code):
+        super().__init__(f"{path}: ответ {status_code}")
+        self.path = path
+        self.status_code = status_code
+
+
+def page_directory(root, path):
+    # reverse() кодирует кириллицу в адресе, а StaticPagesApp видит
+    # раскодированный путь: файлы лежат по нему.
+    return os.path.join(root, unquote(path).strip("/"))
+
+
+def page_file(root, path):
+    return os.path.join(page_directory(root, path), PAGE_FILE)
+
+
+def post_paths(post, group_id=None):
+    username = post.author.username
+    paths = [
+        reverse("index"),
+        reverse("profile", args=[username]),
+        reverse("post", args=[username, post.pk]),
+    ]
+    slugs = Group.objects.filter(
+        pk__in={post.group_id, group_id} - {None}
+    ).values_list("slug", flat=True)
+    return paths + [reverse("group", args=[slug]) for slug in slugs]
+
+
+def post_row_paths(rows, group_ids=()):
+    """Страницы постов из values_list(named=True) и их лент."""
+    usernames = dict(User.objects.filter(
+        pk__in={row.author_id for row in rows}
+    ).values_list("pk", "username"))
+    slugs = Group.objects.filter(
+        pk__in={row.group_id for row in rows} | set(group_ids)
+    ).values_list("slug", flat=True)
+    paths = [reverse("index")]
+    paths += [reverse("profile", args=[name]) for name in usernames.values()]
+    paths += [reverse("group", args=[slug]) for slug in slugs]
+    return paths + [
+        reverse("post", args=[usernames[row.author_id], row.pk])
+        for row in rows if row.author_id in usernames
+    ]
+
+
+def post_page_paths(posts):
+    """Только страницы постов по парам (id, author_id)."""
+    usernames = dict(User.objects.filter(
+        pk__in={author_id for pk, author_id in posts}
+    ).values_list("pk", "username"))
+    return [
+        reverse("post", args=[usernames[author_id], pk])
+        for pk, author_id in posts if author_id in usernames
+    ]
+
+
+def comment_paths(comment):
+    post = comment.post
+    return [reverse("post", args=[post.author.username, post.pk])]
+
+
+def user_paths(user, usernames):
+    post_ids = list(author_posts(user).values_list("pk", flat=True))
+    paths = [reverse("index")]
+    for username in usernames:
+        paths.append(reverse("profile", args=[username]))
+        paths += [reverse("post", args=[username, pk]) for pk in post_ids]
+    return paths
+
+
+def group_paths(group, slugs):
+    """Страница группы и ленты, где посты показывают ее название."""
+    author_ids = set()
+    for alias in post_shards():
+        author_ids.update(Post.objects.using(alias).filter(
+            group_id=group.pk
+        ).values_list("author_id", flat=True).distinct())
+    usernames = User.objects.filter(
+        pk__in=author_ids
+    ).values_list("username", flat=True)
+    paths = [reverse("index")]
+    paths += [reverse("group", args=[slug]) for slug in slugs]
+    return paths + [
+        reverse("profile", args=[username]) for username in usernames
+    ]
+
+
+def all_paths():
+    paths = [reverse("index")]
+    paths += [
+        reverse("group", args=[slug])
+        for slug in Group.objects.values_list("slug", flat=True)
+    ]
+    paths += [
+        reverse("tag", args=[name])
+        for name in Tag.objects.filter(
+            post_count__gt=0
+        ).values_list("name", flat=True)
+    ]
+    usernames = dict(User.objects.values_list("pk", "username"))
+    authors = set()
+    for alias in post_shards():
+        posts = Post.objects.using(alias).values_list("author_id", "pk")
+        for author_id, pk in posts.iterator():
+            authors.add(author_id)
+            paths.append(reverse("post", args=[usernames[author_id], pk]))
+    paths += [
+        reverse("profile", args=[usernames[author_id]])
+        for author_id in authors
+    ]
+    return paths
+
+
+def enqueue_pages(get_paths, *args):
+    """Ставит страницы в очередь, если статический режим включен."""
+    if not settings.STATIC_PAGES:
+        return
+    PageChange.objects.bulk_create(
+        [PageChange(path=path) for path in set(get_paths(*args))],
+        ignore_conflicts=True
+    )
+
+
+def write_atomic(path, content):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory)
+    with os.fdopen(descriptor, "wb") as page:
+        page.write(content)
+    os.replace(temporary, path)
+
+
+def remove_page(root, path):
+    for name in (PAGE_FILE, SHARD_FILE):
+        try:
+            os.remove(os.path.join(page_directory(root, path), name))
+        except FileNotFoundError:
+            pass
+
+
+def render_pages(paths, root=None):
+    """Рендерит страницы мимо кэша страниц, пропавшие удаляет.
+
+    Пропавшая страница — 404 или переадресация на новый адрес. Любой
+    другой ответ — ошибка: страница остается прежней, а drain_changes
+    вернет адреса в очередь.
+    """
+    root = root or settings.STATIC_PAGES_DIR
+    written = removed = 0
+    for path in paths:
+        response = internal_get(path, **{
+            PRERENDER_ENVIRON: True, FRESH_PAGE_ENVIRON: True
+        })
+        if response.status_code in (301, 302, 404):
+            remove_page(root, path)
+            removed += 1
+            continue
+        if response.status_code != 200:
+            raise PageRenderError(path, response.status_code)
+        write_atomic(page_file(root, path), response.content)
+        match = resolve(path)
+        if match.url_name == "post":
+            post = find_post(match.kwargs["post_id"])
+            write_atomic(
+                os.path.join(page_directory(root, path), SHARD_FILE),
+                post._state.db.encode()
+            )
+        written += 1
+    return written, removed
+
+
+def drain_changes(batch_size=STATIC_PAGES_BATCH_SIZE, root=None):
+    """Разбирает очередь, пока она не опустеет.
+
+    Строки удаляются до рендеринга: изменение, пришедшее во время
+    рендеринга, снова попадет в очередь и не потеряется.
+    """
+    written = removed = 0
+    while True:
+        changes = list(
+            PageChange.objects.values_list("pk", "path")[:batch_size]
+        )
+        if not changes:
+            return written, removed
+        PageChange.objects.filter(
+            pk__in=[pk for pk, path in changes]
+        ).delete()
+        paths = [path for pk, path in changes]
+        try:
+            batch = render_pages(paths, root)
+        except Exception:
+            PageChange.objects.bulk_create(
+                [PageChange(path=path) for path in paths],
+                ignore_conflicts=True
+            )
+            raise
+        written += batch[0]
+        removed += batch[1]
+        logger.info("Статические страницы: %d записано, %d удалено",
+                    *batch)
+
+
+class StaticPagesApp:
+    """WSGI-слой, который отдает анонимным GET готовые страницы."""
+
+    def __init__(self, application, root):
+        self.application = application
+        self.root = os.path.realpath(root)
+
+    def __call__(self, environ, start_response):
+        directory = self.page_directory(environ)
+        if directory is None:
+            return self.application(environ, start_response)
+        try:
+            with open(os.path.join(directory, PAGE_FILE), "rb") as page:
+                content = page.read()
+        except OSError:
+            return self.application(environ, start_response)
+        self.count_view(directory)
+        start_response("200 OK", [
+            ("Content-Type", "text/html; charset=utf-8"),
+            ("Content-Length", str(len(content))),
+            ("Cache-Control", "public, max-age=0"),
+            ("Vary", "Cookie"),
+        ])
+        if environ["REQUEST_METHOD"] == "HEAD":
+            return [b""]
+        return [content]
+
+    def page_directory(self, environ):
+        path = get_path_info(environ)
+        if (
+            environ["REQUEST_METHOD"] not in ("GET", "HEAD")
+            or environ.get("QUERY_STRING")
+            or not path.endswith("/")
+        ):
+            return None
+        cookies = parse_cookie(environ.get("HTTP_COOKIE", ""))
+        if settings.SESSION_COOKIE_NAME in cookies:
+            return None
+        directory = os.path.realpath(
+            os.path.join(self.root, path.strip("/"))
+        )
+        if os.path.commonpath([directory, self.root]) != self.root:
+            return None
+        return directory
+
+    def count_view(self, directory):
+        try:
+            with open(os.path.join(directory, SHARD_FILE)) as shard:
+                using = shard.read()
+        except FileNotFoundError:
+            return
+        record_view(int(os.path.basename(directory)), using)
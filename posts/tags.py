@@ -0,0 +1,191 @@
+"""Хэштеги постов: обратный индекс PostTag и ленты тегов.
+
+Теги извлекаются из текста при каждом сохранении поста, индекс
+хранит строку на пару тег–пост с датой публикации. Лента тега читает
+страницу из индекса (tag, pub_date, post_id) одним запросом по ключу,
+как лента группы читает индекс постов, а сами посты достает по id
+с шардов их авторов.
+"""
+import logging
+import re
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F, prefetch_related_objects
+from django.urls import reverse
+
+from .deletion import pending_ids
+from .models import PendingDeletion, Post, PostTag, Tag
+from .paginator import after_cursor
+from .settings import TAG_BACKFILL_BATCH_SIZE, TAG_MAX_LENGTH
+from .sharding import post_shards, shard_for_author
+from .static_pages import enqueue_pages
+
+logger = logging.getLogger(__name__)
+
+# Решетка в начале слова; &#39; и якоря ссылок тегами не считаются.
+TAG_RE = re.compile(r"(?<![\w&/])#(\w*[^\W\d_]\w*)")
+
+
+def extract_tags(text):
+    return {
+        name.lower() for name in TAG_RE.findall(text)
+        if len(name) <= TAG_MAX_LENGTH
+    }
+
+
+def tag_paths(names):
+    return [reverse("tag", args=[name]) for name in names]
+
+
+def tag_ids(names):
+    """id тегов по именам, недостающие теги создаются."""
+    ids = dict(Tag.objects.filter(name__in=names).values_list("name", "pk"))
+    missing = set(names) - ids.keys()
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in missing], ignore_conflicts=True
+        )
+        ids.update(Tag.objects.filter(
+            name__in=missing
+        ).values_list("name", "pk"))
+    return ids
+
+
+def adjust_tag_counts(deltas):
+    for tag_id, delta in deltas.items():
+        if delta:
+            Tag.objects.filter(pk=tag_id).update(
+                post_count=F("post_count") + delta
+            )
+
+
+def sync_post_tags(posts):
+    """Приводит индекс к текстам posts.
+
+    posts — посты или строки с pk, author_id, text, pub_date и hidden.
+    У скрытого поста и поста удаляемого автора тегов в индексе нет.
+    """
+    posts = {post.pk: post for post in posts}
+    deleted = pending_ids(PendingDeletion.USER)
+    wanted = {
+        pk: set() if post.hidden or post.author_id in deleted
+        else extract_tags(post.text)
+        for pk, post in posts.items()
+    }
+    ids = tag_ids(set().union(*wanted.values()))
+    current = defaultdict(dict)
+    for pk, post_id, tag_id in PostTag.objects.filter(
+        post_id__in=posts
+    ).values_list("pk", "post_id", "tag_id"):
+        current[post_id][tag_id] = pk
+    added, removed, deltas = [], [], Counter()
+    for pk, post in posts.items():
+        tags = {ids[name] for name in wanted[pk]}
+        for tag_id in tags - current[pk].keys():
+            added.append(PostTag(
+                tag_id=tag_id, post_id=pk, author_id=post.author_id,
+                pub_date=post.pub_date
+            ))
+            deltas[tag_id] += 1
+        for tag_id in current[pk].keys() - tags:
+            removed.append(current[pk][tag_id])
+            deltas[tag_id] -= 1
+    if not deltas:
+        return 0
+    with transaction.atomic():
+        PostTag.objects.filter(pk__in=removed).delete()
+        PostTag.objects.bulk_create(added, batch_size=500)
+        adjust_tag_counts(deltas)
+    enqueue_pages(tag_paths, Tag.objects.filter(
+        pk__in=deltas
+    ).values_list("name", flat=True))
+    return len(added) + len(removed)
+
+
+def forget_post_tags(post_ids=None, author_id=None):
+    """Убирает посты из индекса и из счетчиков тегов.
+
+    Удаленные посты передаются списком id, все посты автора — author_id.
+    """
+    if author_id is None:
+        entries = PostTag.objects.filter(post_id__in=post_ids)
+    else:
+        entries = PostTag.objects.filter(author_id=author_id)
+    deltas = Counter()
+    for tag_id in entries.values_list("tag_id", flat=True):
+        deltas[tag_id] -= 1
+    if not deltas:
+        return
+    with transaction.atomic():
+        entries.delete()
+        adjust_tag_counts(deltas)
+    enqueue_pages(tag_paths, Tag.objects.filter(
+        pk__in=deltas
+    ).values_list("name", flat=True))
+
+
+def backfill_tags(batch_size=TAG_BACKFILL_BATCH_SIZE):
+    """Проходит посты всех шардов порциями по id и правит индекс.
+
+    Повторный запуск безопасен: sync_post_tags меняет только
+    расхождения. Возвращает число постов и измененных строк.
+    """
+    seen = changed = 0
+    for alias in post_shards():
+        posts = Post.objects.using(alias).order_by("pk").values_list(
+            "pk", "author_id", "text", "pub_date", "hidden", named=True
+        )
+        last_pk = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            changed += sync_post_tags(batch)
+            seen += len(batch)
+            last_pk = batch[-1].pk
+            logger.info("Теги: %s до id %d, изменено %d",
+                        alias, last_pk, changed)
+    return seen, changed
+
+
+class TagFeed:
+    """Лента тега с интерфейсом MergedFeed для пагинаторов.
+
+    Срез — один запрос к индексу PostTag и по запросу на шард
+    за постами по первичному ключу.
+    """
+
+    def __init__(self, tag):
+        self.entries = PostTag.objects.filter(tag=tag).exclude(
+            author_id__in=pending_ids(PendingDeletion.USER)
+        ).order_by("-pub_date", "-post_id")
+
+    def load(self, entries):
+        entries = list(entries.values_list("post_id", "author_id"))
+        by_shard = defaultdict(list)
+        for post_id, author_id in entries:
+            by_shard[shard_for_author(author_id)].append(post_id)
+        posts = {}
+        for alias, post_ids in by_shard.items():
+            posts.update(
+                (post.pk, post) for post in Post.objects.using(alias).filter(
+                    pk__in=post_ids, hidden=False
+                )
+            )
+        page = [posts[pk] for pk, author_id in entries if pk in posts]
+        prefetch_related_objects(page, "author", "group")
+        return page
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.load(self.entries[index])
+        return self[index:index + 1][0]
+
+    def count(self):
+        return self.entries.count()
+
+    def after(self, cursor, size):
+        return self.load(
+            after_cursor(self.entries, cursor, "post_id")[:size]
+        )
@@ -0,0 +1,15 @@
+from django import template
+
+from posts import paginator
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page):
+    return paginator.page_window(page)
+
+
+@register.filter
+def with_page(query, number):
+    return paginator.with_page(query, number)
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Group, Post, PostArchive
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(username="test")
+        cls.group = Group.objects.create(
+            title="Peck",
+            slug="mafia-town",
+            description="Revoluton"
+        )
+        for i in range(3):
+            Post.objects.create(
+                text="test" + str(i),
+                author=cls.user,
+                group=cls.group if i else None
+            )
+        cls.now = timezone.localtime()
+
+    def setUp(self) -> None:
+        self.guest_client = Client()
+
+    def archive_count(self, scope, object_id):
+        return PostArchive.objects.get(
+            scope=scope,
+            object_id=object_id,
+            year=self.now.year,
+            month=self.now.month
+        ).post_count
+
+    def test_counts_on_create(self):
+        counts = {
+            (PostArchive.SITE, 0): 3,
+            (PostArchive.AUTHOR, self.user.pk): 3,
+            (PostArchive.GROUP, self.group.pk): 2,
+        }
+        for (scope, object_id), expected in counts.items():
+            with self.subTest(scope=scope):
+                self.assertEqual(
+                    self.archive_count(scope, object_id), expected
+                )
+
+    def test_counts_on_delete_and_group_change(self):
+        post = Post.objects.filter(group=self.group).first()
+        post.group = None
+        post.save()
+        self.assertEqual(
+            self.archive_count(PostArchive.GROUP, self.group.pk), 1
+        )
+        post.delete()
+        self.assertEqual(self.archive_count(PostArchive.SITE, 0), 2)
+        self.assertEqual(
+            self.archive_count(PostArchive.AUTHOR, self.user.pk), 2
+        )
+
+    def test_archive_pages(self):
+        kwargs = {"year": self.now.year, "month": self.now.month}
+        pages = {
+            reverse("index_archive", kwargs=kwargs): 3,
+            reverse("group_archive", kwargs={
+                "slug": "mafia-town", **kwargs
+            }): 2,
+            reverse("profile_archive", kwargs={
+                "username": "test", **kwargs
+            }): 3,
+        }
+        for url, expected in pages.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(len(response.context.get("page")), expected)
+                self.assertEqual(len(response.context.get("archive")), 1)
+
+    def test_empty_month_not_found(self):
+        response = self.guest_client.get(reverse("index_archive", kwargs={
+            "year": 1999,
+            "month": 1
+        }))
+        self.assertEqual(response.status_code, 404)
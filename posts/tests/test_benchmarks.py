@@ -0,0 +1,36 @@
+from django.test import TestCase
+
+from posts.benchmarks import BENCHMARKS, compare_results, run_benchmarks, seed
+
+
+class BenchmarkTests(TestCase):
+    def test_compare_flags_regressions(self):
+        baseline = {"results": {
+            "view:index": {"median": 0.010},
+            "view:profile": {"median": 0.010},
+        }}
+        current = {"results": {
+            "view:index": {"median": 0.011},
+            "view:profile": {"median": 0.020},
+            "view:new": {"median": 0.001},
+        }}
+        flagged = {
+            name: regressed
+            for name, *_, regressed in compare_results(baseline, current, 0.2)
+        }
+        self.assertEqual(flagged, {
+            "view:index": False,
+            "view:profile": True,
+            "view:new": False,
+        })
+
+    def test_run_on_seeded_data(self):
+        data = seed(posts=30, users=3, groups=2)
+        names = [
+            "view:index", "view:group_archive", "view:profile_archive",
+            "view:add_comment", "template:index.html:10",
+            "template:post.html:10", "filter:addclass",
+        ]
+        results = run_benchmarks(data, names, repeat=1)["results"]
+        self.assertEqual(set(results), set(names))
+        self.assertTrue(set(names) <= set(BENCHMARKS))
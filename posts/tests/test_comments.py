@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+
+class CommentTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(username="test")
+        cls.post = Post.objects.create(text="test", author=cls.user)
+        first = Comment.objects.create(
+            post=cls.post, author=cls.user, text="first"
+        )
+        second = Comment.objects.create(
+            post=cls.post, author=cls.user, text="second"
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text="reply", parent=first
+        )
+        cls.first = first
+        cls.second = second
+        cls.url = reverse("post", kwargs={
+            "username": "test",
+            "post_id": cls.post.pk
+        })
+
+    def setUp(self) -> None:
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_thread_order_and_count(self):
+        response = self.guest_client.get(self.url)
+        texts = [comment.text for comment in response.context["comments"]]
+        self.assertEqual(texts, ["first", "reply", "second"])
+        self.assertEqual(response.context["post"].comment_count, 3)
+
+    def test_add_reply(self):
+        self.authorized_client.post(
+            reverse("add_comment", kwargs={
+                "username": "test",
+                "post_id": self.post.pk
+            }),
+            data={"text": "answer", "parent": self.second.pk}
+        )
+        reply = Comment.objects.get(text="answer")
+        self.assertEqual(reply.parent, self.second)
+        self.assertEqual(reply.depth, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 4)
+
+    def test_delete_updates_count(self):
+        self.first.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_anonymous_cannot_comment(self):
+        self.guest_client.post(
+            reverse("add_comment", kwargs={
+                "username": "test",
+                "post_id": self.post.pk
+            }),
+            data={"text": "anonymous"}
+        )
+        self.assertFalse(Comment.objects.filter(text="anonymous").exists())
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.counters import flush_views, record_view
+from posts.models import Post
+
+
+class ViewCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        user = get_user_model().objects.create(username="test")
+        cls.quiet = Post.objects.create(text="quiet", author=user)
+        cls.loud = Post.objects.create(text="loud", author=user)
+
+    def setUp(self) -> None:
+        self.guest_client = Client()
+        flush_views()
+
+    def test_views_are_buffered_until_flush(self):
+        for _ in range(3):
+            self.guest_client.get(reverse("post", kwargs={
+                "username": "test",
+                "post_id": self.loud.pk
+            }))
+        self.loud.refresh_from_db()
+        self.assertEqual(self.loud.views_count, 0)
+        self.assertEqual(flush_views(), 3)
+        self.loud.refresh_from_db()
+        self.assertEqual(self.loud.views_count, 3)
+
+    def test_prerender_header_does_not_skip_counting(self):
+        self.guest_client.get(reverse("post", kwargs={
+            "username": "test",
+            "post_id": self.loud.pk
+        }), HTTP_X_PRERENDER="1")
+        self.assertEqual(flush_views(), 1)
+
+    def test_flush_coalesces_updates(self):
+        record_view(self.quiet.pk)
+        record_view(self.loud.pk)
+        with self.assertNumQueries(1):
+            flush_views()
+
+    def test_popular_order(self):
+        record_view(self.quiet.pk)
+        flush_views()
+        response = self.guest_client.get(reverse("popular"))
+        self.assertEqual(response.context["page"][0], self.quiet)
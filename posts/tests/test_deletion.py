@@ -0,0 +1,126 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.archive import archive_total
+from posts.groups import group_choices
+from posts.models import (Comment, Group, PendingDeletion, Post, PostArchive,
+                          Tag)
+
+User = get_user_model()
+
+
+class DeferredDeletionTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+        cls.user = User.objects.create(username="test")
+        cls.reader = User.objects.create(username="reader")
+        cls.group = Group.objects.create(
+            title="Peck", slug="mafia-town", description="Revoluton"
+        )
+        for i in range(5):
+            Post.objects.create(text=f"doomed {i}", author=cls.user,
+                                group=cls.group)
+        cls.post = Post.objects.create(text="survivor", author=cls.reader,
+                                       group=cls.group)
+        comment = Comment.objects.create(
+            post=cls.post, author=cls.user, text="doomed comment"
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text="reply", parent=comment
+        )
+        Comment.objects.create(post=cls.post, author=cls.reader, text="kept")
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def process(self):
+        with self.assertLogs("posts.moderation"):
+            call_command("process_deletions", "--once", "--chunk-size=2",
+                         "--pause=0", stdout=io.StringIO())
+
+    def test_user_is_hidden_then_deleted_in_batches(self):
+        url = reverse("admin:auth_user_delete", args=[self.user.pk])
+        self.assertContains(self.admin_client.get(url), "test")
+        self.admin_client.post(url, {"post": "yes"})
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(self.client.get("/test/").status_code, 404)
+        self.assertNotContains(self.client.get(reverse("index")), "doomed")
+        self.process()
+        self.assertFalse(User.objects.filter(username="test").exists())
+        self.assertFalse(PendingDeletion.objects.exists())
+        self.assertEqual(
+            list(Comment.objects.values_list("text", flat=True)), ["kept"]
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(archive_total(PostArchive.SITE), 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 1)
+
+    def assertCountMatchesPage(self, url):
+        response = self.client.get(url)
+        self.assertEqual(
+            response.context["paginator"].count,
+            len(response.context["page"].object_list), url
+        )
+
+    def test_feed_counts_skip_author_pending_deletion(self):
+        Post.objects.create(text="#doom doomed", author=self.user,
+                            group=self.group)
+        Post.objects.create(text="#doom kept", author=self.reader)
+        self.admin_client.post(
+            reverse("admin:auth_user_delete", args=[self.user.pk]),
+            {"post": "yes"}
+        )
+        urls = [
+            reverse("index"),
+            reverse("group", args=["mafia-town"]),
+            reverse("tag", args=["doom"]),
+        ]
+        for url in urls:
+            self.assertCountMatchesPage(url)
+        self.assertEqual(archive_total(PostArchive.SITE), 2)
+        self.assertEqual(Tag.objects.get(name="doom").post_count, 1)
+        self.process()
+        for url in urls:
+            self.assertCountMatchesPage(url)
+        self.assertEqual(archive_total(PostArchive.SITE), 2)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 1)
+
+    def test_post_of_author_pending_deletion_is_not_found(self):
+        post = Post.objects.filter(author=self.user).first()
+        self.admin_client.post(
+            reverse("admin:auth_user_delete", args=[self.user.pk]),
+            {"post": "yes"}
+        )
+        response = self.client.get(reverse("post", args=["test", post.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_group_is_hidden_then_detached_in_batches(self):
+        url = reverse("admin:posts_group_delete", args=[self.group.pk])
+        self.admin_client.post(url, {"post": "yes"})
+        self.assertTrue(Group.objects.filter(pk=self.group.pk).exists())
+        response = self.client.get(reverse("group", args=["mafia-town"]))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotContains(self.client.get(reverse("groups")), "Peck")
+        self.assertEqual(group_choices(), [])
+        self.process()
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.filter(group=None).count(), 6)
+        self.assertEqual(archive_total(PostArchive.SITE), 6)
+        self.assertFalse(
+            PostArchive.objects.filter(scope=PostArchive.GROUP).exists()
+        )
@@ -0,0 +1,128 @@
+import io
+import json
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import export as export_module
+from posts.export import export_chunks
+from posts.models import DataExport, Group, Post
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(
+            username="test", email="test@example.com"
+        )
+        group = Group.objects.create(
+            title="Peck", slug="mafia-town", description="Revoluton"
+        )
+        for i in range(5):
+            Post.objects.create(text=f"test{i}", author=cls.user,
+                                group=group if i % 2 else None)
+        get_user_model().objects.create(username="other")
+
+    def setUp(self) -> None:
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.url = reverse("export_posts", args=["test"])
+
+    def test_author_streams_archive(self):
+        response = self.authorized_client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertIn("test-posts.zip", response["Content-Disposition"])
+        archive = zipfile.ZipFile(
+            io.BytesIO(b"".join(response.streaming_content))
+        )
+        post = Post.objects.filter(text="test1").first()
+        self.assertEqual(len(archive.namelist()), 11)
+        data = json.loads(archive.read(f"posts/{post.pk}.json"))
+        self.assertEqual(data["group"]["slug"], "mafia-town")
+        self.assertIn(b"test1", archive.read(f"posts/{post.pk}.html"))
+
+    def test_posts_are_read_in_chunks(self):
+        with self.assertNumQueries(3):
+            chunks = list(export_chunks(self.user, chunk_size=2))
+        self.assertEqual(len(chunks), 6)
+
+    def test_only_owner_can_export(self):
+        other = Client()
+        other.force_login(get_user_model().objects.get(username="other"))
+        self.assertEqual(other.get(self.url).status_code, 404)
+        response = Client().get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    @mock.patch("posts.views.EXPORT_STREAM_LIMIT", 2)
+    def test_large_export_is_built_in_background(self):
+        response = self.authorized_client.get(self.url)
+        self.assertFalse(response.streaming)
+        self.assertFalse(DataExport.objects.exists())
+        self.authorized_client.post(self.url)
+        self.authorized_client.post(self.url)
+        export = DataExport.objects.get()
+        self.assertEqual(export.post_count, 5)
+        with tempfile.TemporaryDirectory() as exports_dir:
+            with override_settings(EXPORTS_DIR=exports_dir):
+                with self.assertLogs("posts.export"):
+                    call_command("export_posts", stdout=io.StringIO())
+                export.refresh_from_db()
+                self.assertEqual(export.status, DataExport.READY)
+                download = reverse("export_download", args=["test", export.pk])
+                self.assertIn(download, mail.outbox[0].body)
+                response = self.authorized_client.get(download)
+                archive = zipfile.ZipFile(
+                    io.BytesIO(b"".join(response.streaming_content))
+                )
+                response.close()
+        self.assertEqual(len(archive.namelist()), 11)
+        self.assertContains(self.authorized_client.get(self.url), "новый")
+        self.authorized_client.post(self.url)
+        self.assertEqual(DataExport.objects.count(), 1)
+
+    @mock.patch("posts.views.EXPORT_STREAM_LIMIT", 2)
+    def test_export_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        self.assertEqual(client.post(self.url).status_code, 403)
+        self.assertFalse(DataExport.objects.exists())
+
+    @mock.patch("posts.views.EXPORT_STREAM_LIMIT", 4)
+    def test_hidden_posts_count_towards_export_size(self):
+        Post.objects.filter(text="test0").update(hidden=True)
+        response = self.authorized_client.get(self.url)
+        self.assertFalse(response.streaming)
+        self.authorized_client.post(self.url)
+        self.assertEqual(DataExport.objects.get().post_count, 5)
+
+    def test_failed_export_does_not_stop_the_queue(self):
+        Post.objects.filter(text="test0").update(hidden=True)
+        other = get_user_model().objects.get(username="other")
+        DataExport.objects.create(user=other)
+        real_chunks = export_module.export_chunks
+
+        def chunks(user):
+            if user == other:
+                raise OSError("disk full")
+            return real_chunks(user)
+        with tempfile.TemporaryDirectory() as exports_dir:
+            with override_settings(EXPORTS_DIR=exports_dir):
+                with mock.patch("posts.export.export_chunks", chunks):
+                    with self.assertLogs("posts") as logs:
+                        with self.assertRaises(CommandError):
+                            call_command("export_posts", "--user", "test",
+                                         stdout=io.StringIO())
+        self.assertIn("disk full", "\n".join(logs.output))
+        self.assertEqual(
+            DataExport.objects.get(user=other).status, DataExport.FAILED
+        )
+        export = DataExport.objects.get(user=self.user)
+        self.assertEqual(export.status, DataExport.READY)
+        self.assertEqual(export.post_count, 5)
@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.paginator import decode_cursor, encode_cursor
+
+
+class FragmentTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        user = get_user_model().objects.create(username="test")
+        group = Group.objects.create(
+            title="Peck",
+            slug="mafia-town",
+            description="Revoluton"
+        )
+        for i in range(25):
+            Post.objects.create(text="test" + str(i), author=user,
+                                group=group)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_cursor_round_trip(self):
+        post = Post.objects.first()
+        self.assertEqual(
+            decode_cursor(encode_cursor(post)), (post.pub_date, post.pk)
+        )
+        self.assertIsNone(decode_cursor("garbage"))
+
+    def test_fragments_continue_feeds(self):
+        fragments = {
+            "index": reverse("index_fragment"),
+            "group": reverse("group_fragment", args=["mafia-town"]),
+            "profile": reverse("profile_fragment", args=["test"]),
+        }
+        for name, fragment_url in fragments.items():
+            with self.subTest(name=name):
+                page = self.guest_client.get(reverse(name, args={
+                    "index": [],
+                    "group": ["mafia-town"],
+                    "profile": ["test"],
+                }[name]))
+                self.assertEqual(page.context["fragment_url"], fragment_url)
+                response = self.guest_client.get(fragment_url, {
+                    "after": page.context["next_cursor"],
+                    "page": 2,
+                })
+                texts = [post.text for post in response.context["page"]]
+                self.assertEqual(
+                    texts, [f"test{i}" for i in range(14, 4, -1)]
+                )
+                self.assertNotContains(response, "<html>")
+                self.assertEqual(response.context["next_page"], 3)
+
+    def test_last_fragment_has_no_cursor(self):
+        last = Post.objects.all()[19]
+        response = self.guest_client.get(reverse("index_fragment"), {
+            "after": encode_cursor(last)
+        })
+        self.assertEqual(len(response.context["page"]), 5)
+        self.assertIsNone(response.context["next_cursor"])
+        self.assertNotContains(response, "load-more")
+
+    def test_fragment_is_cached_for_anonymous(self):
+        url = reverse("index_fragment")
+        params = {"after": encode_cursor(Post.objects.first())}
+        self.guest_client.get(url, params)
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, params)
+        self.assertIn("max-age", response["Cache-Control"])
+        Post.objects.create(text="new", author=Post.objects.first().author)
+        response = self.guest_client.get(url, params)
+        self.assertIsNotNone(response.context)
+
+    def test_bad_cursor(self):
+        response = self.guest_client.get(reverse("index_fragment"), {
+            "after": "nope"
+        })
+        self.assertEqual(response.status_code, 404)
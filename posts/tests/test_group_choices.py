@@ -0,0 +1,69 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.forms import GroupAutocomplete, PostForm
+from posts.models import Group, Post
+
+
+class GroupChoicesTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(username="test")
+        for title, slug in (
+            ("Шляпы", "hats"),
+            ("Шарфы", "scarves"),
+            ("Mafia Town", "mafia-town"),
+        ):
+            Group.objects.create(title=title, slug=slug, description="-")
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_cached_choices_render_without_queries(self):
+        html = str(PostForm()["group"])
+        with self.assertNumQueries(0):
+            self.assertEqual(str(PostForm()["group"]), html)
+        self.assertIn("Mafia Town", html)
+        Group.objects.create(title="Новая", slug="new-one", description="-")
+        self.assertIn("Новая", str(PostForm()["group"]))
+
+    @mock.patch("posts.groups.GROUP_CHOICES_LIMIT", 2)
+    def test_many_groups_switch_to_autocomplete(self):
+        group = Group.objects.get(slug="hats")
+        post = Post.objects.create(text="test", author=self.user, group=group)
+        form = PostForm(instance=post)
+        self.assertIsInstance(form.fields["group"].widget, GroupAutocomplete)
+        with self.assertNumQueries(1):
+            html = str(form["group"])
+        self.assertIn("Шляпы", html)
+        self.assertNotIn("Шарфы", html)
+        self.assertIn(reverse("group_autocomplete"), html)
+        scarves = Group.objects.get(slug="scarves")
+        form = PostForm({"text": "edited", "group": scarves.pk},
+                        instance=post)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["group"], scarves)
+
+    def test_autocomplete_matches_prefixes(self):
+        url = reverse("group_autocomplete")
+        for query, titles in (
+            ("ш", ["Шарфы", "Шляпы"]),
+            ("ШЛ", ["Шляпы"]),
+            ("maf", ["Mafia Town"]),
+            ("scar", ["Шарфы"]),
+            ("town", []),
+            ("", []),
+        ):
+            with self.subTest(query=query):
+                response = self.authorized_client.get(url, {"q": query})
+                self.assertEqual(
+                    [group["title"] for group in response.json()["results"]],
+                    titles
+                )
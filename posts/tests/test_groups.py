@@ -0,0 +1,99 @@
+import datetime as dt
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Group, Post
+
+
+class GroupDirectoryTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        user = get_user_model().objects.create(username="test")
+        cls.big = Group.objects.create(
+            title="Peck",
+            slug="mafia-town",
+            description="Revoluton"
+        )
+        cls.small = Group.objects.create(
+            title="Hat",
+            slug="hat-kid",
+            description="Time pieces"
+        )
+        for i in range(3):
+            Post.objects.create(text="test" + str(i), author=user,
+                                group=cls.big)
+        Post.objects.create(text="latest", author=user, group=cls.small)
+
+    def setUp(self) -> None:
+        self.guest_client = Client()
+
+    def test_stats_updated_on_write(self):
+        self.big.refresh_from_db()
+        self.assertEqual(self.big.post_count, 3)
+        self.assertEqual(self.big.posts_last_week, 3)
+        self.assertEqual(
+            self.big.last_post_at,
+            Post.objects.filter(group=self.big).first().pub_date
+        )
+        Post.objects.filter(group=self.big).first().delete()
+        self.big.refresh_from_db()
+        self.assertEqual(self.big.post_count, 2)
+        self.assertEqual(self.big.posts_last_week, 2)
+
+    def test_last_post_at_falls_back_to_previous_post(self):
+        latest, previous = Post.objects.filter(group=self.big)[:2]
+        latest.hidden = True
+        latest.save()
+        self.big.refresh_from_db()
+        self.assertEqual(self.big.last_post_at, previous.pub_date)
+        latest.hidden = False
+        latest.save()
+        self.big.refresh_from_db()
+        self.assertEqual(self.big.last_post_at, latest.pub_date)
+        Post.objects.filter(group=self.small).get().delete()
+        self.small.refresh_from_db()
+        self.assertIsNone(self.small.last_post_at)
+
+    def test_directory_sorting(self):
+        orders = {
+            "size": ["mafia-town", "hat-kid"],
+            "activity": ["hat-kid", "mafia-town"],
+        }
+        for sort, expected in orders.items():
+            with self.subTest(sort=sort):
+                response = self.guest_client.get(
+                    reverse("groups"), {"sort": sort}
+                )
+                slugs = [group.slug for group in response.context["page"]]
+                self.assertEqual(slugs, expected)
+
+    def test_pages_keep_sorting(self):
+        Group.objects.bulk_create([
+            Group(title=f"Group {i}", slug=f"group-{i}", post_count=100 + i)
+            for i in range(10)
+        ])
+        response = self.guest_client.get(reverse("groups"), {"sort": "size"})
+        self.assertContains(response, 'href="?sort=size&amp;page=2"')
+        response = self.guest_client.get(
+            reverse("groups"), {"sort": "size", "page": 2}
+        )
+        slugs = [group.slug for group in response.context["page"]]
+        self.assertEqual(slugs, ["mafia-town", "hat-kid"])
+        self.assertContains(response, 'href="?sort=size&amp;page=1"')
+
+    def test_reconcile_command(self):
+        Post.objects.filter(group=self.big).update(
+            pub_date=timezone.now() - dt.timedelta(days=30)
+        )
+        Group.objects.filter(pk=self.small.pk).update(post_count=10)
+        call_command("reconcile_groups", stdout=StringIO())
+        self.big.refresh_from_db()
+        self.small.refresh_from_db()
+        self.assertEqual(self.big.posts_last_week, 0)
+        self.assertEqual(self.small.post_count, 1)
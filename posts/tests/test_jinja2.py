@@ -0,0 +1,98 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Group, Post
+from posts.paginator import encode_cursor
+
+JINJA2_PAGES = [
+    "index.html", "group.html", "profile.html", "post.html",
+    "index_fragment.html", "group_fragment.html", "profile_fragment.html",
+]
+
+
+def normalize(html):
+    html = re.sub(r'name="csrfmiddlewaretoken" value="[^"]*"', "", html)
+    html = re.sub(r">\s+<", "><", html)
+    return re.sub(r"\s+", " ", html).strip()
+
+
+class JinjaEquivalenceTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        user = get_user_model().objects.create(
+            username="test", first_name="Hat", last_name="Kid"
+        )
+        Group.objects.create(
+            title="Peck",
+            slug="mafia-town",
+            description="Revoluton"
+        )
+        for i in range(12):
+            Post.objects.create(
+                text=f"<b>test</b> {i}\nline",
+                author=user,
+                group=Group.objects.first() if i % 2 else None
+            )
+        cls.post = Post.objects.first()
+        comment = Comment.objects.create(
+            post=cls.post, author=user, text="<i>first</i>\nline"
+        )
+        Comment.objects.create(
+            post=cls.post, author=user, text="reply", parent=comment
+        )
+        cls.user = user
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def assert_same_html(self, client, url):
+        django_html = client.get(url).content.decode()
+        with override_settings(JINJA2_TEMPLATES=JINJA2_PAGES):
+            jinja_html = client.get(url).content.decode()
+        self.assertEqual(normalize(jinja_html), normalize(django_html))
+
+    def test_pages_render_the_same(self):
+        now = timezone.localtime()
+        urls = [
+            reverse("index"),
+            reverse("index") + "?page=2",
+            reverse("popular"),
+            reverse("index_archive", kwargs={
+                "year": now.year,
+                "month": now.month
+            }),
+            reverse("group", kwargs={"slug": "mafia-town"}),
+            reverse("profile", kwargs={"username": "test"}),
+            reverse("post", kwargs={
+                "username": "test",
+                "post_id": self.post.pk
+            }),
+        ]
+        cursor = encode_cursor(Post.objects.all()[1])
+        urls += [
+            reverse(name, args=args) + f"?after={cursor}&page=2"
+            for name, args in (
+                ("index_fragment", []),
+                ("group_fragment", ["mafia-town"]),
+                ("profile_fragment", ["test"]),
+            )
+        ]
+        for client in (self.guest_client, self.authorized_client):
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assert_same_html(client, url)
+
+    @override_settings(JINJA2_TEMPLATES=JINJA2_PAGES)
+    def test_pages_use_jinja2(self):
+        response = self.guest_client.get(reverse("index"))
+        self.assertEqual(response.templates, [])
+        self.assertContains(response, "<b>test</b> 11<br>line")
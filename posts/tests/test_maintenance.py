@@ -0,0 +1,115 @@
+import io
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase
+
+from posts.maintenance import cursor_key, run_step
+from posts.models import Comment, Group, Post, PostArchive
+
+User = get_user_model()
+
+
+class MaintenanceTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username="test")
+        cls.group = Group.objects.create(
+            title="Peck", slug="mafia-town", description="Revoluton"
+        )
+        cls.post = Post.objects.create(text="Spaceship", author=cls.user,
+                                       group=cls.group)
+        Post.objects.create(text="Time piece", author=cls.user)
+        Comment.objects.create(post=cls.post, author=cls.user, text="Hat")
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def corrupt(self):
+        PostArchive.objects.filter(scope=PostArchive.AUTHOR).update(
+            post_count=99
+        )
+        PostArchive.objects.filter(scope=PostArchive.GROUP).delete()
+        Group.objects.filter(pk=self.group.pk).update(post_count=0)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=5)
+
+    def archive_counts(self, scope, object_id):
+        return list(PostArchive.objects.filter(
+            scope=scope, object_id=object_id
+        ).values_list("post_count", flat=True))
+
+    def test_reconcile_fixes_counters(self):
+        self.corrupt()
+        report, finished = run_step("reconcile", pause=0)
+        self.assertTrue(finished)
+        self.assertEqual(report["archive_author_drift"], 1)
+        self.assertEqual(report["archive_group_drift"], 1)
+        self.assertEqual(report["group_stats_drift"], 1)
+        self.assertEqual(report["comment_count_drift"], 1)
+        self.assertEqual(
+            self.archive_counts(PostArchive.AUTHOR, self.user.pk), [2]
+        )
+        self.assertEqual(
+            self.archive_counts(PostArchive.GROUP, self.group.pk), [1]
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        report, finished = run_step("reconcile", pause=0)
+        self.assertNotIn("archive_author_drift", report)
+        self.assertNotIn("comment_count_drift", report)
+
+    def test_check_reports_without_fixing(self):
+        self.corrupt()
+        report, finished = run_step("check", pause=0)
+        self.assertTrue(finished)
+        self.assertEqual(report["integrity_errors:default"], 0)
+        self.assertEqual(report["archive_author_drift"], 1)
+        self.assertEqual(report["comment_count_drift"], 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 5)
+
+    def test_budget_leaves_cursor_for_next_run(self):
+        self.corrupt()
+        # Сайт, авторы, группы и посты: по срезу за запуск.
+        for phase in ("site", "authors", "groups", "comments:default"):
+            with self.assertLogs("posts.maintenance"):
+                report, finished = run_step("reconcile", budget=0, pause=0)
+            self.assertFalse(finished)
+            self.assertEqual(cache.get(cursor_key("reconcile"))[0], phase)
+        report, finished = run_step("reconcile", budget=0, pause=0)
+        self.assertTrue(finished)
+        self.assertIsNone(cache.get(cursor_key("reconcile")))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_command_prints_sizes(self):
+        out = io.StringIO()
+        call_command("maintenance", "analyze", "sizes", "--pause=0",
+                     stdout=out)
+        self.assertIn("sizes: завершен", out.getvalue())
+        self.assertIn("default:posts_post", out.getvalue())
+
+    def test_sizes_without_dbstat(self):
+        real_cursor = connection.cursor
+
+        def cursor():
+            db = real_cursor()
+            execute = db.execute
+
+            def execute_without_dbstat(sql, params=None):
+                if "dbstat" in sql:
+                    raise OperationalError("no such table: dbstat")
+                return execute(sql, params)
+            db.execute = execute_without_dbstat
+            return db
+        with mock.patch.object(connection, "cursor", cursor):
+            report, finished = run_step("sizes", pause=0, restart=True)
+        self.assertTrue(finished)
+        self.assertEqual(report["dbstat_unavailable:default"], 1)
+        self.assertGreater(report["default:total"], 0)
@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.mentions import extract_mentions, notify_mentions
+from posts.moderation import set_hidden
+from posts.models import Inbox, Notification, Post
+
+User = get_user_model()
+
+
+class MentionTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username="test")
+        cls.reader = User.objects.create(username="reader")
+        cls.other = User.objects.create(username="other")
+
+    def setUp(self) -> None:
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def unread(self, user):
+        return Inbox.objects.filter(user=user).values_list(
+            "unread", flat=True
+        ).first() or 0
+
+    def test_extract_mentions(self):
+        self.assertEqual(
+            extract_mentions("@reader, @hat.kid. и mail@example.com @"),
+            {"reader", "hat.kid"}
+        )
+
+    def test_new_post_notifies_mentioned_users_once(self):
+        self.authorized_client.post(
+            reverse("new_post"),
+            {"text": "Привет, @reader и @ghost! Это @test"}
+        )
+        post = Post.objects.get()
+        self.assertEqual(list(Notification.objects.values_list(
+            "recipient__username", "post_id"
+        )), [("reader", post.pk)])
+        self.assertEqual(self.unread(self.reader), 1)
+        self.authorized_client.post(
+            reverse("post_edit", args=["test", post.pk]),
+            {"text": "Привет, @reader и @other!"}
+        )
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(self.unread(self.reader), 1)
+        self.assertEqual(self.unread(self.other), 1)
+        post.delete()
+        self.assertFalse(Notification.objects.exists())
+
+    def test_fan_out_query_count_does_not_grow(self):
+        User.objects.bulk_create(
+            [User(username=f"user{i}") for i in range(200)]
+        )
+        queries = []
+        for count in (2, 200):
+            post = Post.objects.create(text="Без упоминаний", author=self.user)
+            post.text = " ".join(f"@user{i}" for i in range(count))
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(notify_mentions(post), count)
+            queries.append(len(context))
+        self.assertEqual(queries[0], queries[1])
+        self.assertEqual(self.unread(User.objects.get(username="user1")), 2)
+
+    def test_inbox_resets_unread_counter(self):
+        for i in range(2):
+            Post.objects.create(text=f"@reader пост {i}", author=self.user)
+        self.assertContains(
+            self.reader_client.get(reverse("index")), "Уведомления (2)"
+        )
+        response = self.reader_client.get(reverse("notifications"))
+        notifications = response.context["page"].object_list
+        self.assertEqual([n.is_new for n in notifications], [True, True])
+        self.assertEqual(notifications[0].post.text, "@reader пост 1")
+        self.assertEqual(self.unread(self.reader), 0)
+        response = self.reader_client.get(reverse("notifications"))
+        self.assertEqual(
+            [n.is_new for n in response.context["page"].object_list],
+            [False, False]
+        )
+        self.assertNotContains(response, "Уведомления (")
+
+    def test_unread_counter_follows_deleted_and_hidden_posts(self):
+        read = Post.objects.create(text="@reader старый", author=self.user)
+        self.reader_client.get(reverse("notifications"))
+        posts = [
+            Post.objects.create(text=f"@reader пост {i}", author=self.user)
+            for i in range(3)
+        ]
+        self.assertEqual(self.unread(self.reader), 3)
+        read.delete()
+        self.assertEqual(self.unread(self.reader), 3)
+        posts[0].delete()
+        self.assertEqual(self.unread(self.reader), 2)
+        with self.assertLogs("posts.moderation"):
+            set_hidden(Post.objects.filter(pk=posts[1].pk), True)
+        self.assertEqual(self.unread(self.reader), 1)
+        response = self.reader_client.get(reverse("notifications"))
+        self.assertEqual(
+            [n.is_new for n in response.context["page"].object_list], [True]
+        )
+        self.assertEqual(self.unread(self.reader), 0)
+        with self.assertLogs("posts.moderation"):
+            set_hidden(Post.objects.filter(pk=posts[1].pk), False)
+        self.assertEqual(self.unread(self.reader), 1)
+        self.assertContains(
+            self.reader_client.get(reverse("index")), "Уведомления (1)"
+        )
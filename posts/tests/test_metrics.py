@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+import threading
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.metrics import collect, inc, process_totals, render_metrics
+from posts.models import Post
+from posts.paginator import encode_cursor
+
+INDEX = (("view", "index"),)
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        user = get_user_model().objects.create(username="test")
+        cls.staff = get_user_model().objects.create(
+            username="staff", is_staff=True
+        )
+        for i in range(12):
+            Post.objects.create(text="test" + str(i), author=user)
+        cls.metrics_dir = tempfile.TemporaryDirectory()
+        cls.settings_override = override_settings(
+            METRICS_DIR=cls.metrics_dir.name
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.settings_override.disable()
+        cls.metrics_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_requests_and_cache_are_counted(self):
+        before = process_totals()
+        self.guest_client.get(reverse("index"))
+        params = {"after": encode_cursor(Post.objects.first())}
+        for _ in range(2):
+            self.guest_client.get(reverse("index_fragment"), params)
+        delta = process_totals()
+        delta.subtract(before)
+        requests = INDEX + (("method", "GET"), ("status", "200"))
+        self.assertEqual(delta["yatube_requests_total", requests], 1)
+        self.assertEqual(
+            delta["yatube_request_duration_seconds_count", INDEX], 1
+        )
+        self.assertGreater(delta["yatube_request_query_seconds_sum", INDEX], 0)
+        self.assertEqual(delta["yatube_template_render_seconds_count", (
+            ("template", "index.html"),
+        )], 1)
+        for result, count in (("hit", 1), ("miss", 2)):
+            self.assertEqual(delta["yatube_page_cache_total", (
+                ("result", result),
+            )], count)
+
+    def test_endpoint_sums_worker_files(self):
+        requests = INDEX + (("method", "GET"), ("status", "200"))
+        self.guest_client.get(reverse("index"))
+        own = collect()["yatube_requests_total", requests]
+        path = os.path.join(self.metrics_dir.name, "other-worker.json")
+        with open(path, "w") as other:
+            json.dump([
+                ["yatube_requests_total", [list(pair) for pair in requests],
+                 5],
+            ], other)
+        staff_client = Client()
+        staff_client.force_login(self.staff)
+        response = staff_client.get(reverse("metrics"))
+        self.assertEqual(response["Content-Type"].split(";")[0], "text/plain")
+        self.assertContains(
+            response,
+            'yatube_requests_total{view="index",method="GET",status="200"} '
+            f"{own + 5}"
+        )
+        os.remove(path)
+
+    def test_endpoint_is_internal(self):
+        url = reverse("metrics")
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
+        user_client = Client()
+        user_client.force_login(get_user_model().objects.get(username="test"))
+        self.assertEqual(user_client.get(url).status_code, 404)
+        with override_settings(INTERNAL_IPS=["127.0.0.1"]):
+            self.assertEqual(self.guest_client.get(url).status_code, 200)
+
+    def test_finished_threads_keep_their_counts(self):
+        labels = (("view", "thread"),)
+        before = process_totals()["yatube_requests_total", labels]
+        threads = [
+            threading.Thread(target=inc, args=("yatube_requests_total",
+                                               labels))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(
+            process_totals()["yatube_requests_total", labels], before + 5
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        totals = Counter({
+            ("yatube_request_queries_bucket", INDEX + (("le", "1"),)): 2,
+            ("yatube_request_queries_bucket", INDEX + (("le", "+Inf"),)): 1,
+            ("yatube_request_queries_sum", INDEX): 302,
+            ("yatube_request_queries_count", INDEX): 3,
+        })
+        lines = render_metrics(totals).splitlines()
+        self.assertIn(
+            'yatube_request_queries_bucket{view="index",le="0"} 0', lines
+        )
+        self.assertIn(
+            'yatube_request_queries_bucket{view="index",le="5"} 2', lines
+        )
+        self.assertIn(
+            'yatube_request_queries_bucket{view="index",le="+Inf"} 3', lines
+        )
+        self.assertIn('yatube_request_queries_count{view="index"} 3', lines)
+        self.assertIn("# TYPE yatube_request_queries histogram", lines)
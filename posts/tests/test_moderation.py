@@ -0,0 +1,126 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.archive import archive_total
+from posts.models import Comment, Group, Post, PostArchive
+from posts.moderation import delete_posts
+
+
+class ModerationTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.admin = get_user_model().objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+        cls.user = get_user_model().objects.create(username="test")
+        cls.group = Group.objects.create(
+            title="Peck", slug="mafia-town", description="Revoluton"
+        )
+        cls.other_group = Group.objects.create(
+            title="Subcon", slug="subcon", description="Forest"
+        )
+        for i in range(25):
+            Post.objects.create(text=f"spam {i}", author=cls.user,
+                                group=cls.group)
+        for i in range(5):
+            Post.objects.create(text=f"ham {i}", author=cls.user,
+                                group=cls.group)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+        self.changelist = reverse("admin:posts_post_changelist")
+
+    def run_action(self, action, query="spam", **data):
+        first = Post.objects.filter(text__startswith=query).first()
+        with self.assertLogs("posts.moderation"):
+            return self.admin_client.post(f"{self.changelist}?q={query}", {
+                "action": action,
+                "_selected_action": [first.pk],
+                "select_across": "1",
+                **data
+            })
+
+    def assert_counts(self, site, group, other_group=0):
+        self.assertEqual(archive_total(PostArchive.SITE), site)
+        self.assertEqual(
+            archive_total(PostArchive.GROUP, self.group.pk), group
+        )
+        self.assertEqual(
+            archive_total(PostArchive.GROUP, self.other_group.pk),
+            other_group
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, group)
+
+    def test_hide_and_unhide_matching_filter(self):
+        self.run_action("hide_posts", index="0")
+        self.assertEqual(Post.objects.filter(hidden=True).count(), 25)
+        self.assert_counts(5, 5)
+        response = self.client.get(reverse("index"))
+        self.assertNotContains(response, "spam")
+        self.run_action("unhide_posts", index="0")
+        self.assertFalse(Post.objects.filter(hidden=True).exists())
+        self.assert_counts(30, 30)
+
+    def test_move_to_group_asks_for_group(self):
+        response = self.admin_client.post(f"{self.changelist}?q=spam", {
+            "action": "move_to_group",
+            "_selected_action": [Post.objects.first().pk],
+            "select_across": "1",
+            "index": "0",
+        })
+        self.assertContains(response, 'name="slug"')
+        self.run_action("move_to_group", slug="subcon", apply="1")
+        self.assertEqual(self.other_group.posts.count(), 25)
+        self.assert_counts(30, 5, 25)
+
+    def test_large_selection_is_refused(self):
+        with mock.patch("posts.admin.MODERATION_ADMIN_LIMIT", 10):
+            response = self.admin_client.post(
+                f"{self.changelist}?q=spam", {
+                    "action": "hide_posts",
+                    "_selected_action": [Post.objects.first().pk],
+                    "select_across": "1",
+                    "index": "0",
+                }, follow=True
+            )
+        self.assertContains(response, "Выбрано постов: 25")
+        self.assertFalse(Post.objects.filter(hidden=True).exists())
+
+    def test_delete_in_chunks(self):
+        post = Post.objects.filter(text="spam 0").first()
+        Comment.objects.create(post=post, author=self.user, text="comment")
+        hidden = Post.objects.get(text="spam 1")
+        hidden.hidden = True
+        hidden.save()
+        with self.assertLogs("posts.moderation") as logs:
+            deleted = delete_posts(
+                Post.objects.filter(text__startswith="spam"), chunk_size=10
+            )
+        self.assertEqual(deleted, 25)
+        self.assertEqual(len(logs.output), 3)
+        self.assertFalse(Comment.objects.exists())
+        self.assert_counts(5, 5)
+
+    def test_hiding_single_post_updates_counts(self):
+        post = Post.objects.first()
+        post.hidden = True
+        post.save()
+        self.assert_counts(29, 29)
+        post.delete()
+        self.assert_counts(29, 29)
+
+    def test_hidden_post_page_is_not_found(self):
+        post = Post.objects.first()
+        post.hidden = True
+        post.save()
+        for username in ("test", "admin"):
+            url = reverse("post", args=[username, post.pk])
+            self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,58 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.caching import LOCK_PREFIX, page_key
+from posts.metrics import process_totals
+from posts.models import Post
+
+STALE = ("yatube_page_cache_total", (("result", "stale"),))
+REGENERATIONS = ("yatube_page_regeneration_seconds_count", ())
+
+
+class StaleWhileRevalidateTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(username="test")
+        Post.objects.create(text="old post", author=cls.user)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.guest_client = Client()
+        self.url = reverse("index")
+        self.guest_client.get(self.url)
+        request = self.guest_client.get(self.url).wsgi_request
+        self.lock = LOCK_PREFIX + page_key(request)
+
+    def test_fresh_page_is_served_from_cache(self):
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(self.url)
+        self.assertIsNone(response.context)
+        self.assertContains(response, "old post")
+
+    def test_stale_page_is_served_while_locked(self):
+        Post.objects.create(text="new post", author=self.user)
+        cache.add(self.lock, 1)
+        before = process_totals()
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(self.url)
+        self.assertNotContains(response, "new post")
+        cache.delete(self.lock)
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, "new post")
+        self.assertIsNone(cache.get(self.lock))
+        delta = process_totals()
+        delta.subtract(before)
+        self.assertEqual(delta[STALE], 1)
+        self.assertEqual(delta[REGENERATIONS], 1)
+
+    @mock.patch("posts.caching.PAGE_MAX_STALENESS", -60)
+    def test_page_is_not_served_past_max_staleness(self):
+        Post.objects.create(text="new post", author=self.user)
+        cache.add(self.lock, 1)
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, "new post")
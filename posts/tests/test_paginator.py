@@ -1,10 +1,12 @@
 import datetime as dt
 
 from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
 from django.test import Client, TestCase
 from django.urls import reverse
 
 from posts.models import Post
+from posts.paginator import ELLIPSIS, page_window
 
 
 class PaginatorViewsTest(TestCase):
@@ -30,3 +32,27 @@ class PaginatorViewsTest(TestCase):
     def test_second_page_containse_three_records(self):
         response = self.client.get(reverse('index') + '?page=2')
         self.assertEqual(len(response.context.get('page').object_list), 3)
+
+    def test_template_renders_window(self):
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, 'href="?page=2"')
+
+
+class WindowedPaginatorTest(TestCase):
+    def test_page_window(self):
+        paginator = Paginator(range(1000), 10)
+        windows = {
+            1: [1, 2, 3, ELLIPSIS, 100],
+            5: [1, 2, 3, 4, 5, 6, 7, ELLIPSIS, 100],
+            50: [1, ELLIPSIS, 48, 49, 50, 51, 52, ELLIPSIS, 100],
+            100: [1, ELLIPSIS, 98, 99, 100],
+        }
+        for number, expected in windows.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(page_window(paginator.page(number))), expected
+                )
+
+    def test_short_range_is_complete(self):
+        paginator = Paginator(range(30), 10)
+        self.assertEqual(list(page_window(paginator.page(2))), [1, 2, 3])
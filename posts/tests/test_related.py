@@ -0,0 +1,84 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, RelatedPost, RelatedPostChange
+
+User = get_user_model()
+
+TEXTS = (
+    "кошки любят спать на солнце",
+    "кошки любят молоко",
+    "собаки любят гулять в парке",
+    "собаки охраняют дом",
+    "поезд едет быстро",
+    "поезд опаздывает",
+)
+
+
+class RelatedPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username="test")
+        cls.posts = [
+            Post.objects.create(text=text, author=cls.user) for text in TEXTS
+        ]
+
+    def setUp(self) -> None:
+        self.guest_client = Client()
+
+    def run_command(self, *args):
+        out = io.StringIO()
+        with self.assertLogs("posts.tfidf"):
+            call_command("related_posts", *args, stdout=out)
+        return out.getvalue()
+
+    def related_ids(self, post):
+        return list(RelatedPost.objects.filter(
+            post_id=post.pk
+        ).values_list("related_id", flat=True))
+
+    def post_page(self, post):
+        return self.guest_client.get(
+            reverse("post", args=[self.user.username, post.pk])
+        )
+
+    def test_full_run_ranks_neighbours_by_similarity(self):
+        self.assertIn("Обновлено постов: 6", self.run_command("--all"))
+        cats, milk, dogs, guard, fast, late = self.posts
+        self.assertEqual(self.related_ids(cats)[:2], [milk.pk, dogs.pk])
+        self.assertEqual(self.related_ids(fast), [late.pk])
+        self.assertFalse(RelatedPostChange.objects.exists())
+        response = self.post_page(cats)
+        self.assertContains(response, "Похожие записи")
+        self.assertContains(response, "кошки любят молоко")
+        self.assertNotContains(response, "поезд")
+
+    def test_incremental_run_processes_only_queued_posts(self):
+        self.run_command("--all")
+        fast = self.posts[4]
+        new = Post.objects.create(text="поезд едет медленно", author=self.user)
+        self.assertIn("Обновлено постов: 1", self.run_command())
+        self.assertEqual(self.related_ids(new)[0], fast.pk)
+        self.assertNotIn(new.pk, self.related_ids(fast))
+        out = io.StringIO()
+        call_command("related_posts", stdout=out)
+        self.assertIn("Обновлено постов: 0", out.getvalue())
+
+    def test_hidden_and_deleted_neighbours_disappear(self):
+        self.run_command("--all")
+        cats, milk, dogs = self.posts[:3]
+        milk.hidden = True
+        milk.save()
+        self.assertNotContains(self.post_page(cats), "кошки любят молоко")
+        self.assertContains(self.post_page(cats), "собаки любят гулять")
+        dogs.delete()
+        self.assertFalse(
+            RelatedPost.objects.filter(related_id=dogs.pk).exists()
+        )
+        call_command("related_posts", stdout=io.StringIO())
+        self.assertEqual(self.related_ids(milk), [])
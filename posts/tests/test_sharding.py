@@ -0,0 +1,149 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.archive import archive_total
+from posts.models import Comment, Group, Post, PostArchive
+from posts.paginator import encode_cursor
+from posts.sharding import shard_for_author
+
+from yatube.testing import TEST_SHARD as SHARD
+
+SHARDS = ["default", SHARD]
+
+
+@override_settings(POST_SHARDS=SHARDS)
+class ShardingTests(TestCase):
+    databases = {"default", SHARD}
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        User = get_user_model()
+        cls.authors = {}
+        i = 0
+        while len(cls.authors) < 2:
+            user = User.objects.create(username=f"author{i}")
+            cls.authors.setdefault(shard_for_author(user.pk), user)
+            i += 1
+        cls.group = Group.objects.create(
+            title="Peck",
+            slug="mafia-town",
+            description="Revoluton"
+        )
+        for i in range(24):
+            Post.objects.create(
+                text=f"test{i}", author=cls.authors[SHARDS[i % 2]],
+                group=cls.group if i % 3 else None
+            )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.guest_client = Client()
+
+    def texts(self, posts):
+        return [post.text for post in posts]
+
+    def test_posts_live_on_author_shard(self):
+        for alias, author in self.authors.items():
+            self.assertEqual(
+                Post.objects.using(alias).filter(author=author).count(), 12
+            )
+            self.assertEqual(author.posts.count(), 12)
+        pks = [
+            pk for alias in SHARDS
+            for pk in Post.objects.using(alias).values_list("pk", flat=True)
+        ]
+        self.assertEqual(len(set(pks)), 24)
+
+    def test_feeds_merge_shards(self):
+        response = self.guest_client.get(reverse("index"))
+        self.assertEqual(
+            self.texts(response.context["page"]),
+            [f"test{i}" for i in range(23, 13, -1)]
+        )
+        self.assertEqual(response.context["paginator"].count, 24)
+        response = self.guest_client.get(reverse("index_fragment"), {
+            "after": response.context["next_cursor"]
+        })
+        self.assertEqual(
+            self.texts(response.context["page"]),
+            [f"test{i}" for i in range(13, 3, -1)]
+        )
+        response = self.guest_client.get(
+            reverse("group", args=["mafia-town"]), {"page": 2}
+        )
+        self.assertEqual(
+            self.texts(response.context["page"]),
+            [f"test{i}" for i in (8, 7, 5, 4, 2, 1)]
+        )
+
+    def test_author_pages_touch_one_shard(self):
+        author = self.authors["default"]
+        post = author.posts.first()
+        Comment.objects.create(post=post, author=author, text="hello")
+        urls = [
+            reverse("profile", args=[author.username]),
+            reverse("profile_fragment", args=[author.username])
+            + f"?after={encode_cursor(post)}",
+            reverse("post", args=[author.username, post.pk]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with self.assertNumQueries(0, using=SHARD):
+                    response = self.guest_client.get(url)
+                self.assertContains(response, "test")
+
+    def test_admin_actions_reach_every_shard(self):
+        admin = get_user_model().objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+        client = Client()
+        client.force_login(admin)
+        with self.assertLogs("posts.moderation"):
+            client.post(reverse("admin:posts_post_changelist") + "?q=test", {
+                "action": "hide_posts",
+                "_selected_action": [Post.objects.first().pk],
+                "select_across": "1",
+                "index": "0",
+            })
+        for alias in SHARDS:
+            self.assertFalse(
+                Post.objects.using(alias).filter(hidden=False).exists()
+            )
+        self.assertEqual(archive_total(PostArchive.SITE), 0)
+
+    def test_comments_follow_post(self):
+        author = self.authors[SHARD]
+        post = author.posts.first()
+        client = Client()
+        client.force_login(self.authors["default"])
+        client.post(reverse("add_comment", args=[author.username, post.pk]),
+                    {"text": "hello"})
+        comment = Comment.objects.using(SHARD).get()
+        self.assertEqual(comment.path, f"{comment.pk:010d}")
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        response = client.get(reverse("post", args=[author.username, post.pk]))
+        self.assertContains(response, "hello")
+
+    def test_reshard_moves_authors_back(self):
+        author = self.authors[SHARD]
+        post = author.posts.first()
+        Comment.objects.create(post=post, author=author, text="moved")
+        pks = set(author.posts.values_list("pk", flat=True))
+        with override_settings(POST_SHARDS=["default"]):
+            call_command("reshard_posts", "--retired", SHARD,
+                         stdout=io.StringIO())
+            self.assertEqual(
+                set(author.posts.values_list("pk", flat=True)), pks
+            )
+            self.assertEqual(
+                Comment.objects.get(text="moved").post_id, post.pk
+            )
+        self.assertFalse(Post.objects.using(SHARD).exists())
+        self.assertEqual(archive_total(PostArchive.SITE), 24)
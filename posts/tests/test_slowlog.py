@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.slowlog import push_entry, slow_requests
+
+
+class SlowRequestLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        user = get_user_model().objects.create(username="test")
+        for i in range(3):
+            Post.objects.create(text="test" + str(i), author=user)
+        cls.admin = get_user_model().objects.create_superuser(
+            username="admin", email="admin@example.com", password="secret"
+        )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_fast_requests_are_not_recorded(self):
+        self.guest_client.get(reverse("index"))
+        self.assertEqual(slow_requests(), [])
+
+    @mock.patch("posts.slowlog.SLOW_REQUEST_THRESHOLD", 0)
+    def test_slow_request_is_recorded_and_logged(self):
+        with self.assertLogs("posts.slowlog", "WARNING") as logs:
+            self.guest_client.get(reverse("groups"), {"sort": "size"})
+        entry, = slow_requests()
+        self.assertEqual(entry["view"], "groups")
+        self.assertEqual(entry["query"], "sort=size")
+        self.assertEqual(entry["status"], 200)
+        self.assertGreater(entry["queries"], 0)
+        self.assertLessEqual(len(entry["slowest_queries"]), 5)
+        durations = [query["duration"] for query in entry["slowest_queries"]]
+        self.assertEqual(durations, sorted(durations, reverse=True))
+        self.assertIn('"view": "groups"', logs.output[0])
+
+    @mock.patch("posts.slowlog.SLOW_REQUESTS_KEPT", 3)
+    def test_ring_buffer_is_bounded(self):
+        for duration in range(5):
+            push_entry({"duration": duration})
+        self.assertEqual(
+            sorted(entry["duration"] for entry in slow_requests()), [2, 3, 4]
+        )
+
+    def test_admin_page_sorts_by_duration(self):
+        for duration in (0.7, 2.5, 1.1):
+            push_entry({
+                "time": "now", "method": "GET", "path": "/", "view": "index",
+                "kwargs": {}, "query": "", "status": 200,
+                "duration": duration, "queries": 1, "query_time": 0.1,
+                "slowest_queries": [],
+            })
+        url = reverse("slow_requests")
+        self.assertEqual(self.guest_client.get(url).status_code, 302)
+        self.guest_client.force_login(self.admin)
+        response = self.guest_client.get(url)
+        self.assertEqual(
+            [entry["duration"] for entry in response.context["entries"]],
+            [2.5, 1.1, 0.7]
+        )
+        response = self.guest_client.get(url, {"sort": "duration"})
+        self.assertEqual(
+            [entry["duration"] for entry in response.context["entries"]],
+            [0.7, 1.1, 2.5]
+        )
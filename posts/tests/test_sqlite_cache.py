@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from posts.cache_backends import SQLiteCache
+
+
+def increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr("hits")
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, "cache.sqlite3")
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {"OPTIONS": options})
+
+    def test_set_get_and_expiry(self):
+        cache = self.make_cache()
+        cache.set("post", {"text": "test"})
+        cache.set("short", 1, timeout=0.1)
+        self.assertEqual(cache.get("post"), {"text": "test"})
+        self.assertTrue(cache.has_key("short"))
+        time.sleep(0.2)
+        self.assertIsNone(cache.get("short"))
+        self.assertEqual(cache.get("short", "default"), "default")
+        self.assertFalse(cache.touch("short"))
+
+    def test_add_and_delete(self):
+        cache = self.make_cache()
+        self.assertTrue(cache.add("key", 1))
+        self.assertFalse(cache.add("key", 2))
+        self.assertEqual(cache.get("key"), 1)
+        self.assertTrue(cache.delete("key"))
+        self.assertFalse(cache.delete("key"))
+        cache.set_many({"a": 1, "b": 2})
+        self.assertEqual(cache.get_many(["a", "b", "c"]), {"a": 1, "b": 2})
+        cache.delete_many(["a"])
+        self.assertEqual(cache.get_many(["a", "b"]), {"b": 2})
+
+    def test_entries_are_shared_between_instances(self):
+        self.make_cache().set("key", "value")
+        self.assertEqual(self.make_cache().get("key"), "value")
+
+    def test_get_survives_locked_database(self):
+        cache = self.make_cache(ACCESS_RESOLUTION=0)
+        cache.set("key", "value")
+        cache.set("short", 1, timeout=0.1)
+        time.sleep(0.2)
+        cache._db.execute("PRAGMA busy_timeout = 0")
+        writer = sqlite3.connect(self.location, isolation_level=None)
+        self.addCleanup(writer.close)
+        writer.execute("BEGIN IMMEDIATE")
+        self.assertEqual(cache.get("key"), "value")
+        self.assertIsNone(cache.get("short"))
+        writer.execute("ROLLBACK")
+
+    def test_least_recently_used_is_evicted(self):
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3,
+                                ACCESS_RESOLUTION=0)
+        for key in "abc":
+            cache.set(key, key)
+            time.sleep(0.01)
+        cache.get("a")
+        cache.set("d", "d")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get_many("acd"), {"a": "a", "c": "c", "d": "d"})
+
+    def test_size_bound(self):
+        cache = self.make_cache(MAX_SIZE=10000, ACCESS_RESOLUTION=0)
+        for i in range(10):
+            cache.set(f"key{i}", "x" * 2000)
+        stored = cache.get_many(f"key{i}" for i in range(10))
+        self.assertLessEqual(len(stored), 4)
+        self.assertIn("key9", stored)
+
+    def test_incr_is_atomic_between_processes(self):
+        cache = self.make_cache()
+        cache.set("hits", 0)
+        with self.assertRaises(ValueError):
+            cache.incr("missing")
+        workers = [
+            multiprocessing.Process(
+                target=increment, args=(self.location, 50)
+            )
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(cache.get("hits"), 200)
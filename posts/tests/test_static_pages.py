@@ -0,0 +1,125 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, PageChange, Post
+from posts.static_pages import (PageRenderError, StaticPagesApp,
+                                drain_changes, render_pages)
+
+
+def dynamic(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"dynamic"]
+
+
+class StaticPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.root = tempfile.TemporaryDirectory()
+        cls.settings_override = override_settings(
+            STATIC_PAGES=True, STATIC_PAGES_DIR=cls.root.name
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.settings_override.disable()
+        cls.root.cleanup()
+        super().tearDownClass()
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = get_user_model().objects.create(username="test")
+        self.group = Group.objects.create(
+            title="Peck", slug="mafia-town", description="Revoluton"
+        )
+        self.post = Post.objects.create(
+            text="static post", author=self.user, group=self.group
+        )
+        self.app = StaticPagesApp(dynamic, self.root.name)
+
+    def drain(self):
+        with self.assertLogs("posts.static_pages"):
+            return drain_changes()
+
+    def get(self, path, **environ):
+        environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, **environ}
+        status = []
+        body = b"".join(self.app(
+            environ, lambda code, headers: status.append(code)
+        ))
+        return status[0], body
+
+    def test_changes_are_queued_and_rendered(self):
+        post_url = reverse("post", args=["test", self.post.pk])
+        self.assertEqual(
+            set(PageChange.objects.values_list("path", flat=True)),
+            {"/", "/test/", post_url, "/group/mafia-town/"}
+        )
+        self.assertEqual(self.drain(), (4, 0))
+        self.assertFalse(PageChange.objects.exists())
+        status, body = self.get(post_url)
+        self.assertEqual(status, "200 OK")
+        self.assertIn(b"static post", body)
+
+    def test_render_ignores_page_cache_and_test_host(self):
+        self.assertContains(self.client.get("/"), "static post")
+        Post.objects.filter(pk=self.post.pk).update(text="edited post")
+        self.assertContains(self.client.get("/"), "static post")
+        with override_settings(ALLOWED_HOSTS=["example.org"]):
+            self.assertEqual(render_pages(["/"]), (1, 0))
+        self.assertIn(b"edited post", self.get("/")[1])
+
+    def test_failed_render_keeps_page_and_queue(self):
+        self.drain()
+        PageChange.objects.create(path="/")
+        with mock.patch("posts.views.render_page",
+                        side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                drain_changes()
+        self.assertIn(b"static post", self.get("/")[1])
+        self.assertTrue(PageChange.objects.filter(path="/").exists())
+
+    @mock.patch("posts.views.render_page")
+    def test_unexpected_status_is_an_error(self, render_page):
+        render_page.return_value = HttpResponse(status=503)
+        with self.assertRaises(PageRenderError):
+            render_pages(["/"])
+
+    def test_deleted_group_page_is_removed(self):
+        self.drain()
+        self.group.delete()
+        self.drain()
+        self.assertEqual(self.get("/group/mafia-town/")[1], b"dynamic")
+        self.assertNotIn(b"Peck", self.get("/")[1])
+
+    def test_dynamic_requests_pass_through(self):
+        self.drain()
+        requests = {
+            "session": {"HTTP_COOKIE": "sessionid=abc"},
+            "query": {"QUERY_STRING": "page=2"},
+            "post": {"REQUEST_METHOD": "POST"},
+        }
+        for name, environ in requests.items():
+            with self.subTest(name=name):
+                self.assertEqual(self.get("/", **environ)[1], b"dynamic")
+        self.assertEqual(self.get("/../../")[1], b"dynamic")
+        self.assertEqual(self.get("/missing/")[1], b"dynamic")
+
+    @mock.patch("posts.views.record_view")
+    @mock.patch("posts.static_pages.record_view")
+    def test_static_post_view_is_counted(self, record_view, rendered_view):
+        self.drain()
+        rendered_view.assert_not_called()
+        self.assertTrue(os.path.exists(
+            os.path.join(self.root.name, "test", str(self.post.pk), "shard")
+        ))
+        self.get(reverse("post", args=["test", self.post.pk]))
+        record_view.assert_called_once_with(self.post.pk, "default")
@@ -0,0 +1,103 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, PostTag, Tag
+from posts.tags import extract_tags
+
+User = get_user_model()
+
+
+class HashtagTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create(username="test")
+        for i in range(12):
+            Post.objects.create(text=f"Шляпа {i} #Кошки", author=cls.user)
+        Post.objects.create(text="Без тегов", author=cls.user)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tag_count(self, name):
+        return Tag.objects.get(name=name).post_count
+
+    def test_extract_tags(self):
+        self.assertEqual(
+            extract_tags("#Кошки и #dogs, но не &#39;, /page#top и #2020"),
+            {"кошки", "dogs"}
+        )
+
+    def test_tag_feed_pages_through_index(self):
+        self.assertEqual(self.tag_count("кошки"), 12)
+        response = self.guest_client.get(reverse("tag", args=["Кошки"]))
+        self.assertEqual(response.status_code, 200)
+        texts = [post.text for post in response.context["page"]]
+        self.assertEqual(
+            texts, [f"Шляпа {i} #Кошки" for i in range(11, 1, -1)]
+        )
+        self.assertEqual(response.context["paginator"].num_pages, 2)
+        fragment = self.guest_client.get(response.context["fragment_url"], {
+            "after": response.context["next_cursor"],
+            "page": 2,
+        })
+        texts = [post.text for post in fragment.context["page"]]
+        self.assertEqual(texts, ["Шляпа 1 #Кошки", "Шляпа 0 #Кошки"])
+        page_two = self.guest_client.get(
+            reverse("tag", args=["кошки"]), {"page": 2}
+        )
+        self.assertEqual(len(page_two.context["page"]), 2)
+        self.assertEqual(
+            self.guest_client.get(reverse("tag", args=["нет"])).status_code,
+            404
+        )
+
+    def test_new_post_and_edit_update_index(self):
+        self.authorized_client.post(
+            reverse("new_post"), {"text": "Новый #пост про #кошки"}
+        )
+        post = Post.objects.get(text__startswith="Новый")
+        self.assertEqual(self.tag_count("пост"), 1)
+        self.assertEqual(self.tag_count("кошки"), 13)
+        self.authorized_client.post(
+            reverse("post_edit", args=["test", post.pk]),
+            {"text": "Новый #пост"}
+        )
+        self.assertEqual(self.tag_count("кошки"), 12)
+        self.assertFalse(
+            PostTag.objects.filter(post_id=post.pk, tag__name="кошки").exists()
+        )
+        post.hidden = True
+        post.save()
+        self.assertEqual(self.tag_count("пост"), 0)
+        post.delete()
+        self.assertFalse(PostTag.objects.filter(post_id=post.pk).exists())
+
+    def test_deleted_post_leaves_index(self):
+        post = Post.objects.filter(text__contains="#").first()
+        post.delete()
+        self.assertEqual(self.tag_count("кошки"), 11)
+        self.assertEqual(
+            PostTag.objects.filter(tag__name="кошки").count(), 11
+        )
+
+    def test_backfill_restores_index(self):
+        PostTag.objects.all().delete()
+        Tag.objects.update(post_count=0)
+        out = io.StringIO()
+        with self.assertLogs("posts.tags"):
+            call_command("backfill_tags", "--batch-size=5", stdout=out)
+        self.assertIn("изменено строк индекса: 12", out.getvalue())
+        self.assertEqual(self.tag_count("кошки"), 12)
+        out = io.StringIO()
+        with self.assertLogs("posts.tags"):
+            call_command("backfill_tags", stdout=out)
+        self.assertIn("изменено строк индекса: 0", out.getvalue())
@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.paginator import encode_cursor
+from posts.warmup import compile_templates, prefill_page_caches, warm_up
+
+
+class WarmUpTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        user = get_user_model().objects.create(username="test")
+        group = Group.objects.create(
+            title="Peck",
+            slug="mafia-town",
+            description="Revoluton"
+        )
+        for i in range(15):
+            Post.objects.create(text="test" + str(i), author=user,
+                                group=group)
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_report_times_every_step(self):
+        with self.assertLogs("posts.warmup", "INFO"):
+            report = warm_up()
+        self.assertEqual(
+            list(report), ["modules", "urls", "templates", "database", "total"]
+        )
+        self.assertAlmostEqual(
+            report["total"], sum(report.values()) - report["total"]
+        )
+
+    def test_templates_compile_for_every_engine(self):
+        # index.html есть и у Django, и у Jinja2, includes — без повторов.
+        self.assertGreater(compile_templates(), 20)
+
+    def test_prefill_fills_page_cache(self):
+        self.assertEqual(prefill_page_caches(), 5)
+        cursor = encode_cursor(Post.objects.all()[9])
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("index_fragment"), {
+                "after": cursor,
+                "page": 2,
+            })
+        self.assertContains(response, "test4")
+
+    @override_settings(ALLOWED_HOSTS=["example.org"])
+    def test_prefill_reports_failed_pages(self):
+        with mock.patch("posts.views.render_page",
+                        return_value=HttpResponse(status=500)):
+            with self.assertLogs("posts.warmup", "WARNING") as logs:
+                self.assertEqual(prefill_page_caches(), 0)
+        self.assertEqual(len(logs.records), 5)
+        self.assertIn("Прогрев /: ответ 500", logs.output[0])
@@ -0,0 +1,168 @@
+"""TF-IDF по текстам постов и ближайшие соседи по косинусу.
+
+Матрица TF-IDF строится разреженной по всем видимым постам, соседи
+считаются порциями строк: одно произведение матриц на порцию вместо
+сравнения постов попарно. Без --all команда related_posts пересчитывает
+только посты из очереди RelatedPostChange. Словарь и IDF при этом
+строятся по всему корпусу, а списки старых постов обновит --all.
+"""
+import heapq
+import logging
+import re
+from collections import Counter
+
+import numpy as np
+from django.db import transaction
+from scipy import sparse
+
+from .deletion import pending_ids
+from .models import PendingDeletion, Post, RelatedPost, RelatedPostChange
+from .related import forget_related, queue_related
+from .settings import (RELATED_BATCH_SIZE, RELATED_MAX_DF, RELATED_MIN_DF,
+                       RELATED_POSTS_COUNT)
+from .sharding import post_shards
+from .static_pages import enqueue_pages, post_page_paths
+
+logger = logging.getLogger(__name__)
+
+# Слова из букв: числа и одиночные буквы похожести не добавляют.
+TOKEN_RE = re.compile(r"[^\W\d_]{2,}")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def corpus_rows():
+    """(id, автор, текст) видимых постов всех шардов по возрастанию id."""
+    deleted = pending_ids(PendingDeletion.USER)
+    return heapq.merge(*(
+        Post.objects.using(alias).filter(hidden=False).exclude(
+            author_id__in=deleted
+        ).order_by("pk").values_list("pk", "author_id", "text").iterator()
+        for alias in post_shards()
+    ))
+
+
+def build_matrix(rows):
+    """id постов, их авторы и нормированная матрица TF-IDF в CSR.
+
+    Термы из одного поста и слишком частые термы отбрасываются:
+    первые не дают соседей, вторые — только шум.
+    """
+    vocabulary = {}
+    ids, authors, indices, counts, indptr = [], [], [], [], [0]
+    for pk, author_id, text in rows:
+        terms = Counter(
+            vocabulary.setdefault(term, len(vocabulary))
+            for term in tokenize(text)
+        )
+        ids.append(pk)
+        authors.append(author_id)
+        indices.extend(terms.keys())
+        counts.extend(terms.values())
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix(
+        (np.array(counts, dtype=np.float32),
+         np.array(indices, dtype=np.int64), np.array(indptr)),
+        shape=(len(ids), len(vocabulary))
+    )
+    frequency = np.bincount(matrix.indices, minlength=len(vocabulary))
+    keep = (frequency >= RELATED_MIN_DF) & (
+        frequency <= max(RELATED_MAX_DF * len(ids), RELATED_MIN_DF)
+    )
+    matrix = matrix[:, np.flatnonzero(keep)]
+    matrix.data = 1 + np.log(matrix.data)
+    idf = np.log((1 + len(ids)) / (1 + frequency[keep])) + 1
+    matrix = matrix @ sparse.diags(idf.astype(np.float32))
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix = sparse.diags((1 / norms).astype(np.float32)) @ matrix
+    return np.array(ids), np.array(authors), matrix.tocsr()
+
+
+def nearest(matrix, transposed, rows, count=RELATED_POSTS_COUNT):
+    """Позиции и оценки count ближайших соседей для строк rows.
+
+    Плотная матрица оценок занимает len(rows) × число постов,
+    поэтому строки подаются порциями RELATED_BATCH_SIZE.
+    """
+    scores = (matrix[rows] @ transposed).toarray()
+    scores[np.arange(len(rows)), rows] = 0
+    count = min(count, matrix.shape[0] - 1)
+    if count <= 0:
+        empty = np.empty((len(rows), 0))
+        return empty.astype(np.int64), empty
+    top = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return (np.take_along_axis(top, order, axis=1),
+            np.take_along_axis(top_scores, order, axis=1))
+
+
+def store_neighbours(ids, authors, rows, neighbours, scores):
+    related = []
+    for row, columns, values in zip(rows, neighbours, scores):
+        for rank, (column, score) in enumerate(zip(columns, values)):
+            if score <= 0:
+                break
+            related.append(RelatedPost(
+                post_id=int(ids[row]), rank=rank,
+                related_id=int(ids[column]), author_id=int(authors[column]),
+                score=float(score)
+            ))
+    with transaction.atomic():
+        forget_related(ids[rows].tolist(), neighbours=False)
+        RelatedPost.objects.bulk_create(related, batch_size=500)
+
+
+def update_related(post_ids=None, batch_size=RELATED_BATCH_SIZE):
+    """Пересчитывает соседей для post_ids, а без них — для всех постов.
+
+    Возвращает число постов, чьи списки обновлены.
+    """
+    if post_ids is None:
+        # Очередь покрывает полный пересчет, правки во время него
+        # встанут в нее заново.
+        RelatedPostChange.objects.all().delete()
+    ids, authors, matrix = build_matrix(corpus_rows())
+    if post_ids is None:
+        stored = np.fromiter(RelatedPost.objects.values_list(
+            "post_id", flat=True
+        ).distinct().iterator(), dtype=np.int64)
+        missing = stored[~np.isin(stored, ids)]
+        targets = np.arange(len(ids))
+    else:
+        post_ids = np.unique(np.array(post_ids, dtype=np.int64))
+        present = np.isin(post_ids, ids)
+        missing = post_ids[~present]
+        targets = np.searchsorted(ids, post_ids[present])
+    # Скрытые и удаленные посты: их списки больше не нужны.
+    forget_related(missing.tolist(), neighbours=False)
+    transposed = matrix.T.tocsr()
+    for start in range(0, len(targets), batch_size):
+        rows = targets[start:start + batch_size]
+        neighbours, scores = nearest(matrix, transposed, rows)
+        store_neighbours(ids, authors, rows, neighbours, scores)
+        enqueue_pages(post_page_paths, list(zip(
+            ids[rows].tolist(), authors[rows].tolist()
+        )))
+        logger.info("Похожие посты: %d из %d",
+                    min(start + batch_size, len(targets)), len(targets))
+    return len(targets)
+
+
+def drain_related_changes(batch_size=RELATED_BATCH_SIZE):
+    """Пересчитывает посты из очереди, строки удаляются до расчета."""
+    changes = list(RelatedPostChange.objects.values_list("pk", "post_id"))
+    if not changes:
+        return 0
+    RelatedPostChange.objects.filter(
+        pk__in=[pk for pk, post_id in changes]
+    ).delete()
+    post_ids = [post_id for pk, post_id in changes]
+    try:
+        return update_related(post_ids, batch_size)
+    except Exception:
+        queue_related(post_ids)
+        raise
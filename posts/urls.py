@@ -4,10 +4,66 @@ from . import views
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("fragments/index/", views.index_fragment, name="index_fragment"),
+    path(
+        "archive/<int:year>/<int:month>/",
+        views.index_archive,
+        name="index_archive"
+    ),
+    path("popular/", views.popular, name="popular"),
+    path("groups/", views.group_list, name="groups"),
+    path(
+        "groups/autocomplete/",
+        views.group_autocomplete,
+        name="group_autocomplete"
+    ),
     path("group/<slug:slug>/", views.group_posts, name="group"),
+    path(
+        "group/<slug:slug>/fragment/",
+        views.group_fragment,
+        name="group_fragment"
+    ),
+    path(
+        "group/<slug:slug>/archive/<int:year>/<int:month>/",
+        views.group_archive,
+        name="group_archive"
+    ),
+    path("tag/<str:name>/", views.tag_posts, name="tag"),
+    path(
+        "tag/<str:name>/fragment/",
+        views.tag_fragment,
+        name="tag_fragment"
+    ),
     path("new/", views.new_post, name="new_post"),
+    path("notifications/", views.notifications, name="notifications"),
+    path("metrics/", views.metrics, name="metrics"),
     path("<str:username>/", views.profile, name="profile"),
+    path(
+        "<str:username>/fragment/",
+        views.profile_fragment,
+        name="profile_fragment"
+    ),
+    path(
+        "<str:username>/archive/<int:year>/<int:month>/",
+        views.profile_archive,
+        name="profile_archive"
+    ),
+    path(
+        "<str:username>/export/",
+        views.export_posts,
+        name="export_posts"
+    ),
+    path(
+        "<str:username>/export/<int:export_id>/",
+        views.export_download,
+        name="export_download"
+    ),
     path("<str:username>/<int:post_id>/", views.post_view, name="post"),
+    path(
+        "<str:username>/<int:post_id>/comment/",
+        views.add_comment,
+        name="add_comment"
+    ),
     path(
         "<str:username>/<int:post_id>/edit/",
         views.post_edit,
@@ -1,40 +1,240 @@
 from typing import cast
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import (FileResponse, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
 from django.http.response import Http404
-from django.shortcuts import get_object_or_404, redirect, render
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse
 
-from .forms import PostForm
-from .models import Group, Post, User
-from .settings import PAGINATOR_PAGE_SIZE
+from .archive import (archive_links, archive_total, get_archive_or_404,
+                      month_bounds)
+from .caching import anonymous_page_cache
+from .counters import record_view
+from .deletion import pending_ids
+from .export import (export_chunks, export_filename, export_post_count,
+                     fresh_export)
+from .forms import CommentForm, PostForm
+from .groups import DIRECTORY_ORDERING, search_groups
+from .mentions import attach_posts, mark_read
+from .metrics import can_read_metrics, collect, render_metrics
+from .models import (DataExport, Group, Notification, PendingDeletion,
+                     PostArchive, Tag, User)
+from .paginator import (counted_paginator, cursor_page, decode_cursor,
+                        encode_cursor)
+from .related import related_posts
+from .rendering import render_page
+from .sharding import author_posts, feed_posts, find_post, with_related
+from .settings import (COMMENT_MAX_DEPTH, COMMENTS_PAGE_SIZE,
+                       EXPORT_STREAM_LIMIT, FRAGMENT_CACHE_TIMEOUT,
+                       INDEX_CACHE_TIMEOUT, PAGINATOR_PAGE_SIZE)
+from .static_pages import PRERENDER_ENVIRON
+from .tags import TagFeed
 
 
+def load_more(page, fragment_url):
+    """Контекст кнопки «Показать ещё» для следующей страницы ленты."""
+    if not page.has_next():
+        return {}
+    return {
+        "fragment_url": fragment_url,
+        "next_cursor": encode_cursor(page[-1]),
+        "next_page": page.next_page_number(),
+    }
+
+
+def get_author_or_404(username):
+    author = get_object_or_404(User, username=username)
+    if author.pk in pending_ids(PendingDeletion.USER):
+        raise Http404
+    return author
+
+
+def get_group_or_404(slug):
+    group = get_object_or_404(Group, slug=slug)
+    if group.pk in pending_ids(PendingDeletion.GROUP):
+        raise Http404
+    return group
+
+
+def feed_fragment(request, template_name, posts, fragment_url,
+                  context=None):
+    """Только список постов после курсора, без base.html."""
+    cursor = decode_cursor(request.GET.get("after"))
+    if cursor is None:
+        raise Http404
+    try:
+        page_number = int(request.GET.get("page", 1))
+    except ValueError:
+        page_number = 1
+    posts, next_cursor = cursor_page(posts, cursor, PAGINATOR_PAGE_SIZE)
+    return render_page(request, template_name, {
+        **(context or {}),
+        "page": posts,
+        "fragment_url": fragment_url,
+        "next_cursor": next_cursor,
+        "next_page": page_number + 1,
+    })
+
+
+@anonymous_page_cache(INDEX_CACHE_TIMEOUT)
 def index(request):
-    posts = Post.objects.select_related("group")
-    paginator = Paginator(posts, PAGINATOR_PAGE_SIZE)
+    posts = feed_posts()
+    paginator = counted_paginator(
+        posts, PAGINATOR_PAGE_SIZE, archive_total(PostArchive.SITE)
+    )
+    page_number = request.GET.get("page")
+    page = paginator.get_page(page_number)
+
+    return render_page(request, "index.html", {
+        "page": page,
+        "paginator": paginator,
+        "archive": archive_links("index_archive", PostArchive.SITE),
+        **load_more(page, reverse("index_fragment"))
+    })
+
+
+@anonymous_page_cache(FRAGMENT_CACHE_TIMEOUT)
+def index_fragment(request):
+    posts = feed_posts()
+    return feed_fragment(
+        request, "index_fragment.html", posts, reverse("index_fragment")
+    )
+
+
+def index_archive(request, year, month):
+    archive = get_archive_or_404(PostArchive.SITE, 0, year, month)
+    start, end = month_bounds(year, month)
+    posts = feed_posts(pub_date__gte=start, pub_date__lt=end)
+    paginator = counted_paginator(
+        posts, PAGINATOR_PAGE_SIZE, archive.post_count
+    )
+    page_number = request.GET.get("page")
+    page = paginator.get_page(page_number)
+
+    return render_page(request, "index.html", {
+        "page": page,
+        "paginator": paginator,
+        "archive_month": archive,
+        "archive": archive_links("index_archive", PostArchive.SITE)
+    })
+
+
+def popular(request):
+    posts = feed_posts("-views_count", "-pub_date")
+    paginator = counted_paginator(
+        posts, PAGINATOR_PAGE_SIZE, archive_total(PostArchive.SITE)
+    )
     page_number = request.GET.get("page")
     page = paginator.get_page(page_number)
 
-    return render(request, "index.html", {
+    return render_page(request, "index.html", {
         "page": page,
-        "paginator": paginator
+        "paginator": paginator,
+        "popular": True
     })
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related("group")
-    paginator = Paginator(posts, PAGINATOR_PAGE_SIZE)
+    group = get_group_or_404(slug)
+    posts = feed_posts(group=group)
+    paginator = counted_paginator(posts, PAGINATOR_PAGE_SIZE, group.post_count)
+    page_number = request.GET.get("page")
+    page = paginator.get_page(page_number)
+
+    return render_page(request, "group.html", {
+        "group": group,
+        "page": page,
+        "paginator": paginator,
+        "archive": archive_links(
+            "group_archive", PostArchive.GROUP, group.pk, slug=group.slug
+        ),
+        **load_more(page, reverse("group_fragment", args=[slug]))
+    })
+
+
+@anonymous_page_cache(FRAGMENT_CACHE_TIMEOUT)
+def group_fragment(request, slug):
+    group = get_group_or_404(slug)
+    posts = feed_posts(group=group)
+    return feed_fragment(
+        request, "group_fragment.html", posts,
+        reverse("group_fragment", args=[slug]), {"group": group}
+    )
+
+
+def group_archive(request, slug, year, month):
+    group = get_group_or_404(slug)
+    archive = get_archive_or_404(PostArchive.GROUP, group.pk, year, month)
+    start, end = month_bounds(year, month)
+    posts = feed_posts(group=group, pub_date__gte=start, pub_date__lt=end)
+    paginator = counted_paginator(
+        posts, PAGINATOR_PAGE_SIZE, archive.post_count
+    )
     page_number = request.GET.get("page")
     page = paginator.get_page(page_number)
 
-    return render(request, "group.html", {
+    return render_page(request, "group.html", {
         "group": group,
         "page": page,
-        "paginator": paginator
+        "paginator": paginator,
+        "archive_month": archive,
+        "archive": archive_links(
+            "group_archive", PostArchive.GROUP, group.pk, slug=group.slug
+        )
+    })
+
+
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.lower())
+    posts = TagFeed(tag)
+    paginator = counted_paginator(posts, PAGINATOR_PAGE_SIZE, tag.post_count)
+    page_number = request.GET.get("page")
+    page = paginator.get_page(page_number)
+
+    return render_page(request, "tag.html", {
+        "tag": tag,
+        "page": page,
+        "paginator": paginator,
+        **load_more(page, reverse("tag_fragment", args=[tag.name]))
+    })
+
+
+@anonymous_page_cache(FRAGMENT_CACHE_TIMEOUT)
+def tag_fragment(request, name):
+    tag = get_object_or_404(Tag, name=name.lower())
+    return feed_fragment(
+        request, "tag_fragment.html", TagFeed(tag),
+        reverse("tag_fragment", args=[tag.name]), {"tag": tag}
+    )
+
+
+def group_list(request):
+    sort = request.GET.get("sort")
+    if sort not in DIRECTORY_ORDERING:
+        sort = "activity"
+    groups = Group.objects.exclude(
+        pk__in=pending_ids(PendingDeletion.GROUP)
+    ).order_by(*DIRECTORY_ORDERING[sort])
+    paginator = Paginator(groups, PAGINATOR_PAGE_SIZE)
+    page_number = request.GET.get("page")
+    page = paginator.get_page(page_number)
+
+    return render_page(request, "groups.html", {
+        "page": page,
+        "paginator": paginator,
+        "sort": sort
     })
 
 
+def group_autocomplete(request):
+    groups = search_groups(request.GET.get("q", ""))
+    return JsonResponse({"results": [
+        {"id": group.pk, "title": group.title}
+        for group in groups
+    ]})
+
+
 @login_required
 def new_post(request):
     form = PostForm(request.POST or None)
@@ -44,54 +244,224 @@ def new_post(request):
         new_form.save()
         return redirect("index")
     form = PostForm()
-    return render(request, "new.html", {"form": form})
+    return render_page(request, "new.html", {"form": form})
+
+
+@login_required
+def notifications(request):
+    last_seen = mark_read(request.user)
+    notes = Notification.objects.filter(
+        recipient=request.user
+    ).select_related("author")
+    paginator = Paginator(notes, PAGINATOR_PAGE_SIZE)
+    page_number = request.GET.get("page")
+    page = paginator.get_page(page_number)
+    page.object_list = attach_posts(list(page.object_list))
+    for notification in page.object_list:
+        notification.is_new = (
+            last_seen is None or notification.created > last_seen
+        )
+
+    return render_page(request, "notifications.html", {
+        "page": page,
+        "paginator": paginator,
+    })
 
 
 def profile(request, username):
-    user_profile = User.objects.get(username=username)
-    posts = Post.objects.filter(
-        author=user_profile
-    ).select_related("group")
-    paginator = Paginator(posts, PAGINATOR_PAGE_SIZE)
+    user_profile = get_author_or_404(username)
+    posts = author_posts(user_profile).filter(hidden=False)
+    paginator = counted_paginator(
+        posts, PAGINATOR_PAGE_SIZE,
+        archive_total(PostArchive.AUTHOR, user_profile.pk)
+    )
     page_number = request.GET.get("page")
     page = paginator.get_page(page_number)
     user = request.user
-    return render(request, "profile.html", {
+    return render_page(request, "profile.html", {
         "page": page,
         "user": user,
         "user_profile": user_profile,
-        "paginator": paginator
+        "paginator": paginator,
+        "archive": archive_links(
+            "profile_archive", PostArchive.AUTHOR, user_profile.pk,
+            username=user_profile.username
+        ),
+        **load_more(page, reverse("profile_fragment", args=[username]))
+    })
+
+
+@anonymous_page_cache(FRAGMENT_CACHE_TIMEOUT)
+def profile_fragment(request, username):
+    user_profile = get_author_or_404(username)
+    posts = author_posts(user_profile).filter(hidden=False)
+    return feed_fragment(
+        request, "profile_fragment.html", posts,
+        reverse("profile_fragment", args=[username]),
+        {"user_profile": user_profile}
+    )
+
+
+def profile_archive(request, username, year, month):
+    user_profile = get_author_or_404(username)
+    archive = get_archive_or_404(
+        PostArchive.AUTHOR, user_profile.pk, year, month
+    )
+    start, end = month_bounds(year, month)
+    posts = author_posts(user_profile).filter(
+        hidden=False, pub_date__gte=start, pub_date__lt=end
+    )
+    paginator = counted_paginator(
+        posts, PAGINATOR_PAGE_SIZE, archive.post_count
+    )
+    page_number = request.GET.get("page")
+    page = paginator.get_page(page_number)
+    return render_page(request, "profile.html", {
+        "page": page,
+        "user": request.user,
+        "user_profile": user_profile,
+        "paginator": paginator,
+        "archive_month": archive,
+        "archive": archive_links(
+            "profile_archive", PostArchive.AUTHOR, user_profile.pk,
+            username=user_profile.username
+        )
     })
 
 
+def get_post_or_404(username, post_id):
+    """Пост по адресу автора: запрос идет только на шард автора."""
+    author = get_author_or_404(username)
+    return get_object_or_404(
+        author_posts(author), pk=post_id, hidden=False
+    )
+
+
 def post_view(request, username, post_id):
     try:
-        post = get_object_or_404(Post, id=post_id, author__username=username)
+        post = get_post_or_404(username, post_id)
     except Http404:
+        # Старый адрес после смены имени автора или переезда поста.
+        # Скрытые посты и посты удаляемых авторов остаются 404.
+        post = find_post(post_id)
+        if (
+            post is None
+            or post.hidden
+            or post.author_id in pending_ids(PendingDeletion.USER)
+            or post.author.username == username
+        ):
+            raise
         return redirect(
-            "post",
-            username=Post.objects.get(id=post_id).author.username,
-            post_id=post_id
+            "post", username=post.author.username, post_id=post_id
         )
+    # Рендеринг статической копии не просмотр, копии считает StaticPagesApp.
+    if not request.META.get(PRERENDER_ENVIRON):
+        record_view(post.pk, post._state.db)
     user_profile = post.author
-    post_count = user_profile.posts.count()
+    post_count = archive_total(PostArchive.AUTHOR, user_profile.pk)
     user = request.user
-    return render(request, "post.html", {
+    comments = with_related(post.comments.all(), "author")
+    paginator = counted_paginator(
+        comments, COMMENTS_PAGE_SIZE, post.comment_count
+    )
+    page_number = request.GET.get("page")
+    comments_page = paginator.get_page(page_number)
+    form = CommentForm(initial={"parent": request.GET.get("reply")})
+    return render_page(request, "post.html", {
         "post": post,
         "user": user,
         "post_id": post_id,
         "post_count": post_count,
-        "user_profile": user_profile
+        "user_profile": user_profile,
+        "comments": comments_page,
+        "form": form,
+        "related_posts": related_posts(post),
     })
 
 
+@login_required
+def add_comment(request, username, post_id):
+    post = get_post_or_404(username, post_id)
+    form = CommentForm(request.POST or None, post=post)
+    if form.is_valid():
+        comment = form.save(commit=False)
+        comment.post = post
+        comment.author = request.user
+        while (comment.parent is not None
+               and comment.parent.depth >= COMMENT_MAX_DEPTH):
+            comment.parent = comment.parent.parent
+        comment.save()
+    return redirect("post", username=username, post_id=post_id)
+
+
 @login_required
 def post_edit(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post = get_post_or_404(username, post_id)
     if post.author != request.user:
         return redirect("post", username=username, post_id=post_id)
     form = PostForm(data=request.POST or None, instance=post)
     if form.is_valid():
-        form.save()
+        # Счетчики поста меняются конкурентно, сохраняем только поля формы.
+        form.save(commit=False).save(update_fields=form.Meta.fields)
         return redirect("post", username=username, post_id=post_id)
-    return render(request, "new.html", {"form": form, "post": post})
+    return render_page(request, "new.html", {"form": form, "post": post})
+
+
+def get_export_owner_or_404(request, username):
+    user_profile = get_object_or_404(User, username=username)
+    if request.user != user_profile and not request.user.is_staff:
+        raise Http404
+    return user_profile
+
+
+@login_required
+def export_posts(request, username):
+    """Небольшой архив отдается потоком, большой собирается в фоне.
+
+    Фоновую сборку ставит в очередь только POST формы страницы, если
+    нет архива в очереди или недавно собранного.
+    """
+    user_profile = get_export_owner_or_404(request, username)
+    post_count = export_post_count(user_profile)
+    if post_count <= EXPORT_STREAM_LIMIT:
+        response = StreamingHttpResponse(
+            export_chunks(user_profile), content_type="application/zip"
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{export_filename(user_profile)}"'
+        )
+        return response
+    fresh = fresh_export(user_profile)
+    if request.method == "POST":
+        if fresh is None:
+            DataExport.objects.create(user=user_profile, post_count=post_count)
+        return redirect("export_posts", username=username)
+    return render_page(request, "export.html", {
+        "user_profile": user_profile,
+        "exports": user_profile.exports.all(),
+        "fresh": fresh
+    })
+
+
+@login_required
+def export_download(request, username, export_id):
+    user_profile = get_export_owner_or_404(request, username)
+    export = get_object_or_404(
+        user_profile.exports, pk=export_id, status=DataExport.READY
+    )
+    try:
+        archive = open(export.path, "rb")
+    except FileNotFoundError:
+        raise Http404
+    return FileResponse(
+        archive, as_attachment=True, filename=export_filename(user_profile)
+    )
+
+
+def metrics(request):
+    if not can_read_metrics(request):
+        raise Http404
+    return HttpResponse(
+        render_metrics(collect()),
+        content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
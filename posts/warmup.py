@@ -0,0 +1,136 @@
+"""Прогрев процесса после деплоя, чтобы первые запросы не платили за него.
+
+Без --preload достаточно YATUBE_WARMUP=1 (или prefill) в окружении:
+прогрев выполнит yatube/wsgi.py. С preload-серверами прогрев нужно
+вызывать в каждом воркере после fork, например из хука post_fork
+gunicorn, иначе соединения с БД окажутся общими у всех воркеров.
+Команда warmup замеряет холодный старт и заполняет общий кэш.
+"""
+import importlib
+import logging
+import os
+import time
+
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver, resolve, reverse
+
+from .models import Group
+from .paginator import encode_cursor
+from .rendering import internal_get
+from .settings import PAGINATOR_PAGE_SIZE
+from .sharding import feed_posts
+
+logger = logging.getLogger(__name__)
+
+PRELOAD_MODULES = (
+    "sorl.thumbnail",
+    "sorl.thumbnail.default",
+    "django.contrib.flatpages.views",
+    "django.contrib.flatpages.models",
+    "posts.views",
+    "users.views",
+)
+# Лента и фрагменты попадают в кэш, остальные страницы прогревают запросы.
+PREFILL_GROUPS = 10
+
+
+def preload_modules():
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+    return len(PRELOAD_MODULES)
+
+
+def build_resolvers():
+    resolver = get_resolver()
+    resolver.url_patterns
+    reverse("index")
+    reverse("admin:index")
+    resolve("/")
+    return len(resolver.reverse_dict)
+
+
+def template_names(engine, configured_dirs):
+    # Вложенный каталог из DIRS любого движка обходится отдельно
+    # своим движком, например templates/includes или templates/jinja2.
+    for directory in engine.dirs:
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [
+                name for name in dirs
+                if os.path.join(root, name) not in configured_dirs
+            ]
+            for name in files:
+                if name.endswith(".html"):
+                    yield os.path.relpath(os.path.join(root, name), directory)
+
+
+def compile_templates():
+    configured_dirs = {
+        directory for engine in engines.all() for directory in engine.dirs
+    }
+    compiled = 0
+    for engine in engines.all():
+        for name in template_names(engine, configured_dirs):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                logger.warning("Шаблон %s не компилируется движком %s",
+                               name, engine.name)
+                continue
+            compiled += 1
+    return compiled
+
+
+def open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+    return len(connections.all())
+
+
+def prefill_page_caches():
+    """Рендерит ленты в общий кэш и возвращает число прогретых.
+
+    Каждый адрес, ответивший не 200, попадает в лог предупреждением.
+    """
+    urls = [reverse("index"), reverse("popular"), reverse("groups")]
+    first_pages = [(reverse("index_fragment"), feed_posts())]
+    for group in Group.objects.order_by("-posts_last_week")[:PREFILL_GROUPS]:
+        first_pages.append((
+            reverse("group_fragment", args=[group.slug]),
+            feed_posts(group=group)
+        ))
+    for fragment_url, posts in first_pages:
+        last = list(posts[PAGINATOR_PAGE_SIZE - 1:PAGINATOR_PAGE_SIZE])
+        if last:
+            cursor = encode_cursor(last[0])
+            urls.append(f"{fragment_url}?after={cursor}&page=2")
+    warmed = 0
+    for url in urls:
+        status_code = internal_get(url).status_code
+        if status_code == 200:
+            warmed += 1
+        else:
+            logger.warning("Прогрев %s: ответ %d", url, status_code)
+    return warmed
+
+
+def warm_up(prefill=False):
+    """Выполняет шаги прогрева и возвращает время каждого в секундах."""
+    steps = [
+        ("modules", preload_modules),
+        ("urls", build_resolvers),
+        ("templates", compile_templates),
+        ("database", open_connections),
+    ]
+    if prefill:
+        steps.append(("page_caches", prefill_page_caches))
+    report = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        count = step()
+        report[name] = time.perf_counter() - start
+        logger.info("Прогрев %s: %d за %.1f мс", name, count,
+                    report[name] * 1000)
+    report["total"] = sum(report.values())
+    logger.info("Прогрев завершен за %.1f мс", report["total"] * 1000)
+    return report
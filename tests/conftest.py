@@ -1,4 +1,20 @@
+import pytest
+
+from yatube.testing import add_test_shard, isolated_files_settings
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_files(tmp_path_factory):
+    with isolated_files_settings(str(tmp_path_factory.mktemp('yatube'))):
+        yield
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(
+        django_db_modify_db_settings_parallel_suffix):
+    add_test_shard()
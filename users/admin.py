@@ -1,3 +1,15 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import OutboxMessage
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ("pk", "subject", "to", "status", "attempts",
+                    "next_attempt_at", "sent_at")
+    search_fields = ("subject", "to")
+    list_filter = ("status",)
+    readonly_fields = ("created", "sent_at", "last_error")
+    empty_value_display = "-пусто-"
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
@@ -0,0 +1,21 @@
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .models import OutboxMessage
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Кладет письма в таблицу вместо отправки во время запроса.
+
+    Доставляет их команда deliver_outbox через OUTBOX_DELIVERY_BACKEND.
+    Вложения не поддерживаются: в очередь идут только текст и
+    альтернативные версии письма.
+    """
+
+    def send_messages(self, email_messages):
+        outbox = [
+            OutboxMessage.from_email_message(message)
+            for message in email_messages
+            if message.recipients()
+        ]
+        OutboxMessage.objects.bulk_create(outbox)
+        return len(outbox)
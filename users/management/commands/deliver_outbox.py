@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.outbox import deliver_outbox, purge_outbox, retry_delay
+from users.settings import OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL
+
+
+class Command(BaseCommand):
+    help = "Доставляет письма из очереди пачками через одно соединение"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int,
+                            default=OUTBOX_BATCH_SIZE)
+        parser.add_argument("--once", action="store_true",
+                            help="разобрать очередь и завершиться")
+
+    def handle(self, *args, **options):
+        outages = 0
+        while True:
+            try:
+                sent, failed = deliver_outbox(options["batch_size"])
+            except OSError as error:
+                # Почтовый сервер недоступен, паузы растут с каждой попыткой.
+                outages += 1
+                self.stderr.write(f"Сервер недоступен: {error!r}")
+                if options["once"]:
+                    return
+                time.sleep(retry_delay(outages).total_seconds())
+                continue
+            outages = 0
+            if sent or failed:
+                self.stdout.write(
+                    f"Отправлено: {sent}, отложено: {failed}"
+                )
+            if sent + failed == options["batch_size"]:
+                continue
+            purge_outbox()
+            if options["once"]:
+                return
+            time.sleep(OUTBOX_POLL_INTERVAL)
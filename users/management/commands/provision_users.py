@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.provisioning import provision_users, read_rows
+from users.settings import PROVISION_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = ("Создает пользователей из CSV или JSONL с колонками username, "
+            "email, first_name, last_name, password")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="процессов для хэширования, по умолчанию "
+                                 "по числу ядер")
+        parser.add_argument("--chunk-size", type=int,
+                            default=PROVISION_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        created, skipped = provision_users(
+            read_rows(options["path"]), options["workers"],
+            options["chunk_size"]
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"Создано: {created}, пропущено: {skipped} за {elapsed:.1f} с "
+            f"({created / elapsed:.0f} польз./с)"
+        )
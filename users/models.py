@@ -1,3 +1,76 @@
+import json
+
+from django.core.mail import EmailMultiAlternatives
 from django.db import models
+from django.utils import timezone
+
+
+def split_addresses(value):
+    return [address for address in value.split("\n") if address]
+
+
+class OutboxMessage(models.Model):
+    """Письмо, которое ждет отправки командой deliver_outbox."""
+
+    QUEUED = "queued"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, "В очереди"),
+        (SENT, "Отправлено"),
+        (FAILED, "Не доставлено"),
+    )
+
+    subject = models.TextField()
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.TextField(blank=True)
+    cc = models.TextField(blank=True)
+    bcc = models.TextField(blank=True)
+    reply_to = models.TextField(blank=True)
+    headers = models.TextField(default="{}")
+    alternatives = models.TextField(default="[]")
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField("date created", auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["next_attempt_at", "pk"]
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return self.subject
+
+    @classmethod
+    def from_email_message(cls, message):
+        return cls(
+            subject=message.subject,
+            body=message.body,
+            from_email=message.from_email,
+            to="\n".join(message.to),
+            cc="\n".join(message.cc),
+            bcc="\n".join(message.bcc),
+            reply_to="\n".join(message.reply_to),
+            headers=json.dumps(message.extra_headers),
+            alternatives=json.dumps(getattr(message, "alternatives", [])),
+        )
 
-# Create your models here.
+    def as_email_message(self, connection=None):
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=split_addresses(self.to),
+            cc=split_addresses(self.cc),
+            bcc=split_addresses(self.bcc),
+            reply_to=split_addresses(self.reply_to),
+            headers=json.loads(self.headers),
+            connection=connection,
+        )
+        for content, mimetype in json.loads(self.alternatives):
+            message.attach_alternative(content, mimetype)
+        return message
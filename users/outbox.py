@@ -0,0 +1,75 @@
+import datetime as dt
+import logging
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .settings import (OUTBOX_BATCH_SIZE, OUTBOX_KEEP_DAYS,
+                       OUTBOX_MAX_ATTEMPTS, OUTBOX_MAX_RETRY_DELAY,
+                       OUTBOX_RETRY_DELAY)
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts):
+    return dt.timedelta(seconds=min(
+        OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), OUTBOX_MAX_RETRY_DELAY
+    ))
+
+
+def deliver_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """Отправляет пачку писем из очереди через одно соединение.
+
+    Рассчитано на один процесс доставки: строки не блокируются.
+    Возвращает число отправленных и отложенных писем.
+    """
+    now = timezone.now()
+    messages = list(OutboxMessage.objects.filter(
+        status=OutboxMessage.QUEUED, next_attempt_at__lte=now
+    )[:batch_size])
+    if not messages:
+        return 0, 0
+    sent = failed = 0
+    connection = get_connection(settings.OUTBOX_DELIVERY_BACKEND)
+    try:
+        connection.open()
+        for message in messages:
+            try:
+                connection.send_messages([message.as_email_message()])
+            except Exception as error:
+                failed += 1
+                message.attempts += 1
+                message.last_error = repr(error)
+                if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+                    message.status = OutboxMessage.FAILED
+                    logger.error("Письмо %s не доставлено: %r",
+                                 message.pk, error)
+                else:
+                    message.next_attempt_at = (
+                        timezone.now() + retry_delay(message.attempts)
+                    )
+                message.save(update_fields=[
+                    "attempts", "last_error", "status", "next_attempt_at"
+                ])
+                # Соединение могло оборваться, следующим письмам нужно новое.
+                connection.close()
+                connection.open()
+                continue
+            sent += 1
+            message.status = OutboxMessage.SENT
+            message.sent_at = timezone.now()
+            message.save(update_fields=["status", "sent_at"])
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def purge_outbox():
+    """Удаляет отправленные письма старше OUTBOX_KEEP_DAYS дней."""
+    deleted, _ = OutboxMessage.objects.filter(
+        status=OutboxMessage.SENT,
+        sent_at__lt=timezone.now() - dt.timedelta(days=OUTBOX_KEEP_DAYS)
+    ).delete()
+    return deleted
@@ -0,0 +1,113 @@
+"""Массовое создание пользователей из CSV или JSONL.
+
+Основное время уходит на PBKDF2, поэтому пароли хэшируются в пуле
+процессов на всех ядрах, а вставка идет пачками через bulk_create.
+"""
+import csv
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .settings import PROVISION_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+FIELDS = ("username", "email", "first_name", "last_name", "password")
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as source:
+        if path.endswith(".jsonl"):
+            rows = (json.loads(line) for line in source if line.strip())
+        else:
+            rows = csv.DictReader(source)
+        for row in rows:
+            yield {field: (row.get(field) or "").strip() for field in FIELDS}
+
+
+def validation_errors(user):
+    """Ошибки полей, которые раньше ловили форма и create_user.
+
+    Длина и символы имени, формат почты и длина остальных полей;
+    пароль еще не захэширован и не проверяется.
+    """
+    try:
+        user.clean_fields(exclude=["password"])
+    except ValidationError as error:
+        return [
+            f"{field}: {' '.join(messages)}"
+            for field, messages in error.message_dict.items()
+        ]
+    return []
+
+
+def init_worker():
+    # При запуске воркеров через spawn Django нужно настроить заново.
+    django.setup()
+
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def provision_users(rows, workers=None, chunk_size=PROVISION_CHUNK_SIZE):
+    """Создает пользователей, которых еще нет; возвращает (создано, пропущено).
+
+    Существующие имена загружаются одним запросом, повторы в самом
+    файле тоже пропускаются. Строки с недопустимым именем или почтой
+    пропускаются с предупреждением в лог. Строки без пароля получают
+    непригодный для входа пароль.
+    """
+    known = set(User.objects.values_list("username", flat=True))
+    created = skipped = 0
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(workers, initializer=init_worker) as pool:
+        for chunk in chunks(rows, chunk_size):
+            users = []
+            for row in chunk:
+                username = User.normalize_username(row["username"])
+                if not username or username in known:
+                    skipped += 1
+                    continue
+                user = User(
+                    username=username,
+                    email=User.objects.normalize_email(row["email"]),
+                    first_name=row["first_name"],
+                    last_name=row["last_name"],
+                )
+                errors = validation_errors(user)
+                if errors:
+                    logger.warning("Пропущен %r: %s", username,
+                                   "; ".join(errors))
+                    skipped += 1
+                    continue
+                known.add(username)
+                users.append((user, row["password"] or None))
+            hashes = pool.map(
+                make_password, [password for _, password in users],
+                chunksize=max(1, len(users) // (workers * 4))
+            )
+            for (user, _), password in zip(users, hashes):
+                user.password = password
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    [user for user, _ in users], batch_size=chunk_size
+                )
+            created += len(users)
+    return created, skipped
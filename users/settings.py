@@ -0,0 +1,7 @@
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_MAX_RETRY_DELAY = 60 * 60
+OUTBOX_POLL_INTERVAL = 5
+OUTBOX_KEEP_DAYS = 7
+PROVISION_CHUNK_SIZE = 1000
@@ -0,0 +1,86 @@
+import io
+from smtplib import SMTPRecipientsRefused
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from users.models import OutboxMessage
+from users.outbox import deliver_outbox
+from users.settings import OUTBOX_MAX_ATTEMPTS
+
+
+class RefusingBackend(EmailBackend):
+    def send_messages(self, messages):
+        if any("bad@example.com" in message.to for message in messages):
+            raise SMTPRecipientsRefused({"bad@example.com": (550, b"no")})
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND="users.backends.OutboxBackend",
+    OUTBOX_DELIVERY_BACKEND="users.tests.test_outbox.RefusingBackend",
+)
+class OutboxTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        get_user_model().objects.create_user(
+            username="test", email="hat@example.com", password="secret"
+        )
+
+    def setUp(self) -> None:
+        self.guest_client = Client()
+
+    def test_password_reset_is_queued_not_sent(self):
+        self.guest_client.post(reverse("password_reset"), {
+            "email": "hat@example.com"
+        })
+        self.assertEqual(mail.outbox, [])
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.to, "hat@example.com")
+        self.assertEqual(message.status, OutboxMessage.QUEUED)
+        call_command("deliver_outbox", "--once", stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["hat@example.com"])
+        self.assertIn("reset", mail.outbox[0].body)
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.SENT)
+
+    def test_batch_reuses_connection_and_keeps_content(self):
+        mail.send_mass_mail([
+            (f"Тема {i}", "Текст", "from@example.com", [f"{i}@example.com"])
+            for i in range(3)
+        ])
+        self.assertEqual(deliver_outbox(batch_size=2), (2, 0))
+        self.assertEqual(deliver_outbox(batch_size=2), (1, 0))
+        self.assertEqual(deliver_outbox(batch_size=2), (0, 0))
+        self.assertEqual(
+            [message.subject for message in mail.outbox],
+            ["Тема 0", "Тема 1", "Тема 2"]
+        )
+
+    def test_failures_back_off_and_give_up(self):
+        mail.send_mail("Тема", "Текст", "from@example.com",
+                       ["bad@example.com"])
+        mail.send_mail("Тема", "Текст", "from@example.com",
+                       ["good@example.com"])
+        self.assertEqual(deliver_outbox(), (1, 1))
+        bad = OutboxMessage.objects.get(to="bad@example.com")
+        self.assertEqual(bad.attempts, 1)
+        self.assertGreater(bad.next_attempt_at, timezone.now())
+        self.assertIn("SMTPRecipientsRefused", bad.last_error)
+        self.assertEqual(deliver_outbox(), (0, 0))
+        with self.assertLogs("users.outbox", "ERROR"):
+            for _ in range(OUTBOX_MAX_ATTEMPTS - 1):
+                OutboxMessage.objects.filter(pk=bad.pk).update(
+                    next_attempt_at=timezone.now()
+                )
+                self.assertEqual(deliver_outbox(), (0, 1))
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, OutboxMessage.FAILED)
+        self.assertEqual(bad.attempts, OUTBOX_MAX_ATTEMPTS)
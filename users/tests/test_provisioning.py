@@ -0,0 +1,72 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+User = get_user_model()
+
+
+class ProvisionUsersTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        User.objects.create_user(username="taken", password="secret")
+
+    def provision(self, name, content):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, name)
+            with open(path, "w") as source:
+                source.write(content)
+            output = io.StringIO()
+            call_command("provision_users", path, "--workers", "2",
+                         "--chunk-size", "2", stdout=output)
+        return output.getvalue()
+
+    def test_csv_import_skips_existing_and_repeated(self):
+        output = self.provision("users.csv", (
+            "username,email,first_name,last_name,password\n"
+            "hat,hat@EXAMPLE.com,Hat,Kid,pass-1\n"
+            "taken,x@example.com,,,pass-2\n"
+            "bow,,Bow,Kid,\n"
+            "hat,y@example.com,,,pass-3\n"
+        ))
+        self.assertIn("Создано: 2, пропущено: 2", output)
+        hat = User.objects.get(username="hat")
+        self.assertTrue(hat.check_password("pass-1"))
+        self.assertEqual(hat.email, "hat@example.com")
+        bow = User.objects.get(username="bow")
+        self.assertFalse(bow.has_usable_password())
+        self.assertFalse(
+            User.objects.get(username="taken").check_password("pass-2")
+        )
+
+    def test_jsonl_import(self):
+        rows = [{"username": f"user{i}", "password": "pw"} for i in range(3)]
+        output = self.provision(
+            "users.jsonl", "\n".join(json.dumps(row) for row in rows)
+        )
+        self.assertIn("Создано: 3, пропущено: 0", output)
+        user = User.objects.get(username="user2")
+        self.assertTrue(user.check_password("pw"))
+
+    def test_invalid_rows_are_skipped(self):
+        with self.assertLogs("users.provisioning", "WARNING") as logs:
+            output = self.provision("users.csv", (
+                "username,email,first_name,last_name,password\n"
+                f"{'x' * 151},,,,pw\n"
+                "hat kid,,,,pw\n"
+                "hat/kid,,,,pw\n"
+                "mail,not-an-email,,,pw\n"
+                "hat,,,,pw\n"
+            ))
+        self.assertIn("Создано: 1, пропущено: 4", output)
+        self.assertEqual(len(logs.records), 4)
+        self.assertEqual(
+            list(User.objects.exclude(username="taken").values_list(
+                "username", flat=True
+            )), ["hat"]
+        )
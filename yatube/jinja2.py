@@ -0,0 +1,42 @@
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.timezone import template_localtime
+from jinja2 import ChainableUndefined, Environment
+from markupsafe import Markup
+
+from posts.paginator import page_window, with_page
+from users.templatetags.user_filters import addclass
+
+
+def url(name, **kwargs):
+    return reverse(name, kwargs=kwargs or None)
+
+
+def date(value, arg=None):
+    return defaultfilters.date(template_localtime(value), arg)
+
+
+def linebreaksbr(value, autoescape=True):
+    return Markup(defaultfilters.linebreaksbr(
+        value, autoescape=autoescape and not isinstance(value, Markup)
+    ))
+
+
+def environment(**options):
+    # Пустая строка вместо неизвестной переменной, как в шаблонах Django.
+    options["undefined"] = ChainableUndefined
+    env = Environment(**options)
+    env.globals.update({
+        "static": static,
+        "url": url,
+    })
+    env.filters.update({
+        "addclass": addclass,
+        "date": date,
+        "linebreaksbr": linebreaksbr,
+        "page_window": page_window,
+        "truncatewords": defaultfilters.truncatewords,
+        "with_page": with_page,
+    })
+    return env
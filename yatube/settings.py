@@ -32,11 +32,18 @@ ALLOWED_HOSTS = [
     "testserver",
 ]
 
+# Адреса, которым /metrics доступен без входа, например
+# YATUBE_INTERNAL_IPS=10.0.0.5. За прокси REMOTE_ADDR — адрес прокси,
+# поэтому по умолчанию список пуст.
+INTERNAL_IPS = [
+    ip for ip in os.environ.get("YATUBE_INTERNAL_IPS", "").split(",") if ip
+]
+
 
 # Application definition
 
 INSTALLED_APPS = [
-    'posts',
+    'posts.apps.PostsConfig',
     'users',
     'sorl.thumbnail',
     'django.contrib.sites',
@@ -50,6 +57,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'posts.metrics.MetricsMiddleware',
+    'posts.slowlog.SlowRequestMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,11 +83,34 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'posts.context_processors.notifications',
+            ],
+        },
+    },
+    {
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [
+            os.path.join(TEMPLATES_DIR, "jinja2"),
+            os.path.join(TEMPLATES_DIR, "jinja2", "includes"),
+        ],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'environment': 'yatube.jinja2.environment',
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'posts.context_processors.notifications',
             ],
         },
     },
 ]
 
+# Шаблоны, которые рендерятся движком Jinja2 из templates/jinja2
+# вместо шаблонов Django, например ["index.html", "group.html"].
+JINJA2_TEMPLATES = []
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -92,6 +124,38 @@ DATABASES = {
     }
 }
 
+# Шарды постов, например YATUBE_POST_SHARDS=posts1,posts2. После
+# изменения списка нужно выполнить migrate для новых шардов
+# и команду reshard_posts.
+POST_SHARDS = ['default'] + [
+    alias for alias in os.environ.get("YATUBE_POST_SHARDS", "").split(",")
+    if alias
+]
+for alias in POST_SHARDS[1:]:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'{alias}.sqlite3'),
+    }
+
+DATABASE_ROUTERS = ['posts.sharding.AuthorShardRouter']
+
+# Кэш и рабочие файлы тестов лежат во временном каталоге.
+TEST_RUNNER = 'yatube.testing.TestRunner'
+
+# Общий для воркеров кэш без внешних сервисов, файл на каждый хост.
+CACHES = {
+    'default': {
+        'BACKEND': 'posts.cache_backends.SQLiteCache',
+        'LOCATION': os.environ.get(
+            "YATUBE_CACHE_PATH", os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -133,12 +197,54 @@ STATIC_URL = '/static/'
 
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = 'users.backends.OutboxBackend'
+
+OUTBOX_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Общий для всех воркеров каталог, очищается при деплое.
+METRICS_DIR = os.environ.get(
+    "YATUBE_METRICS_DIR", os.path.join(BASE_DIR, "metrics")
+)
+
+# Готовые страницы для анонимных читателей отдает yatube/wsgi.py.
+STATIC_PAGES = bool(os.environ.get("YATUBE_STATIC_PAGES"))
+STATIC_PAGES_DIR = os.environ.get(
+    "YATUBE_STATIC_PAGES_DIR", os.path.join(BASE_DIR, "static_pages")
+)
+
+# Архивы постов, собранные командой export_posts.
+EXPORTS_DIR = os.environ.get(
+    "YATUBE_EXPORTS_DIR", os.path.join(BASE_DIR, "exports")
+)
+
 LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
 # LOGOUT_REDIRECT_URL = "index"
 
 SITE_ID = 1
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+        "slow_requests": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": os.path.join(BASE_DIR, "slow_requests.log"),
+            "maxBytes": 5 * 1024 * 1024,
+            "backupCount": 5,
+            "delay": True,
+        },
+    },
+    "loggers": {
+        "posts": {"handlers": ["console"], "level": "INFO"},
+        "users": {"handlers": ["console"], "level": "INFO"},
+        "posts.slowlog": {
+            "handlers": ["slow_requests"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
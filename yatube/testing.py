@@ -0,0 +1,60 @@
+"""Тесты без следов в рабочей копии.
+
+Кэш страниц, метрики, статические страницы и архивы постов по
+умолчанию лежат в корне проекта, а тесты чистят кэш и пишут файлы.
+На время тестов все это переезжает во временный каталог.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+# Второй шард постов для тестов шардирования. Объявляется до создания
+# тестовых БД, чтобы раннер поднял его вместе с default.
+TEST_SHARD = "posts_shard"
+
+
+def add_test_shard():
+    connections.databases.setdefault(TEST_SHARD, {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    })
+
+
+def isolated_files_settings(directory):
+    return override_settings(
+        CACHES={
+            **settings.CACHES,
+            "default": {
+                **settings.CACHES["default"],
+                "LOCATION": os.path.join(directory, "cache.sqlite3"),
+            },
+        },
+        METRICS_DIR=os.path.join(directory, "metrics"),
+        STATIC_PAGES_DIR=os.path.join(directory, "static_pages"),
+        EXPORTS_DIR=os.path.join(directory, "exports"),
+    )
+
+
+class TestRunner(DiscoverRunner):
+    """Runner для manage.py test, pytest делает то же в conftest.py."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.files_dir = tempfile.mkdtemp(prefix="yatube-tests-")
+        self.files_settings = isolated_files_settings(self.files_dir)
+        self.files_settings.enable()
+
+    def setup_databases(self, **kwargs):
+        add_test_shard()
+        return super().setup_databases(**kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        self.files_settings.disable()
+        shutil.rmtree(self.files_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
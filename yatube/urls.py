@@ -2,7 +2,14 @@ from django.contrib import admin
 from django.contrib.flatpages import views
 from django.urls import include, path
 
+from posts.admin import slow_requests_view
+
 urlpatterns = [
+        path(
+                "admin/slow-requests/",
+                admin.site.admin_view(slow_requests_view),
+                name="slow_requests"
+        ),
         path("admin/", admin.site.urls),
         path("auth/", include("users.urls")),
         path("auth/", include("django.contrib.auth.urls")),
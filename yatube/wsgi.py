@@ -14,3 +14,17 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Без --preload у сервера прогрев идет в каждом воркере при импорте.
+if os.environ.get("YATUBE_WARMUP"):
+    from posts.warmup import warm_up
+
+    warm_up(prefill=os.environ["YATUBE_WARMUP"] == "prefill")
+
+# Анонимные GET получают готовые страницы из STATIC_PAGES_DIR.
+if os.environ.get("YATUBE_STATIC_PAGES"):
+    from django.conf import settings
+
+    from posts.static_pages import StaticPagesApp
+
+    application = StaticPagesApp(application, settings.STATIC_PAGES_DIR)